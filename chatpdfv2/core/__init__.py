@@ -2,6 +2,28 @@
 Core business logic for the ChatPDFv2 application.
 """
 
-from .interpreter import deepseek_interpretation  # noqa: F401
+from .batch import interpret_documents  # noqa: F401
+from .interpreter import (  # noqa: F401
+    DEFAULT_CONTEXT_TOKENS,
+    DEFAULT_PASSAGE_TOKENS,
+    DEFAULT_SYNTHESIS_TOKENS,
+    DEFAULT_TOP_K,
+    MODE_MAP,
+    MODES,
+    deepseek_interpretation,
+    deepseek_interpretation_async,
+)
+from .retrieval import BM25Index  # noqa: F401
 
-__all__ = ["deepseek_interpretation"]
+__all__ = [
+    "BM25Index",
+    "DEFAULT_CONTEXT_TOKENS",
+    "DEFAULT_PASSAGE_TOKENS",
+    "DEFAULT_SYNTHESIS_TOKENS",
+    "DEFAULT_TOP_K",
+    "MODES",
+    "MODE_MAP",
+    "deepseek_interpretation",
+    "deepseek_interpretation_async",
+    "interpret_documents",
+]
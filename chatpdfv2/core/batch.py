@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from ..services.budget import SCOPE_RUN, BudgetExceededError
+from ..utils import read_md_content
+from .interpreter import deepseek_interpretation
+
+logger = logging.getLogger("chatpdf")
+
+INTERPRETATION_FILENAME = "interpretation_results.md"
+
+
+def interpret_documents(
+    md_paths: Iterable[Path],
+    questions: Sequence[str],
+    *,
+    doc_concurrency: int = 4,
+    on_interpreted: Optional[Callable[[Path], None]] = None,
+    **interpret_options: Any,
+) -> int:
+    """
+    Interpret many markdown documents on a worker pool.
+
+    Documents are picked up as `md_paths` yields them, so interpretation
+    overlaps with MinerU still converting the rest of a batch. Each answer
+    file is written next to its markdown; `on_interpreted` is called from the
+    worker thread once a document is done. Returns the number of documents
+    interpreted successfully.
+
+    Once the run budget is exhausted, queued documents are cancelled and no
+    new ones are started; documents already in progress finish or fail on
+    their own.
+    """
+    progress = _Progress(len(md_paths) if isinstance(md_paths, Sequence) else None)
+    workers = max(1, doc_concurrency)
+    running: dict[Future, Path] = {}
+    exhausted = False
+
+    def _interpret(md_path: Path) -> None:
+        started = time.monotonic()
+        progress.started(md_path)
+        md_content = read_md_content(md_path)
+        if md_content is None:
+            raise RuntimeError(f"Could not read {md_path}")
+        deepseek_interpretation(
+            md_content,
+            questions,
+            md_path.parent / INTERPRETATION_FILENAME,
+            **interpret_options,
+        )
+        if on_interpreted is not None:
+            on_interpreted(md_path)
+        progress.finished(md_path, time.monotonic() - started)
+
+    def _reap(done: Iterable[Future]) -> None:
+        nonlocal exhausted
+        for future in done:
+            md_path = running.pop(future)
+            if future.cancelled():
+                continue
+            exc = future.exception()
+            if exc is not None:
+                progress.failed(md_path, exc)
+                if isinstance(exc, BudgetExceededError) and exc.scope == SCOPE_RUN and not exhausted:
+                    exhausted = True
+                    cancelled = sum(future.cancel() for future in running)
+                    logger.error("Run budget exhausted, skipping %d queued documents", cancelled)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="interpret") as pool:
+        for md_path in md_paths:
+            # Keep at most one queued document per worker so progress stays meaningful.
+            while len(running) >= workers * 2 and not exhausted:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                _reap(done)
+            if exhausted:
+                break
+            running[pool.submit(_interpret, md_path)] = md_path
+        _reap(wait(running).done)
+
+    progress.summary()
+    return progress.succeeded
+
+
+def _label(md_path: Path) -> str:
+    # MinerU names every markdown file full.md; the task directory tells them apart.
+    return f"{md_path.parent.name}/{md_path.name}"
+
+
+class _Progress:
+    """Thread-safe per-document progress log for a batch."""
+
+    def __init__(self, total: Optional[int]) -> None:
+        self.total = total
+        self.succeeded = 0
+        self.failures = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._began = time.monotonic()
+
+    def started(self, md_path: Path) -> None:
+        with self._lock:
+            self.in_flight += 1
+        logger.info("Interpreting %s", _label(md_path))
+
+    def finished(self, md_path: Path, elapsed: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.succeeded += 1
+            done = self.succeeded + self.failures
+        logger.info(
+            "Interpreted %s in %.1fs [%s done, %d in progress]",
+            _label(md_path),
+            elapsed,
+            f"{done}/{self.total}" if self.total is not None else done,
+            self.in_flight,
+        )
+
+    def failed(self, md_path: Path, exc: BaseException) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.failures += 1
+        logger.error("Interpretation of %s failed: %s", md_path, exc)
+
+    def summary(self) -> None:
+        logger.info(
+            "Interpreted %d documents (%d failed) in %.1fs",
+            self.succeeded,
+            self.failures,
+            time.monotonic() - self._began,
+        )
+
+
+__all__ = ["INTERPRETATION_FILENAME", "interpret_documents"]
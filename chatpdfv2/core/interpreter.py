@@ -1,15 +1,56 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
-import time
+from dataclasses import replace
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional, Sequence
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Sequence, TypeVar
 
-from ..services.deepseek_client import create_deepseek_client, post_with_retries_deepseek
-from ..utils import load_existing_answers, split_into_chunks
+from ..services.budget import (
+    SCOPE_CONTEXT,
+    SCOPE_DOCUMENT,
+    Budget,
+    BudgetExceededError,
+    PromptTooLargeError,
+    budget_scope,
+)
+from ..services.deepseek_client import get_async_deepseek_client, post_with_retries_deepseek_async
+from ..services.event_loop import run_sync
+from ..services.usage_ledger import usage_scope
+from ..utils import (
+    DEFAULT_CHUNK_TOKENS,
+    Chunk,
+    chunk_markdown,
+    estimate_tokens,
+    load_existing_answers,
+    truncate_to_tokens,
+)
+from .retrieval import BM25Index
 
 logger = logging.getLogger("chatpdf")
 
+# Interpretation modes
+MODE_MAP = "map"
+MODE_RETRIEVAL = "retrieval"
+MODE_BATCHED = "batched"
+MODES = (MODE_MAP, MODE_RETRIEVAL, MODE_BATCHED)
+
+DEFAULT_TOP_K = 8
+DEFAULT_PASSAGE_TOKENS = 800
+
+# Token budget for the chunk answers merged in one synthesis call; more than
+# that are reduced hierarchically.
+DEFAULT_SYNTHESIS_TOKENS = 24_000
+
+# Token budget for prior answers replayed as context in each prompt, and the
+# smallest share of it worth spending on a cut-short answer.
+DEFAULT_CONTEXT_TOKENS = 4_000
+MIN_CONTEXT_SECTION_TOKENS = 200
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 def deepseek_interpretation(
@@ -18,72 +59,406 @@ def deepseek_interpretation(
     output_path: Path,
     *,
     model: str = "deepseek-chat",
-    chunk_pause_seconds: int = 1,
+    chunk_pause_seconds: int = 0,
+    temperature: float = 1.0,
+    chunk_concurrency: int = 4,
+    stream: bool = False,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    chunk_overlap_tokens: int = 0,
+    mode: str = MODE_MAP,
+    top_k: int = DEFAULT_TOP_K,
+    passage_tokens: int = DEFAULT_PASSAGE_TOKENS,
+    synthesis_tokens: int = DEFAULT_SYNTHESIS_TOKENS,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    max_document_tokens: Optional[int] = None,
+    max_document_cost: Optional[float] = None,
+) -> str:
+    """
+    Blocking wrapper around `deepseek_interpretation_async`, which documents
+    the options.
+
+    The work runs on the shared background event loop, so calls from many
+    threads (e.g. `interpret_documents`) share one client and connection pool.
+    """
+    return run_sync(
+        deepseek_interpretation_async(
+            md_content,
+            questions,
+            output_path,
+            model=model,
+            chunk_pause_seconds=chunk_pause_seconds,
+            temperature=temperature,
+            chunk_concurrency=chunk_concurrency,
+            stream=stream,
+            chunk_tokens=chunk_tokens,
+            chunk_overlap_tokens=chunk_overlap_tokens,
+            mode=mode,
+            top_k=top_k,
+            passage_tokens=passage_tokens,
+            synthesis_tokens=synthesis_tokens,
+            context_tokens=context_tokens,
+            max_document_tokens=max_document_tokens,
+            max_document_cost=max_document_cost,
+        )
+    )
+
+
+async def deepseek_interpretation_async(
+    md_content: Optional[dict],
+    questions: Sequence[str],
+    output_path: Path,
+    *,
+    model: str = "deepseek-chat",
+    chunk_pause_seconds: int = 0,
     temperature: float = 1.0,
+    chunk_concurrency: int = 4,
+    stream: bool = False,
+    chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+    chunk_overlap_tokens: int = 0,
+    mode: str = MODE_MAP,
+    top_k: int = DEFAULT_TOP_K,
+    passage_tokens: int = DEFAULT_PASSAGE_TOKENS,
+    synthesis_tokens: int = DEFAULT_SYNTHESIS_TOKENS,
+    context_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    max_document_tokens: Optional[int] = None,
+    max_document_cost: Optional[float] = None,
 ) -> str:
     """
     Use the DeepSeek API to interpret markdown content.
+
+    In `map` mode the document is cut along its markdown structure into
+    chunks of at most `chunk_tokens` estimated tokens (see `chunk_markdown`),
+    every chunk is asked every question, up to `chunk_concurrency` at a time,
+    and the chunk answers are synthesised. `chunk_pause_seconds` only applies
+    when chunks are sent one by one; request rates are otherwise paced by the
+    shared rate controller in `deepseek_client`. Chunk answers beyond
+    `synthesis_tokens` are merged as a tree, up to `chunk_concurrency` groups
+    at a time.
+
+    In `retrieval` mode the document is cut into small passages of about
+    `passage_tokens` tokens and indexed with BM25 once; each question is then
+    answered in a single call from its `top_k` best-matching passages.
+
+    `batched` mode chunks like `map`, but asks every chunk all pending
+    questions in one call and reads the answers back as JSON, so each chunk
+    is sent once instead of once per question. Chunk answers then only see
+    the answers that existed before this run as context.
+
+    Answers already in `output_path` are given as context, limited to the
+    `context_tokens` most relevant to each question (0 disables context).
+
+    Each answer is appended to `output_path` as soon as it is final. With
+    `stream`, the final answer of each question is echoed to the console
+    token by token while it is generated.
+
+    Every request is sized locally before it is sent. A chunk too large for
+    the model's context window is split in half until it fits, and a
+    synthesis prompt is reduced further. `max_document_tokens` and
+    `max_document_cost` cap this document's spend on top of any run budget;
+    once a budget is exhausted, BudgetExceededError stops the document and
+    the answers written so far are kept.
     """
+    if mode not in MODES:
+        raise ValueError(f"Unknown interpretation mode: {mode}")
     if not md_content:
         logger.info("No content to interpret")
         return ""
 
-    # 创建 DeepSeek 客户端
-    client = create_deepseek_client()
+    # 共享的 DeepSeek 异步客户端
+    client = get_async_deepseek_client()
 
-    existing_answers = load_existing_answers(output_path)
-    new_sections: list[str] = []
+    document_budget = None
+    if max_document_tokens is not None or max_document_cost is not None:
+        document_budget = Budget(
+            SCOPE_DOCUMENT,
+            label=f"Document {output_path.parent.name}",
+            max_tokens=max_document_tokens,
+            max_cost=max_document_cost,
+        )
 
-    for question in questions:
-        if question in existing_answers:
-            logger.info(
-                "Skipping interpretation for question (already present): %s", question
+    with usage_scope(document=str(output_path.parent)), budget_scope(document_budget):
+        # Chunking and file reads run off the event loop, which other documents share.
+        if mode == MODE_RETRIEVAL:
+            chunks = await asyncio.to_thread(
+                chunk_markdown, md_content["content"], max_tokens=passage_tokens
             )
-            continue
-
-        try:
-            context = _format_existing_context(existing_answers)
-            chunk_answers = _interpret_chunks_deepseek(
+            index = await asyncio.to_thread(BM25Index, [chunk.text for chunk in chunks])
+            logger.info("Indexed document as %d passages for retrieval", len(chunks))
+        else:
+            chunks = await asyncio.to_thread(
+                chunk_markdown,
                 md_content["content"],
-                question=question,
-                client=client,
-                model=model,
-                pause_seconds=chunk_pause_seconds,
-                context=context,
-                temperature=temperature,
+                max_tokens=chunk_tokens,
+                overlap_tokens=chunk_overlap_tokens,
+            )
+            logger.info(
+                "Split document into %d chunks (%s tokens)",
+                len(chunks),
+                ", ".join(str(chunk.tokens) for chunk in chunks),
             )
 
-            if len(chunk_answers) == 1:
-                final_answer = chunk_answers[0]
-            else:
-                final_answer = _synthesise_answer_deepseek(
-                    chunk_answers,
-                    question=question,
+        existing_answers = await asyncio.to_thread(load_existing_answers, output_path)
+        if mode == MODE_BATCHED:
+            pending = [question for question in questions if question not in existing_answers]
+            try:
+                batched_answers = await _interpret_chunks_batched_deepseek(
+                    chunks,
+                    questions=pending,
                     client=client,
                     model=model,
-                    context=context,
-                    temperature=0.0,  # 合成答案时使用更低的 temperature
+                    pause_seconds=chunk_pause_seconds,
+                    context=_format_existing_context(
+                        existing_answers,
+                        question="\n".join(pending),
+                        max_tokens=context_tokens,
+                    ),
+                    temperature=temperature,
+                    concurrency=chunk_concurrency,
                 )
+            except Exception as exc:
+                if isinstance(exc, BudgetExceededError) and exc.scope != SCOPE_CONTEXT:
+                    raise
+                # Questions without batched answers are asked chunk by chunk below.
+                logger.exception("Batched chunk requests failed, falling back to map mode: %s", exc)
+                batched_answers = {}
+        new_sections: list[str] = []
+        on_token = _echo_token if stream else None
 
-            new_sections.append(f"## {question}\n\n{final_answer}\n\n")
-            existing_answers[question] = final_answer
-        except Exception as exc:
-            logger.exception("Error processing question '%s': %s", question, exc)
-            new_sections.append(f"## {question}\n\n处理此问题时发生错误。\n\n")
+        for question in questions:
+            if question in existing_answers:
+                logger.info(
+                    "Skipping interpretation for question (already present): %s", question
+                )
+                continue
 
-    result = "".join(new_sections)
-    if result:
-        _append_sections(output_path, result)
-    else:
-        logger.info("No new interpretation sections to write (all questions handled).")
+            if stream:
+                _echo_token(f"\n## {question}\n\n")
+            try:
+                with usage_scope(question=question):
+                    context = _format_existing_context(
+                        existing_answers, question=question, max_tokens=context_tokens
+                    )
+                    if mode == MODE_RETRIEVAL:
+                        final_answer = await _answer_from_passages_deepseek(
+                            chunks,
+                            index,
+                            question=question,
+                            top_k=top_k,
+                            client=client,
+                            model=model,
+                            context=context,
+                            temperature=temperature,
+                            on_token=on_token,
+                        )
+                    elif mode == MODE_BATCHED and question in batched_answers:
+                        final_answer = await _merge_chunk_answers_deepseek(
+                            batched_answers[question],
+                            question=question,
+                            client=client,
+                            model=model,
+                            context=context,
+                            on_token=on_token,
+                            synthesis_tokens=synthesis_tokens,
+                            concurrency=chunk_concurrency,
+                        )
+                    else:
+                        final_answer = await _answer_by_map_deepseek(
+                            chunks,
+                            question=question,
+                            client=client,
+                            model=model,
+                            pause_seconds=chunk_pause_seconds,
+                            context=context,
+                            temperature=temperature,
+                            concurrency=chunk_concurrency,
+                            on_token=on_token,
+                            synthesis_tokens=synthesis_tokens,
+                        )
+
+                section = f"## {question}\n\n{final_answer}\n\n"
+                existing_answers[question] = final_answer
+            except PromptTooLargeError as exc:
+                logger.error("Skipping question '%s': %s", question, exc)
+                section = f"## {question}\n\n处理此问题时发生错误。\n\n"
+            except BudgetExceededError as exc:
+                logger.error("Stopping interpretation of %s: %s", output_path.parent, exc)
+                raise
+            except Exception as exc:
+                logger.exception("Error processing question '%s': %s", question, exc)
+                section = f"## {question}\n\n处理此问题时发生错误。\n\n"
+            if stream:
+                _echo_token("\n")
+
+            # Write each answer as soon as it is final so a crash keeps earlier ones.
+            await asyncio.to_thread(_append_sections, output_path, section)
+            new_sections.append(section)
+
+        result = "".join(new_sections)
+        if not result:
+            logger.info("No new interpretation sections to write (all questions handled).")
 
-    return result
+        return result
 
 
 
 
-def _interpret_chunks_deepseek(
-    content: str,
+async def _answer_by_map_deepseek(
+    chunks: Sequence[Chunk],
+    *,
+    question: str,
+    client: Any,
+    model: str,
+    pause_seconds: int,
+    context: str,
+    temperature: float,
+    concurrency: int,
+    on_token: Optional[Callable[[str], None]],
+    synthesis_tokens: int = DEFAULT_SYNTHESIS_TOKENS,
+) -> str:
+    """
+    Ask every chunk the question, then merge the chunk answers.
+    """
+    chunk_answers = await _interpret_chunks_deepseek(
+        chunks,
+        question=question,
+        client=client,
+        model=model,
+        pause_seconds=pause_seconds,
+        context=context,
+        temperature=temperature,
+        concurrency=concurrency,
+        on_token=on_token,
+    )
+    return await _merge_chunk_answers_deepseek(
+        chunk_answers,
+        question=question,
+        client=client,
+        model=model,
+        context=context,
+        on_token=on_token,
+        streamed=True,
+        synthesis_tokens=synthesis_tokens,
+        concurrency=concurrency,
+    )
+
+
+async def _merge_chunk_answers_deepseek(
+    chunk_answers: Sequence[str],
+    *,
+    question: str,
+    client: Any,
+    model: str,
+    context: str,
+    on_token: Optional[Callable[[str], None]],
+    streamed: bool = False,
+    synthesis_tokens: int = DEFAULT_SYNTHESIS_TOKENS,
+    concurrency: int = 1,
+) -> str:
+    """
+    Turn per-chunk answers into the final answer, synthesising if there are several.
+
+    `streamed` says whether a single chunk answer already went through `on_token`.
+    """
+    if len(chunk_answers) == 1:
+        if on_token is not None and not streamed:
+            on_token(chunk_answers[0])
+        return chunk_answers[0]
+    return await _synthesise_answer_deepseek(
+        chunk_answers,
+        question=question,
+        client=client,
+        model=model,
+        context=context,
+        temperature=0.0,  # 合成答案时使用更低的 temperature
+        on_token=on_token,
+        max_tokens=synthesis_tokens,
+        concurrency=concurrency,
+    )
+
+
+async def _answer_from_passages_deepseek(
+    passages: Sequence[Chunk],
+    index: BM25Index,
+    *,
+    question: str,
+    top_k: int,
+    client: Any,
+    model: str,
+    context: str,
+    temperature: float,
+    on_token: Optional[Callable[[str], None]],
+) -> str:
+    """
+    Answer a question in one call from the passages that best match it.
+
+    Questions sharing no terms with the document (e.g. a Chinese question
+    about an English paper) fall back to the opening passages, where the
+    abstract and introduction live.
+    """
+    selected = index.top_k(question, top_k)
+    if not selected:
+        logger.info("No lexical match for question, using the first %d passages: %s", top_k, question)
+        selected = list(range(min(top_k, len(passages))))
+    logger.info(
+        "Retrieved passages %s of %d for question: %s",
+        ", ".join(str(position + 1) for position in sorted(selected)),
+        len(passages),
+        question,
+    )
+
+    blocks = []
+    for position in sorted(selected):  # keep document order
+        passage = passages[position]
+        label = f"片段 {position + 1}"
+        if passage.section:
+            label += f"（章节：{passage.section}）"
+        blocks.append(f"{label}：\n{passage.text}")
+    user_sections = ["以下是文档中与问题最相关的片段：\n\n" + "\n\n".join(blocks)]
+    if context:
+        user_sections.append(
+            "以下是之前的问题与回答，可作为上下文：\n\n" + context
+        )
+    user_sections.append(f"问题：{question}")
+
+    messages = [
+        {
+            "role": "system",
+            "content": "你是一个学术文献分析专家，请基于提供的文档片段回答问题，请注意对专业名词做出解释；若片段中没有相关信息请明确说明。",
+        },
+        {"role": "user", "content": "\n\n".join(user_sections)},
+    ]
+    try:
+        with usage_scope(stage="retrieval"):
+            response = await post_with_retries_deepseek_async(
+                client=client,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                on_token=on_token,
+            )
+    except PromptTooLargeError as exc:
+        if top_k <= 1:
+            raise
+        logger.warning("%s; retrying with %d passages", exc, top_k // 2)
+        return await _answer_from_passages_deepseek(
+            passages,
+            index,
+            question=question,
+            top_k=top_k // 2,
+            client=client,
+            model=model,
+            context=context,
+            temperature=temperature,
+            on_token=on_token,
+        )
+    if response is None:
+        logger.error("Failed to answer question from retrieved passages: %s", question)
+        return "无法获取答案，API调用失败。"
+    return response.choices[0].message.content.strip()
+
+
+async def _interpret_chunks_deepseek(
+    chunks: Sequence[Chunk],
     *,
     question: str,
     client: Any,
@@ -91,71 +466,358 @@ def _interpret_chunks_deepseek(
     pause_seconds: int,
     context: str,
     temperature: float = 1.0,
+    concurrency: int = 1,
+    on_token: Optional[Callable[[str], None]] = None,
 ) -> list[str]:
     """
     Ask the DeepSeek model the same question across chunked document segments.
+
+    Answers are returned in chunk order regardless of which request finishes first.
+    A chunk too large for the context window is split and gives one answer per
+    piece. `on_token` only streams a single-chunk answer that was not split,
+    which is then the final one.
     """
-    chunk_answers: list[str] = []
-    chunks = split_into_chunks(content)
-    for idx, chunk in enumerate(chunks, start=1):
-        user_sections = []
-        if context:
-            user_sections.append(
-                "以下是之前的问题与回答，可作为上下文：\n\n" + context
-            )
+    ask = partial(
+        _ask_chunk_pieces_deepseek,
+        total=len(chunks),
+        question=question,
+        client=client,
+        model=model,
+        context=context,
+        temperature=temperature,
+        on_token=on_token if len(chunks) == 1 else None,
+    )
+    if concurrency <= 1 or len(chunks) == 1:
+        chunk_answers: list[str] = []
+        for idx, chunk in enumerate(chunks, start=1):
+            chunk_answers.extend(await ask(idx, chunk))
+            if idx < len(chunks):
+                await asyncio.sleep(pause_seconds)
+        return chunk_answers
+
+    answers = await _map_limited(lambda item: ask(*item), enumerate(chunks, start=1), concurrency)
+    return [answer for piece_answers in answers for answer in piece_answers]
+
+
+async def _ask_chunk_deepseek(
+    idx: int,
+    chunk: Chunk,
+    *,
+    total: int,
+    question: str,
+    client: Any,
+    model: str,
+    context: str,
+    temperature: float,
+) -> str:
+    """
+    Answer a question for one chunk; the answers of a split chunk are joined.
+    """
+    answers = await _ask_chunk_pieces_deepseek(
+        idx,
+        chunk,
+        total=total,
+        question=question,
+        client=client,
+        model=model,
+        context=context,
+        temperature=temperature,
+    )
+    return "\n\n".join(answers)
+
+
+async def _ask_chunk_pieces_deepseek(
+    idx: int,
+    chunk: Chunk,
+    *,
+    total: int,
+    question: str,
+    client: Any,
+    model: str,
+    context: str,
+    temperature: float,
+    on_token: Optional[Callable[[str], None]] = None,
+) -> list[str]:
+    """
+    Answer a question for one chunk, splitting it if it does not fit the
+    context window; returns one answer per piece. Pieces never stream, so
+    `on_token` only sees the answer of a chunk that fit whole.
+    """
+    # The system prompt and document chunk come first and stay identical for
+    # every question, so DeepSeek's prefix cache serves them after the first
+    # question; only the context and question after them vary.
+    heading = f"文档片段 {idx}/{total}"
+    if chunk.section:
+        heading += f"（章节：{chunk.section}）"
+    user_sections = [f"{heading}：\n\n{chunk.text}"]
+    if context:
         user_sections.append(
-            f"文档片段 {idx}/{len(chunks)}：\n\n{chunk}"
+            "以下是之前的问题与回答，可作为上下文：\n\n" + context
         )
-        user_sections.append(f"问题：{question}")
-
-        messages = [
-            {
-                "role": "system",
-                "content": "你是一个学术文献分析专家，请基于提供的文档内容回答问题，请注意对专业名词做出解释。",
-            },
-            {
-                "role": "user",
-                "content": "\n\n".join(user_sections),
-            },
-        ]
+    user_sections.append(f"问题：{question}")
 
-        response = post_with_retries_deepseek(
+    messages = [
+        {
+            "role": "system",
+            "content": "你是一个学术文献分析专家，请基于提供的文档内容回答问题，请注意对专业名词做出解释。",
+        },
+        {
+            "role": "user",
+            "content": "\n\n".join(user_sections),
+        },
+    ]
+
+    try:
+        with usage_scope(stage="chunk", chunk=idx):
+            response = await post_with_retries_deepseek_async(
+                client=client,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                on_token=on_token,
+            )
+    except PromptTooLargeError as exc:
+        # Splitting only helps if the chunk, not the question or context, is the excess.
+        pieces = _split_chunk(chunk) if exc.tokens - chunk.tokens < exc.limit else []
+        if len(pieces) < 2:
+            raise
+        logger.warning("Chunk %s/%s: %s; splitting it into %d pieces", idx, total, exc, len(pieces))
+        ask = partial(
+            _ask_chunk_pieces_deepseek,
+            idx,
+            total=total,
+            question=question,
             client=client,
             model=model,
-            messages=messages,
+            context=context,
             temperature=temperature,
         )
+        answers = await _map_limited(ask, pieces, len(pieces))
+        return [answer for piece_answers in answers for answer in piece_answers]
+
+    if response is None:
+        logger.warning(
+            "No response for chunk %s/%s for question: %s",
+            idx,
+            total,
+            question,
+        )
+        return ["[请求失败，未获得该片段回答]"]
+
+    text = response.choices[0].message.content.strip()
+    logger.info("Chunk %s/%s answered for question: %s", idx, total, question)
+    logger.debug("Chunk %s preview: %s", idx, text[:120].replace("\n", " "))
+    return [text]
+
+
+async def _interpret_chunks_batched_deepseek(
+    chunks: Sequence[Chunk],
+    *,
+    questions: Sequence[str],
+    client: Any,
+    model: str,
+    pause_seconds: int,
+    context: str,
+    temperature: float,
+    concurrency: int,
+) -> Dict[str, list[str]]:
+    """
+    Ask each chunk all `questions` in one call; return chunk answers per question.
+
+    Answers keep chunk order, like `_interpret_chunks_deepseek`.
+    """
+    if not questions:
+        return {}
+    ask = partial(
+        _ask_chunk_batched_deepseek,
+        total=len(chunks),
+        questions=questions,
+        client=client,
+        model=model,
+        context=context,
+        temperature=temperature,
+    )
+    if concurrency <= 1 or len(chunks) == 1:
+        per_chunk: list[list[str]] = []
+        for idx, chunk in enumerate(chunks, start=1):
+            per_chunk.append(await ask(idx, chunk))
+            if idx < len(chunks):
+                await asyncio.sleep(pause_seconds)
+    else:
+        per_chunk = await _map_limited(lambda item: ask(*item), enumerate(chunks, start=1), concurrency)
+    return {
+        question: [answers[position] for answers in per_chunk]
+        for position, question in enumerate(questions)
+    }
+
+
+async def _ask_chunk_batched_deepseek(
+    idx: int,
+    chunk: Chunk,
+    *,
+    total: int,
+    questions: Sequence[str],
+    client: Any,
+    model: str,
+    context: str,
+    temperature: float,
+) -> list[str]:
+    """
+    Answer all questions for one chunk with a single JSON-mode request.
 
-        if response is None:
-            chunk_answers.append("[请求失败，未获得该片段回答]")
-            logger.warning(
-                "No response for chunk %s/%s for question: %s",
+    Falls back to one request per question if the reply is not usable JSON,
+    e.g. when it was cut off by the output limit, or if the prompt does not
+    fit the context window.
+    """
+    if len(questions) == 1:
+        return [
+            await _ask_chunk_deepseek(
                 idx,
-                len(chunks),
-                question,
+                chunk,
+                total=total,
+                question=questions[0],
+                client=client,
+                model=model,
+                context=context,
+                temperature=temperature,
             )
-        else:
-            text = response.choices[0].message.content.strip()
-            chunk_answers.append(text)
-            logger.info("Chunk %s/%s answered for question: %s", idx, len(chunks), question)
-            logger.debug("Chunk %s preview: %s", idx, text[:120].replace("\n", " "))
+        ]
+
+    # Same cache-friendly order as _ask_chunk_deepseek: chunk first, questions last.
+    heading = f"文档片段 {idx}/{total}"
+    if chunk.section:
+        heading += f"（章节：{chunk.section}）"
+    user_sections = [f"{heading}：\n\n{chunk.text}"]
+    if context:
+        user_sections.append(
+            "以下是之前的问题与回答，可作为上下文：\n\n" + context
+        )
+    numbered = "\n".join(f"{number}. {question}" for number, question in enumerate(questions, start=1))
+    user_sections.append(
+        f"请逐一回答以下问题：\n{numbered}\n\n"
+        + '以 JSON 对象输出，键为问题编号（字符串），值为该问题的回答（Markdown 文本），例如 {"1": "...", "2": "..."}。'
+    )
 
-        time.sleep(pause_seconds)
-    return chunk_answers
+    messages = [
+        {
+            "role": "system",
+            "content": "你是一个学术文献分析专家，请基于提供的文档内容回答问题，请注意对专业名词做出解释。请只输出 JSON。",
+        },
+        {"role": "user", "content": "\n\n".join(user_sections)},
+    ]
+    try:
+        with usage_scope(stage="batched", chunk=idx):
+            response = await post_with_retries_deepseek_async(
+                client=client,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                response_format={"type": "json_object"},
+            )
+    except PromptTooLargeError as exc:
+        # The per-question path below splits the chunk until it fits.
+        logger.warning("Chunk %s/%s: %s", idx, total, exc)
+        response = None
+    answers = _parse_batched_answers(response, len(questions))
+    if answers is None:
+        logger.warning(
+            "Chunk %s/%s: batched answer unusable, asking %d questions separately",
+            idx,
+            total,
+            len(questions),
+        )
+        return list(
+            await asyncio.gather(
+                *(
+                    _ask_chunk_deepseek(
+                        idx,
+                        chunk,
+                        total=total,
+                        question=question,
+                        client=client,
+                        model=model,
+                        context=context,
+                        temperature=temperature,
+                    )
+                    for question in questions
+                )
+            )
+        )
+
+    logger.info("Chunk %s/%s answered %d questions in one request", idx, total, len(questions))
+    return answers
+
+
+def _parse_batched_answers(response: Any, count: int) -> Optional[list[str]]:
+    """
+    Read `count` answers keyed "1".."count" from a JSON-mode response.
+    """
+    if response is None:
+        return None
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        return None
+    try:
+        payload = json.loads(choice.message.content or "")
+    except ValueError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    keys = [str(number) for number in range(1, count + 1)]
+    if not any(key in payload for key in keys):
+        return None
+    answers: list[str] = []
+    for key in keys:
+        answer = payload.get(key)
+        if isinstance(answer, (list, dict)):
+            answer = json.dumps(answer, ensure_ascii=False)
+        answers.append(str(answer).strip() if answer else "[该片段未回答此问题]")
+    return answers
 
 
-def _synthesise_answer_deepseek(
-    chunk_answers: Iterable[str],
+async def _synthesise_answer_deepseek(
+    chunk_answers: Sequence[str],
     *,
     question: str,
     client: Any,
     model: str,
     context: str,
     temperature: float = 0.0,
+    on_token: Optional[Callable[[str], None]] = None,
+    max_tokens: int = DEFAULT_SYNTHESIS_TOKENS,
+    concurrency: int = 1,
 ) -> str:
     """
     Reconcile multiple chunk answers into a single, coherent response using DeepSeek.
+
+    When the answers do not fit in one `max_tokens` prompt, they are merged as
+    a tree: packed into groups within the budget, each group reduced to one
+    partial answer (up to `concurrency` groups at a time), and so on until a
+    single prompt holds them all. Only that last call streams to `on_token`.
+    If that prompt still exceeds the model's context window, the answers are
+    reduced again with half the budget.
     """
+    answers = list(chunk_answers)
+    level = 0
+    while len(answers) > 1 and _answers_tokens(answers) > max_tokens:
+        groups = _pack_answers(answers, max_tokens)
+        level += 1
+        logger.info(
+            "Reducing %d chunk answers in %d groups (level %d) for question: %s",
+            len(answers),
+            len(groups),
+            level,
+            question,
+        )
+        reduce = partial(
+            _reduce_group_deepseek,
+            question=question,
+            client=client,
+            model=model,
+            temperature=temperature,
+        )
+        answers = await _map_limited(reduce, groups, concurrency)
+
     context_block = (
         "以下是之前的问题与回答，可作为上下文：\n\n"
         + context
@@ -168,7 +830,7 @@ def _synthesise_answer_deepseek(
         context_block
         + "请基于下面各片段回答，综合出一个简洁、连贯且基于文档的最终回答；"
         + "若文档未提供信息请明确说明。\n\n"
-        + "\n\n---\n\n".join(chunk_answers)
+        + "\n\n---\n\n".join(answers)
     )
     
     messages = [
@@ -176,12 +838,30 @@ def _synthesise_answer_deepseek(
         {"role": "user", "content": f"{synth_prompt}\n\n问题：{question}"},
     ]
 
-    response = post_with_retries_deepseek(
-        client=client,
-        model=model,
-        messages=messages,
-        temperature=temperature,
-    )
+    try:
+        with usage_scope(stage="synthesis"):
+            response = await post_with_retries_deepseek_async(
+                client=client,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                on_token=on_token,
+            )
+    except PromptTooLargeError as exc:
+        if len(answers) < 2:
+            raise
+        logger.warning("%s; reducing chunk answers further", exc)
+        return await _synthesise_answer_deepseek(
+            answers,
+            question=question,
+            client=client,
+            model=model,
+            context=context,
+            temperature=temperature,
+            on_token=on_token,
+            max_tokens=min(max_tokens, _answers_tokens(answers)) // 2,
+            concurrency=concurrency,
+        )
     
     if response:
         final_answer = response.choices[0].message.content.strip()
@@ -192,6 +872,123 @@ def _synthesise_answer_deepseek(
     return "无法获取答案，API调用失败。"
 
 
+async def _reduce_group_deepseek(
+    group: Sequence[str],
+    *,
+    question: str,
+    client: Any,
+    model: str,
+    temperature: float,
+) -> str:
+    """
+    Merge one group of chunk answers into a partial answer for the next level.
+    """
+    if len(group) == 1:
+        return group[0]
+    messages = [
+        {"role": "system", "content": "你负责把分片回答合并成阶段性答案。"},
+        {
+            "role": "user",
+            "content": (
+                "下面是同一文档中连续几个片段对同一问题的回答。请合并为一个回答，"
+                + "保留所有基于文档的具体信息并去除重复；这些片段只是文档的一部分，"
+                + "未提及的内容不要断言文档中不存在。\n\n"
+                + "\n\n---\n\n".join(group)
+                + f"\n\n问题：{question}"
+            ),
+        },
+    ]
+    try:
+        with usage_scope(stage="reduce"):
+            response = await post_with_retries_deepseek_async(
+                client=client,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+            )
+    except PromptTooLargeError as exc:
+        logger.warning("%s", exc)
+        response = None
+    if response is None:
+        # Pass the group up unmerged rather than dropping its content.
+        logger.warning("Failed to merge %d chunk answers for question: %s", len(group), question)
+        return "\n\n".join(group)
+    return response.choices[0].message.content.strip()
+
+
+def _split_chunk(chunk: Chunk) -> list[Chunk]:
+    """
+    Cut a chunk that does not fit the context window into halves.
+
+    Pieces keep the section of the chunk when they start mid-section; a
+    single piece means the chunk cannot be cut further.
+    """
+    pieces = chunk_markdown(chunk.text, max_tokens=max(1, chunk.tokens // 2))
+    return [
+        replace(piece, section_path=piece.section_path or chunk.section_path)
+        for piece in pieces
+    ]
+
+
+def _answers_tokens(answers: Sequence[str]) -> int:
+    return sum(estimate_tokens(answer) for answer in answers)
+
+
+def _pack_answers(answers: Sequence[str], max_tokens: int) -> list[list[str]]:
+    """
+    Pack consecutive answers into groups of at most `max_tokens` tokens.
+
+    Every group holds at least two answers (when there are two left), so each
+    level shrinks the list even if single answers are near the budget.
+    """
+    groups: list[list[str]] = []
+    current: list[str] = []
+    size = 0
+    for answer in answers:
+        tokens = estimate_tokens(answer)
+        if len(current) >= 2 and size + tokens > max_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(answer)
+        size += tokens
+    if len(current) == 1 and groups:
+        groups[-1].append(current[0])
+    elif current:
+        groups.append(current)
+    return groups
+
+
+async def _map_limited(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    concurrency: int,
+) -> list[R]:
+    """
+    Await `func(item)` for every item, at most `concurrency` at a time.
+
+    Results keep the order of `items` regardless of which finishes first.
+    If one item fails, the others are cancelled rather than left running on
+    the shared loop.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _run(item: T) -> R:
+        async with semaphore:
+            return await func(item)
+
+    tasks = [asyncio.ensure_future(_run(item)) for item in items]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def _echo_token(text: str) -> None:
+    print(text, end="", flush=True)
+
+
 def _append_sections(output_path: Path, new_sections: str) -> None:
     """
     Append newly generated sections to the target markdown file.
@@ -208,19 +1005,67 @@ def _append_sections(output_path: Path, new_sections: str) -> None:
         logger.error("Error saving interpretation: %s", exc)
 
 
-def _format_existing_context(existing_answers: Dict[str, str]) -> str:
+def _format_existing_context(
+    existing_answers: Dict[str, str],
+    *,
+    question: str = "",
+    max_tokens: Optional[int] = None,
+) -> str:
     """
     Turn existing question-answer pairs into a markdown block used as context.
+
+    With `max_tokens`, the block is kept within that many estimated tokens:
+    pairs are ranked by BM25 relevance to `question` (most recent first on
+    ties), taken whole while they fit and cut short once they no longer do.
+    Kept pairs stay in their original order.
     """
     if not existing_answers:
         return ""
 
     sections: list[str] = []
-    for question, answer in existing_answers.items():
-        if not question or not answer:
+    for prior_question, answer in existing_answers.items():
+        if not prior_question or not answer:
             continue
-        sections.append(f"### {question}\n{answer}")
-    return "\n\n".join(sections)
+        sections.append(f"### {prior_question}\n{answer}")
+    if max_tokens is None:
+        return "\n\n".join(sections)
+    if max_tokens <= 0:
+        return ""
+
+    sizes = [estimate_tokens(section) for section in sections]
+    if sum(sizes) <= max_tokens:
+        return "\n\n".join(sections)
+
+    scores = BM25Index(sections).scores(question)
+    ranked = sorted(range(len(sections)), key=lambda position: (-scores[position], -position))
+    kept: dict[int, str] = {}
+    remaining = max_tokens
+    for position in ranked:
+        if sizes[position] <= remaining:
+            kept[position] = sections[position]
+            remaining -= sizes[position]
+        elif remaining >= MIN_CONTEXT_SECTION_TOKENS:
+            kept[position] = truncate_to_tokens(sections[position], remaining)
+            remaining -= estimate_tokens(kept[position])
+    logger.debug(
+        "Context: kept %d of %d prior answers (%d cut short) within %d tokens",
+        len(kept),
+        len(sections),
+        sum(1 for position, text in kept.items() if text != sections[position]),
+        max_tokens,
+    )
+    return "\n\n".join(kept[position] for position in sorted(kept))
 
 
-__all__ = ["deepseek_interpretation"]
+__all__ = [
+    "DEFAULT_CONTEXT_TOKENS",
+    "DEFAULT_PASSAGE_TOKENS",
+    "DEFAULT_SYNTHESIS_TOKENS",
+    "DEFAULT_TOP_K",
+    "MODES",
+    "MODE_BATCHED",
+    "MODE_MAP",
+    "MODE_RETRIEVAL",
+    "deepseek_interpretation",
+    "deepseek_interpretation_async",
+]
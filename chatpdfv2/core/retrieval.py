@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import Sequence
+
+_WORD = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+_CJK_RUN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lexical terms for BM25: lower-cased Latin words and digits, plus
+    single characters and bigrams of CJK runs (which have no spaces).
+    """
+    lowered = text.lower()
+    terms = _WORD.findall(lowered)
+    for run in _CJK_RUN.findall(lowered):
+        terms.extend(run)
+        terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over a fixed list of passages.
+    """
+
+    def __init__(self, passages: Sequence[str], *, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._terms = [Counter(tokenize(passage)) for passage in passages]
+        self._lengths = [sum(terms.values()) for terms in self._terms]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        document_frequency: Counter[str] = Counter()
+        for terms in self._terms:
+            document_frequency.update(terms.keys())
+        count = len(self._terms)
+        self._idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def scores(self, query: str) -> list[float]:
+        query_terms = set(tokenize(query))
+        results = []
+        for terms, length in zip(self._terms, self._lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self._average_length or 1.0))
+            score = 0.0
+            for term in query_terms:
+                frequency = terms.get(term)
+                if frequency:
+                    score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            results.append(score)
+        return results
+
+    def top_k(self, query: str, k: int) -> list[int]:
+        """
+        Indices of the `k` best passages, best first. Passages with no term
+        in common with the query are never returned.
+        """
+        scores = self.scores(query)
+        ranked = sorted(
+            (index for index, score in enumerate(scores) if score > 0),
+            key=lambda index: (-scores[index], index),
+        )
+        return ranked[:k]
+
+
+__all__ = ["BM25Index", "tokenize"]
@@ -3,13 +3,51 @@ from __future__ import annotations
 import argparse
 import logging
 from pathlib import Path
-from typing import Optional, Sequence
+from typing import Iterable, Optional, Sequence
 
-from ..config import get_settings
-from ..core import deepseek_interpretation
+from ..config import Settings, get_settings
+from ..core import (
+    DEFAULT_CONTEXT_TOKENS,
+    DEFAULT_PASSAGE_TOKENS,
+    DEFAULT_SYNTHESIS_TOKENS,
+    DEFAULT_TOP_K,
+    MODE_MAP,
+    MODES,
+    deepseek_interpretation,
+    interpret_documents,
+)
 from ..logging import configure_logging
-from ..services import process_pdf_via_mineru, process_local_files_via_mineru, process_urls_via_mineru, get_batch_results
-from ..utils import read_md_content
+from ..services import (
+    Budget,
+    BudgetExceededError,
+    CompletionCache,
+    ConversionCache,
+    HedgePolicy,
+    JobJournal,
+    MINERU_BATCH_LIMIT,
+    MinerUClient,
+    UsageLedger,
+    close_async_deepseek_client,
+    get_batch_results,
+    get_hedge_policy,
+    get_usage_totals,
+    iter_local_files_via_mineru,
+    iter_resumed_run,
+    iter_urls_via_mineru,
+    process_pdf_via_mineru,
+    run_sync,
+    set_completion_cache,
+    set_hedge_policy,
+    set_max_inflight_requests,
+    set_run_budget,
+    set_usage_ledger,
+    stop_event_loop,
+)
+from ..services.budget import SCOPE_RUN
+from ..services.deepseek_client import DEFAULT_MAX_INFLIGHT_REQUESTS
+from ..services.hedging import DEFAULT_HEDGE_MAX_RATIO, DEFAULT_HEDGE_PERCENTILE
+from ..services.journal import RUN_MODE_FILES, RUN_MODE_URL, RUN_MODE_URLS, JournalRun
+from ..utils import DEFAULT_CHUNK_TOKENS, read_md_content
 
 QUESTIONS = [
     (
@@ -19,6 +57,11 @@ QUESTIONS = [
     )
 ]
 
+CONVERSION_CACHE_DIRNAME = ".mineru_cache"
+JOURNAL_FILENAME = ".chatpdf_journal.sqlite3"
+COMPLETION_CACHE_FILENAME = ".deepseek_cache.sqlite3"
+USAGE_LEDGER_FILENAME = ".deepseek_usage.sqlite3"
+
 
 def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -49,6 +92,16 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         const="files/batch_urls.txt",
         help="Path to a text file containing URLs of PDF files to process in batch with MinerU (default: files/batch_urls.txt).",
     )
+    input_group.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume the most recent interrupted MinerU run from the local job journal.",
+    )
+    input_group.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print DeepSeek usage, latency and cost per document and per day from the usage ledger, then exit.",
+    )
     
     parser.add_argument(
         "--mineru-timeout",
@@ -61,13 +114,203 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
         default="vlm",
         help="MinerU model version to use (default: vlm).",
     )
+    parser.add_argument(
+        "--mineru-pool-size",
+        type=int,
+        default=16,
+        help="Maximum pooled keep-alive connections per host for MinerU traffic (default: 16).",
+    )
+    parser.add_argument(
+        "--download-buffer-kb",
+        type=int,
+        default=1024,
+        help="Read buffer size for result and PDF downloads in KB (default: 1024).",
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=4,
+        help="Number of finished batch results downloaded in parallel (default: 4).",
+    )
+    parser.add_argument(
+        "--upload-workers",
+        type=int,
+        default=4,
+        help="Number of local files uploaded to MinerU in parallel for --batch-dir (default: 4).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=MINERU_BATCH_LIMIT,
+        help=f"Files per MinerU batch; larger inputs are split automatically (default/max: {MINERU_BATCH_LIMIT}).",
+    )
+    parser.add_argument(
+        "--max-inflight-batches",
+        type=int,
+        default=2,
+        help="Number of MinerU batches kept submitted at the same time (default: 2).",
+    )
+    parser.add_argument(
+        "--skip-original-pdf",
+        action="store_true",
+        help="Do not keep a copy of the source PDF for --pdf-url and --batch-urls-file inputs.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always resubmit PDFs to MinerU instead of reusing earlier conversions.",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=2048,
+        help="Size cap of the local MinerU conversion cache in MB (default: 2048).",
+    )
     
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Always call DeepSeek instead of reusing identical earlier completions.",
+    )
+    parser.add_argument(
+        "--llm-cache-max-mb",
+        type=int,
+        default=256,
+        help="Size cap of the local DeepSeek completion cache in MB (default: 256).",
+    )
+    parser.add_argument(
+        "--prometheus-textfile",
+        help="Write DeepSeek usage metrics from the usage ledger to this file in Prometheus text format when the run ends.",
+    )
+    parser.add_argument(
+        "--prometheus-per-document",
+        action="store_true",
+        help="Also export per-document series with --prometheus-textfile (one label value per document).",
+    )
     parser.add_argument(
         "--temperature",
         type=float,
         default=1.0,
         help="Temperature for DeepSeek model (default: 1.0).",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream answers to the console as they are generated (--md-path and --pdf-url only).",
+    )
+    parser.add_argument(
+        "--doc-concurrency",
+        type=int,
+        default=4,
+        help="Number of documents interpreted in parallel in batch modes (default: 4).",
+    )
+    parser.add_argument(
+        "--max-inflight-requests",
+        type=int,
+        default=DEFAULT_MAX_INFLIGHT_REQUESTS,
+        help=(
+            "Global cap on concurrent DeepSeek requests across documents and chunks; the actual "
+            "concurrency adapts below it to rate limits and latency (default: %(default)s)."
+        ),
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help=(
+            "Send a duplicate of a DeepSeek request that runs past the latency percentile "
+            "of recent requests and keep whichever answers first."
+        ),
+    )
+    parser.add_argument(
+        "--hedge-percentile",
+        type=float,
+        default=DEFAULT_HEDGE_PERCENTILE * 100,
+        help="Latency percentile after which a request is hedged (default: %(default).0f).",
+    )
+    parser.add_argument(
+        "--hedge-max-percent",
+        type=float,
+        default=DEFAULT_HEDGE_MAX_RATIO * 100,
+        help="Maximum share of requests that may be hedged, in percent (default: %(default).0f).",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=DEFAULT_CHUNK_TOKENS,
+        help=f"Token budget per document chunk sent to DeepSeek (default: {DEFAULT_CHUNK_TOKENS}).",
+    )
+    parser.add_argument(
+        "--chunk-overlap-tokens",
+        type=int,
+        default=0,
+        help="Tokens of trailing context repeated at the start of the next chunk (default: 0).",
+    )
+    parser.add_argument(
+        "--chunk-concurrency",
+        type=int,
+        default=4,
+        help="Number of document chunks sent to DeepSeek at the same time per question (default: 4).",
+    )
+    parser.add_argument(
+        "--interpretation-mode",
+        choices=MODES,
+        default=MODE_MAP,
+        help=(
+            "map: ask every chunk every question; retrieval: answer each question from its "
+            "best-matching passages; batched: ask each chunk all questions in one JSON request "
+            "(default: map)."
+        ),
+    )
+    parser.add_argument(
+        "--top-k",
+        type=int,
+        default=DEFAULT_TOP_K,
+        help=f"Passages retrieved per question in retrieval mode (default: {DEFAULT_TOP_K}).",
+    )
+    parser.add_argument(
+        "--passage-tokens",
+        type=int,
+        default=DEFAULT_PASSAGE_TOKENS,
+        help=f"Token size of the passages indexed in retrieval mode (default: {DEFAULT_PASSAGE_TOKENS}).",
+    )
+    parser.add_argument(
+        "--synthesis-tokens",
+        type=int,
+        default=DEFAULT_SYNTHESIS_TOKENS,
+        help=(
+            "Token budget of chunk answers merged in one synthesis call; larger sets are "
+            f"merged hierarchically in parallel groups (default: {DEFAULT_SYNTHESIS_TOKENS})."
+        ),
+    )
+    parser.add_argument(
+        "--context-tokens",
+        type=int,
+        default=DEFAULT_CONTEXT_TOKENS,
+        help=(
+            "Token budget for earlier answers sent as context with each question; the most "
+            f"relevant are kept, 0 disables context (default: {DEFAULT_CONTEXT_TOKENS})."
+        ),
+    )
+    parser.add_argument(
+        "--max-run-tokens",
+        type=int,
+        help="Stop sending DeepSeek requests once this run has used this many tokens.",
+    )
+    parser.add_argument(
+        "--max-run-cost",
+        type=float,
+        help="Stop sending DeepSeek requests once this run has cost this much, in yuan.",
+    )
+    parser.add_argument(
+        "--max-document-tokens",
+        type=int,
+        help="Stop interpreting a document once it has used this many tokens.",
+    )
+    parser.add_argument(
+        "--max-document-cost",
+        type=float,
+        help="Stop interpreting a document once it has cost this much, in yuan.",
+    )
     
     return parser.parse_args(args=argv)
 
@@ -79,10 +322,122 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
 
     args = parse_args(argv)
     settings = get_settings()
+    set_max_inflight_requests(args.max_inflight_requests)
+    if args.hedge:
+        set_hedge_policy(
+            HedgePolicy(
+                percentile=args.hedge_percentile / 100,
+                max_ratio=args.hedge_max_percent / 100,
+            )
+        )
+    if args.max_run_tokens is not None or args.max_run_cost is not None:
+        set_run_budget(
+            Budget(SCOPE_RUN, label="Run", max_tokens=args.max_run_tokens, max_cost=args.max_run_cost)
+        )
     files_root = settings.files_root
 
     files_root.mkdir(parents=True, exist_ok=True)
 
+    usage_ledger = UsageLedger(files_root / USAGE_LEDGER_FILENAME)
+    if args.stats:
+        try:
+            _print_stats(usage_ledger)
+            if args.prometheus_textfile:
+                usage_ledger.export_prometheus(
+                    Path(args.prometheus_textfile), per_document=args.prometheus_per_document
+                )
+        finally:
+            usage_ledger.close()
+        return 0
+    set_usage_ledger(usage_ledger)
+
+    mineru_client: Optional[MinerUClient] = None
+    if settings.mineru_api_key:
+        mineru_client = MinerUClient(
+            settings.mineru_api_key,
+            pool_maxsize=args.mineru_pool_size,
+            download_chunk_size=args.download_buffer_kb * 1024,
+        )
+    conversion_cache: Optional[ConversionCache] = None
+    if settings.mineru_api_key and not args.no_cache:
+        conversion_cache = ConversionCache(
+            files_root / CONVERSION_CACHE_DIRNAME,
+            max_bytes=args.cache_max_mb * 1024 * 1024,
+        )
+    journal: Optional[JobJournal] = None
+    if settings.mineru_api_key:
+        journal = JobJournal(files_root / JOURNAL_FILENAME)
+    completion_cache: Optional[CompletionCache] = None
+    if not args.no_llm_cache:
+        completion_cache = CompletionCache(
+            files_root / COMPLETION_CACHE_FILENAME,
+            max_bytes=args.llm_cache_max_mb * 1024 * 1024,
+        )
+        set_completion_cache(completion_cache)
+    try:
+        return _run(args, settings, mineru_client, conversion_cache, journal, logger)
+    finally:
+        if mineru_client is not None:
+            mineru_client.close()
+        if conversion_cache is not None:
+            conversion_cache.close()
+        if journal is not None:
+            journal.close()
+        if completion_cache is not None:
+            set_completion_cache(None)
+            completion_cache.close()
+        run_sync(close_async_deepseek_client())
+        stop_event_loop()
+        _log_usage_summary(logger)
+        set_usage_ledger(None)
+        if args.prometheus_textfile:
+            try:
+                usage_ledger.export_prometheus(
+                    Path(args.prometheus_textfile), per_document=args.prometheus_per_document
+                )
+            except OSError as exc:
+                logger.error("Could not write Prometheus metrics: %s", exc)
+        usage_ledger.close()
+
+
+def _run(
+    args: argparse.Namespace,
+    settings: Settings,
+    mineru_client: Optional[MinerUClient],
+    conversion_cache: Optional[ConversionCache],
+    journal: Optional[JobJournal],
+    logger: logging.Logger,
+) -> int:
+    files_root = settings.files_root
+
+    # Handle resuming an interrupted run
+    if args.resume:
+        if not settings.mineru_api_key:
+            raise ValueError("MINERU_API_KEY environment variable is not set")
+        run = journal.latest_unfinished_run()
+        if run is None:
+            print("No interrupted run to resume.")
+            return 0
+        logger.info("Resuming journal run %s (%s)", run.run_id, run.mode)
+        md_paths = iter_resumed_run(
+            run,
+            output_root=files_root,
+            api_key=settings.mineru_api_key,
+            timeout_seconds=args.mineru_timeout,
+            download_workers=args.download_workers,
+            upload_workers=args.upload_workers,
+            batch_size=args.batch_size,
+            max_in_flight_batches=args.max_inflight_batches,
+            client=mineru_client,
+            cache=conversion_cache,
+            fetch_original=not args.skip_original_pdf,
+        )
+        processed = _interpret_documents(md_paths, args, logger, run=run)
+        run.finish_if_complete()
+        logger.info("Resumed run completed. Interpreted %d markdown files", processed)
+        logger.info("ChatPDFv2 CLI process finished")
+        return 0
+
     # Handle batch ID query
     if args.batch_id:
         if not settings.mineru_api_key:
@@ -91,6 +446,7 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         batch_results = get_batch_results(
             batch_id=args.batch_id,
             api_key=settings.mineru_api_key,
+            client=mineru_client,
         )
         logger.info("Batch results: %s", batch_results)
         print(f"Batch {args.batch_id} status: {batch_results.get('status')}")
@@ -133,70 +489,68 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
         logger.info("Processing %d URLs from file: %s", len(urls), urls_file)
     
     if file_paths:
-        md_paths = process_local_files_via_mineru(
+        run = journal.start_run(
+            RUN_MODE_FILES,
+            [str(path) for path in file_paths],
+            model_version=args.model_version,
+        )
+        md_paths = iter_local_files_via_mineru(
             file_paths=file_paths,
             output_root=files_root,
             api_key=settings.mineru_api_key,
             timeout_seconds=args.mineru_timeout,
             model_version=args.model_version,
+            download_workers=args.download_workers,
+            batch_size=args.batch_size,
+            max_in_flight_batches=args.max_inflight_batches,
+            upload_workers=args.upload_workers,
+            client=mineru_client,
+            cache=conversion_cache,
+            journal=run,
         )
-        logger.info("Batch processing completed. Generated %d markdown files", len(md_paths))
-        for md_path in md_paths:
-            logger.info("Processed: %s", md_path)
-        
-        # Process all markdown files for interpretation
-        for md_path in md_paths:
-            md_content = read_md_content(md_path)
-            interpretation_output = md_path.parent / "interpretation_results.md"
-            
-            logger.info("Using DeepSeek for interpretation of %s", md_path.name)
-            deepseek_interpretation(
-                md_content,
-                QUESTIONS,
-                interpretation_output,
-                temperature=args.temperature,
-            )
-        
+        processed = _interpret_documents(md_paths, args, logger, run=run)
+        run.finish_if_complete()
+        logger.info("Batch processing completed. Generated %d markdown files", processed)
         logger.info("ChatPDFv2 CLI process finished")
         return 0
     
     elif urls:
-        md_paths = process_urls_via_mineru(
+        run = journal.start_run(RUN_MODE_URLS, urls, model_version=args.model_version)
+        md_paths = iter_urls_via_mineru(
             urls=urls,
             output_root=files_root,
             api_key=settings.mineru_api_key,
             timeout_seconds=args.mineru_timeout,
             model_version=args.model_version,
+            download_workers=args.download_workers,
+            batch_size=args.batch_size,
+            max_in_flight_batches=args.max_inflight_batches,
+            client=mineru_client,
+            cache=conversion_cache,
+            journal=run,
+            fetch_original=not args.skip_original_pdf,
         )
-        logger.info("URL batch processing completed. Generated %d markdown files", len(md_paths))
-        for md_path in md_paths:
-            logger.info("Processed: %s", md_path)
-        
-        # Process all markdown files for interpretation
-        for md_path in md_paths:
-            md_content = read_md_content(md_path)
-            interpretation_output = md_path.parent / "interpretation_results.md"
-            
-            logger.info("Using DeepSeek for interpretation of %s", md_path.name)
-            deepseek_interpretation(
-                md_content,
-                QUESTIONS,
-                interpretation_output,
-                temperature=args.temperature,
-            )
-        
+        processed = _interpret_documents(md_paths, args, logger, run=run)
+        run.finish_if_complete()
+        logger.info("URL batch processing completed. Generated %d markdown files", processed)
         logger.info("ChatPDFv2 CLI process finished")
         return 0
     
     # Handle single file processing
-    elif args.pdf_url:
+    run: Optional[JournalRun] = None
+    if args.pdf_url:
         if not settings.mineru_api_key:
             raise ValueError("MINERU_API_KEY environment variable is not set")
+        run = journal.start_run(RUN_MODE_URL, [args.pdf_url], model_version=args.model_version)
         md_path = process_pdf_via_mineru(
             args.pdf_url,
             output_root=files_root,
             api_key=settings.mineru_api_key,
             timeout_seconds=args.mineru_timeout,
+            client=mineru_client,
+            cache=conversion_cache,
+            journal=run,
+            fetch_original=not args.skip_original_pdf,
         )
     elif args.md_path:
         md_path = Path(args.md_path)
@@ -208,14 +562,120 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
     interpretation_output = md_path.parent / "interpretation_results.md"
 
     logger.info("Using DeepSeek for interpretation")
-    deepseek_interpretation(
-        md_content,
-        QUESTIONS,
-        interpretation_output,
-        temperature=args.temperature,
-    )
+    try:
+        deepseek_interpretation(
+            md_content,
+            QUESTIONS,
+            interpretation_output,
+            temperature=args.temperature,
+            chunk_concurrency=args.chunk_concurrency,
+            chunk_tokens=args.chunk_tokens,
+            chunk_overlap_tokens=args.chunk_overlap_tokens,
+            mode=args.interpretation_mode,
+            top_k=args.top_k,
+            passage_tokens=args.passage_tokens,
+            synthesis_tokens=args.synthesis_tokens,
+            context_tokens=args.context_tokens,
+            max_document_tokens=args.max_document_tokens,
+            max_document_cost=args.max_document_cost,
+            stream=args.stream,
+        )
+    except BudgetExceededError as exc:
+        # Answers written before the budget ran out stay in the output file.
+        logger.error("Interpretation stopped: %s", exc)
+        return 1
+    if run is not None:
+        run.interpreted(md_path)
+        run.finish_if_complete()
     logger.info("ChatPDFv2 CLI process finished")
     return 0
 
 
+def _interpret_documents(
+    md_paths: Iterable[Path],
+    args: argparse.Namespace,
+    logger: logging.Logger,
+    *,
+    run: Optional[JournalRun] = None,
+) -> int:
+    """
+    Interpret markdown files on a worker pool as soon as MinerU hands them over.
+    """
+    if args.stream:
+        logger.warning("--stream only applies to single-document modes; ignoring it for batches")
+    logger.info("Using DeepSeek for interpretation (%d documents at a time)", args.doc_concurrency)
+    try:
+        return interpret_documents(
+            md_paths,
+            QUESTIONS,
+            doc_concurrency=args.doc_concurrency,
+            on_interpreted=run.interpreted if run is not None else None,
+            temperature=args.temperature,
+            chunk_concurrency=args.chunk_concurrency,
+            chunk_tokens=args.chunk_tokens,
+            chunk_overlap_tokens=args.chunk_overlap_tokens,
+            mode=args.interpretation_mode,
+            top_k=args.top_k,
+            passage_tokens=args.passage_tokens,
+            synthesis_tokens=args.synthesis_tokens,
+            context_tokens=args.context_tokens,
+            max_document_tokens=args.max_document_tokens,
+            max_document_cost=args.max_document_cost,
+        )
+    finally:
+        # Stop MinerU work still streaming in (e.g. after the run budget ran
+        # out) before the client and journal are closed.
+        close = getattr(md_paths, "close", None)
+        if close is not None:
+            close()
+
+
+def _log_usage_summary(logger: logging.Logger) -> None:
+    totals = get_usage_totals()
+    if not totals.requests:
+        return
+    logger.info(
+        "DeepSeek total: %d requests, %d prompt tokens (%.0f%% served from cache), "
+        "%d completion tokens, cost ¥%.4f",
+        totals.requests,
+        totals.prompt_tokens,
+        totals.cache_hit_rate * 100,
+        totals.completion_tokens,
+        totals.cost,
+    )
+    policy = get_hedge_policy()
+    if policy is not None and policy.hedges:
+        logger.info(
+            "DeepSeek hedging: %d of %d requests hedged, %d won by the hedge",
+            policy.hedges,
+            policy.requests,
+            policy.hedge_wins,
+        )
+
+
+def _print_stats(ledger: UsageLedger) -> None:
+    overall = ledger.summary()
+    if not overall:
+        print("No DeepSeek calls recorded yet.")
+        return
+    header = (
+        f"{'':<40} {'calls':>7} {'errors':>6} {'cached':>6} {'prompt':>10} {'hit%':>5} "
+        f"{'output':>9} {'p50 s':>7} {'p95 s':>7} {'cost ¥':>9}"
+    )
+    for title, rows in (
+        ("Total", overall),
+        ("By day", ledger.summary("day")),
+        ("By document", ledger.summary("document")),
+    ):
+        print(f"\n{title}")
+        print(header)
+        for row in rows:
+            key = row.key if len(row.key) <= 40 else "…" + row.key[-39:]
+            print(
+                f"{key:<40} {row.calls:>7} {row.errors:>6} {row.cached:>6} {row.prompt_tokens:>10} "
+                f"{row.cache_hit_rate * 100:>5.0f} {row.completion_tokens:>9} {row.latency_p50:>7.1f} "
+                f"{row.latency_p95:>7.1f} {row.cost:>9.4f}"
+            )
+
+
 __all__ = ["main", "parse_args"]
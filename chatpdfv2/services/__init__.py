@@ -2,7 +2,57 @@
 Service-layer integrations (external APIs, persistence, etc.).
 """
 
-from .mineru import process_pdf_via_mineru, process_local_files_via_mineru, process_urls_via_mineru, get_batch_results  # noqa: F401
-from .deepseek_client import create_deepseek_client, post_with_retries_deepseek  # noqa: F401
+from .mineru import (  # noqa: F401
+    MINERU_BATCH_LIMIT,
+    MinerUClient,
+    get_batch_results,
+    iter_local_files_via_mineru,
+    iter_resumed_run,
+    iter_urls_via_mineru,
+    process_local_files_via_mineru,
+    process_pdf_via_mineru,
+    process_urls_via_mineru,
+)
+from .budget import Budget, BudgetExceededError, PromptTooLargeError, set_run_budget  # noqa: F401
+from .completion_cache import CompletionCache  # noqa: F401
+from .conversion_cache import ConversionCache  # noqa: F401
+from .event_loop import run_sync, stop_event_loop  # noqa: F401
+from .hedging import HedgePolicy  # noqa: F401
+from .journal import JobJournal  # noqa: F401
+from .rate_control import RateController  # noqa: F401
+from .usage_ledger import UsageLedger, usage_scope  # noqa: F401
+from .deepseek_client import (  # noqa: F401
+    close_async_deepseek_client,
+    create_deepseek_client,
+    estimate_request_tokens,
+    get_async_deepseek_client,
+    get_hedge_policy,
+    get_rate_controller,
+    get_usage_totals,
+    post_with_retries_deepseek,
+    post_with_retries_deepseek_async,
+    set_completion_cache,
+    set_hedge_policy,
+    set_max_inflight_requests,
+    set_usage_ledger,
+)
 
-__all__ = ["process_pdf_via_mineru", "process_local_files_via_mineru", "process_urls_via_mineru", "get_batch_results"]
+__all__ = [
+    "Budget",
+    "BudgetExceededError",
+    "CompletionCache",
+    "ConversionCache",
+    "HedgePolicy",
+    "JobJournal",
+    "RateController",
+    "UsageLedger",
+    "MINERU_BATCH_LIMIT",
+    "MinerUClient",
+    "process_pdf_via_mineru",
+    "process_local_files_via_mineru",
+    "process_urls_via_mineru",
+    "iter_local_files_via_mineru",
+    "iter_urls_via_mineru",
+    "iter_resumed_run",
+    "get_batch_results",
+]
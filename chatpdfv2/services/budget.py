@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+logger = logging.getLogger("chatpdf")
+
+SCOPE_RUN = "run"
+SCOPE_DOCUMENT = "document"
+SCOPE_CONTEXT = "context"
+
+
+class BudgetExceededError(RuntimeError):
+    """
+    A request was refused before being sent because it would overrun a budget.
+
+    `scope` says which one: the whole run, the current document, or the
+    model's context window (see `PromptTooLargeError`).
+    """
+
+    def __init__(self, message: str, *, scope: str) -> None:
+        super().__init__(message)
+        self.scope = scope
+
+
+class PromptTooLargeError(BudgetExceededError):
+    """The estimated prompt plus the output reserve does not fit the context window."""
+
+    def __init__(self, message: str, *, tokens: int, limit: int) -> None:
+        super().__init__(message, scope=SCOPE_CONTEXT)
+        self.tokens = tokens
+        self.limit = limit
+
+
+class Budget:
+    """
+    Token and cost allowance shared by every request made under it.
+
+    Requests reserve their estimated size before they are sent and settle
+    with the actual usage afterwards, so concurrent requests cannot together
+    overrun the limits.
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        *,
+        label: str = "",
+        max_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+    ) -> None:
+        self.scope = scope
+        self.label = label or scope
+        self.max_tokens = max_tokens
+        self.max_cost = max_cost
+        self.spent_tokens = 0
+        self.spent_cost = 0.0
+        self._reserved_tokens = 0
+        self._reserved_cost = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int, cost: float) -> None:
+        with self._lock:
+            if self.max_tokens is not None and (
+                self.spent_tokens + self._reserved_tokens + tokens > self.max_tokens
+            ):
+                raise BudgetExceededError(
+                    f"{self.label} token budget exhausted: {self.spent_tokens} spent, "
+                    f"{self._reserved_tokens} in flight, next request needs ~{tokens} "
+                    f"of {self.max_tokens}",
+                    scope=self.scope,
+                )
+            if self.max_cost is not None and (
+                self.spent_cost + self._reserved_cost + cost > self.max_cost
+            ):
+                raise BudgetExceededError(
+                    f"{self.label} cost budget exhausted: ¥{self.spent_cost:.4f} spent, "
+                    f"¥{self._reserved_cost:.4f} in flight, next request needs ~¥{cost:.4f} "
+                    f"of ¥{self.max_cost:.4f}",
+                    scope=self.scope,
+                )
+            self._reserved_tokens += tokens
+            self._reserved_cost += cost
+
+    def settle(self, reserved_tokens: int, reserved_cost: float, tokens: int, cost: float) -> None:
+        with self._lock:
+            self._reserved_tokens -= reserved_tokens
+            self._reserved_cost -= reserved_cost
+            self.spent_tokens += tokens
+            self.spent_cost += cost
+
+
+class Reservation:
+    """Estimated usage held against the active budgets until the request ends."""
+
+    def __init__(self, budgets: list[Budget], tokens: int, cost: float) -> None:
+        self._budgets = budgets
+        self.tokens = tokens
+        self.cost = cost
+        self._open = True
+
+    def settle(self, tokens: Optional[int] = None, cost: Optional[float] = None) -> None:
+        """
+        Charge the actual usage (the estimate if unknown) and free the reservation.
+        """
+        self._close(self.tokens if tokens is None else tokens, self.cost if cost is None else cost)
+
+    def release(self) -> None:
+        """Free the reservation of a request that was not billed."""
+        self._close(0, 0.0)
+
+    def _close(self, tokens: int, cost: float) -> None:
+        if not self._open:
+            return
+        self._open = False
+        for budget in self._budgets:
+            budget.settle(self.tokens, self.cost, tokens, cost)
+
+
+_run_budget: Optional[Budget] = None
+_document_budget: ContextVar[Optional[Budget]] = ContextVar("chatpdf_document_budget", default=None)
+
+
+def set_run_budget(budget: Optional[Budget]) -> None:
+    """
+    Set (or clear with None) the budget shared by every request in the process.
+    """
+    global _run_budget
+    _run_budget = budget
+
+
+def get_run_budget() -> Optional[Budget]:
+    return _run_budget
+
+
+@contextmanager
+def budget_scope(budget: Optional[Budget]) -> Iterator[None]:
+    """
+    Apply `budget` to requests made inside the block, on top of the run budget.
+    """
+    token = _document_budget.set(budget)
+    try:
+        yield
+    finally:
+        _document_budget.reset(token)
+
+
+def reserve(tokens: int, cost: float) -> Reservation:
+    """
+    Reserve an estimated request against the run and current document budgets.
+
+    Raises BudgetExceededError, holding nothing, if any budget would overrun.
+    """
+    budgets = [budget for budget in (_run_budget, _document_budget.get()) if budget is not None]
+    reserved: list[Budget] = []
+    try:
+        for budget in budgets:
+            budget.reserve(tokens, cost)
+            reserved.append(budget)
+    except BudgetExceededError:
+        for budget in reserved:
+            budget.settle(tokens, cost, 0, 0.0)
+        raise
+    return Reservation(budgets, tokens, cost)
+
+
+__all__ = [
+    "Budget",
+    "BudgetExceededError",
+    "PromptTooLargeError",
+    "Reservation",
+    "SCOPE_CONTEXT",
+    "SCOPE_DOCUMENT",
+    "SCOPE_RUN",
+    "budget_scope",
+    "get_run_budget",
+    "reserve",
+    "set_run_budget",
+]
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("chatpdf")
+
+DEFAULT_COMPLETION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Completions cut off by the output limit; caching them would replay the cut forever.
+_TRUNCATED_FINISH_REASON = "length"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    content TEXT NOT NULL,
+    finish_reason TEXT,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_last_used ON completions(last_used);
+"""
+
+
+class CompletionCache:
+    """
+    SQLite store of chat completions keyed by model, messages, temperature
+    and response format.
+
+    Identical requests (the same chunk prompt or synthesis input) are answered
+    from disk instead of the API. Completions cut off by the output limit
+    (`finish_reason == "length"`) are never stored or served. Entries are
+    evicted least recently used first once their total size exceeds
+    `max_bytes`.
+    """
+
+    def __init__(self, path: Path, *, max_bytes: int = DEFAULT_COMPLETION_CACHE_MAX_BYTES) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def get(
+        self,
+        model: str,
+        messages: list[Dict[str, str]],
+        temperature: float,
+        *,
+        response_format: Optional[Dict[str, str]] = None,
+    ) -> Optional[tuple[str, Optional[str]]]:
+        """
+        Return `(content, finish_reason)` for a cached request, or None.
+        """
+        key = completion_key(model, messages, temperature, response_format=response_format)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content, finish_reason FROM completions"
+                " WHERE key = ? AND finish_reason IS NOT ?",
+                (key, _TRUNCATED_FINISH_REASON),
+            ).fetchone()
+            if row is None:
+                return None
+            with self._db:
+                self._db.execute(
+                    "UPDATE completions SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+        logger.info("DeepSeek completion cache hit (%s)", key[:12])
+        return row[0], row[1]
+
+    def put(
+        self,
+        model: str,
+        messages: list[Dict[str, str]],
+        temperature: float,
+        content: str,
+        finish_reason: Optional[str] = None,
+        *,
+        response_format: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if finish_reason == _TRUNCATED_FINISH_REASON:
+            return
+        key = completion_key(model, messages, temperature, response_format=response_format)
+        size_bytes = len(key) + len(content.encode("utf-8"))
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, content, finish_reason, size_bytes, now, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._db.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM completions"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size_bytes in self._db.execute(
+            "SELECT key, size_bytes FROM completions ORDER BY last_used"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM completions WHERE key = ?", (key,))
+            total -= size_bytes
+            evicted += 1
+        logger.info("Evicted %d DeepSeek completion cache entries", evicted)
+
+
+def completion_key(
+    model: str,
+    messages: list[Dict[str, str]],
+    temperature: float,
+    *,
+    response_format: Optional[Dict[str, str]] = None,
+) -> str:
+    request: Dict[str, Any] = {"model": model, "messages": messages, "temperature": temperature}
+    if response_format:
+        # Only set for JSON-mode calls, so plain requests keep their existing keys.
+        request["response_format"] = response_format
+    payload = json.dumps(request, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+__all__ = ["CompletionCache", "DEFAULT_COMPLETION_CACHE_MAX_BYTES", "completion_key"]
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import shutil
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("chatpdf")
+
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+SOURCE_PDF_NAME = "_source.pdf"
+INTERPRETATION_FILENAME = "interpretation_results.md"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    digest TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    directory TEXT NOT NULL,
+    markdown TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (digest, variant)
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (url, variant)
+);
+"""
+
+
+@dataclass(frozen=True)
+class CacheEntry:
+    """A cached MinerU result: a directory plus the markdown file inside it."""
+
+    digest: str
+    variant: str
+    directory: Path
+    markdown: str
+
+    @property
+    def source_pdf(self) -> Optional[Path]:
+        path = self.directory / SOURCE_PDF_NAME
+        return path if path.exists() else None
+
+
+class ConversionCache:
+    """
+    Content-addressed store of MinerU conversion results.
+
+    Entries are keyed by the SHA-256 of the PDF bytes and the MinerU model
+    variant, and live under `<root>/objects/`. A SQLite index tracks entry
+    sizes and last use for LRU eviction once `max_bytes` is exceeded, and maps
+    remote URLs to the digest of the content they served.
+    """
+
+    def __init__(self, root: Path, *, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._objects = self.root / "objects"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.root / "index.sqlite3", check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def get(self, digest: str, variant: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT directory, markdown FROM entries WHERE digest = ? AND variant = ?",
+                (digest, variant),
+            ).fetchone()
+            if row is None:
+                return None
+            entry = CacheEntry(digest, variant, self._objects / row[0], row[1])
+            if not (entry.directory / entry.markdown).exists():
+                logger.warning("Dropping incomplete conversion cache entry %s", entry.directory)
+                self._delete(digest, variant, entry.directory)
+                return None
+            with self._db:
+                self._db.execute(
+                    "UPDATE entries SET last_used = ? WHERE digest = ? AND variant = ?",
+                    (time.time(), digest, variant),
+                )
+        logger.info("Conversion cache hit for %s (%s)", digest[:12], variant)
+        return entry
+
+    def get_url(self, url: str, variant: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM urls WHERE url = ? AND variant = ?",
+                (url, variant),
+            ).fetchone()
+        return self.get(row[0], variant) if row else None
+
+    def put(
+        self,
+        digest: str,
+        variant: str,
+        result_dir: Path,
+        markdown_path: Path,
+        *,
+        source_pdf: Optional[Path] = None,
+        url: Optional[str] = None,
+    ) -> None:
+        """
+        Copy a freshly converted result directory into the cache.
+
+        The original PDF copy and any interpretation output next to the
+        markdown are not part of the conversion result and are skipped;
+        `source_pdf` is stored separately so URL hits can restore it too.
+        """
+        directory = f"{digest}-{hashlib.sha256(variant.encode()).hexdigest()[:8]}"
+        destination = self._objects / directory
+        excluded = {INTERPRETATION_FILENAME}
+        if source_pdf is not None:
+            excluded.add(source_pdf.name)
+
+        staging = destination.with_name(destination.name + ".tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.copytree(
+            result_dir,
+            staging,
+            ignore=lambda folder, names: [
+                name for name in names if Path(folder) == result_dir and name in excluded
+            ],
+        )
+        if source_pdf is not None and source_pdf.exists():
+            shutil.copy2(source_pdf, staging / SOURCE_PDF_NAME)
+        size_bytes = sum(path.stat().st_size for path in staging.rglob("*") if path.is_file())
+
+        with self._lock:
+            shutil.rmtree(destination, ignore_errors=True)
+            staging.rename(destination)
+            now = time.time()
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        digest,
+                        variant,
+                        directory,
+                        markdown_path.relative_to(result_dir).as_posix(),
+                        size_bytes,
+                        now,
+                        now,
+                    ),
+                )
+                if url:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO urls VALUES (?, ?, ?)",
+                        (url, variant, digest),
+                    )
+            self._evict(keep=(digest, variant))
+        logger.info(
+            "Cached MinerU result %s (%s, %.1f MB)",
+            digest[:12],
+            variant,
+            size_bytes / 1024 / 1024,
+        )
+
+    def restore(self, entry: CacheEntry, target_dir: Path, *, source_name: Optional[str] = None) -> Path:
+        """
+        Copy a cached result into `target_dir` and return the markdown path.
+        """
+        with self._lock:
+            shutil.copytree(
+                entry.directory,
+                target_dir,
+                dirs_exist_ok=True,
+                ignore=lambda folder, names: [
+                    name for name in names if name == SOURCE_PDF_NAME
+                ],
+            )
+            source_pdf = entry.source_pdf
+            if source_name and source_pdf is not None:
+                shutil.copy2(source_pdf, target_dir / source_name)
+        return target_dir / entry.markdown
+
+    def _evict(self, *, keep: tuple[str, str]) -> None:
+        total = self._db.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT digest, variant, directory, size_bytes FROM entries ORDER BY last_used"
+        ).fetchall()
+        for digest, variant, directory, size_bytes in rows:
+            if total <= self.max_bytes:
+                break
+            if (digest, variant) == keep:
+                continue
+            self._delete(digest, variant, self._objects / directory)
+            total -= size_bytes
+            logger.info("Evicted conversion cache entry %s (%s)", digest[:12], variant)
+
+    def _delete(self, digest: str, variant: str, directory: Path) -> None:
+        shutil.rmtree(directory, ignore_errors=True)
+        with self._db:
+            self._db.execute(
+                "DELETE FROM entries WHERE digest = ? AND variant = ?",
+                (digest, variant),
+            )
+            self._db.execute(
+                "DELETE FROM urls WHERE digest = ? AND variant = ?",
+                (digest, variant),
+            )
+
+
+def url_digest(url: str) -> str:
+    """
+    Fallback cache key for remote inputs whose bytes could not be fetched.
+    """
+    return "url-" + hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+__all__ = ["CacheEntry", "ConversionCache", "DEFAULT_CACHE_MAX_BYTES", "url_digest"]
@@ -1,11 +1,32 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import threading
 import time
-from typing import Any, Dict, Optional
+from dataclasses import dataclass, replace
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
 
-from openai import OpenAI
+import httpx
+import openai
+from openai import AsyncOpenAI, OpenAI
+
+from ..utils import estimate_tokens
+from .budget import BudgetExceededError, PromptTooLargeError, Reservation
+from .budget import reserve as reserve_budget
+from .completion_cache import CompletionCache
+from .hedging import HedgePolicy
+from .usage_ledger import (
+    STATUS_CACHED,
+    STATUS_CANCELLED,
+    STATUS_ERROR,
+    STATUS_OK,
+    UsageLedger,
+    UsageRecord,
+)
+from .rate_control import RateController, retry_after_seconds
 
 logger = logging.getLogger("chatpdf")
 
@@ -14,9 +35,59 @@ DEEPSEEK_PRICE_INPUT_CACHE_HIT = 0.2  # 缓存命中
 DEEPSEEK_PRICE_INPUT_CACHE_MISS = 2.0  # 缓存未命中
 DEEPSEEK_PRICE_OUTPUT = 3.0  # 输出
 
-# 假设缓存命中率为 0%，使用缓存未命中价格
-PRICE_INPUT_PER_1K = DEEPSEEK_PRICE_INPUT_CACHE_MISS / 1000
-PRICE_OUTPUT_PER_1K = DEEPSEEK_PRICE_OUTPUT / 1000
+# 模型上下文窗口（token）；发送前按估算输入加输出预留检查
+MODEL_CONTEXT_TOKENS = {"deepseek-chat": 64_000, "deepseek-reasoner": 64_000}
+DEFAULT_MODEL_CONTEXT_TOKENS = 64_000
+OUTPUT_TOKENS_RESERVE = 4_096
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+# 全局并发上限：所有文档、问题和分片共享同一个自适应限流器（AIMD），
+# 实际并发在 1 到该上限之间随限流与延迟调整
+DEFAULT_MAX_INFLIGHT_REQUESTS = 8
+_rate_controller = RateController(DEFAULT_MAX_INFLIGHT_REQUESTS)
+
+# 本地补全缓存（可选），由 set_completion_cache 设置
+_completion_cache: Optional[CompletionCache] = None
+
+# 用量账本（可选），由 set_usage_ledger 设置；每次调用写入一行
+_usage_ledger: Optional[UsageLedger] = None
+
+# 对冲策略（可选，默认关闭），由 set_hedge_policy 设置
+_hedge_policy: Optional[HedgePolicy] = None
+
+# 进程内共享的异步客户端（连接池随之复用），首次使用时创建
+_async_client: Optional[AsyncOpenAI] = None
+_async_client_lock = threading.Lock()
+DEEPSEEK_BASE_URL = "https://api.deepseek.com"
+
+
+@dataclass(frozen=True)
+class UsageTotals:
+    """进程内累计的 DeepSeek 用量与成本"""
+
+    requests: int = 0
+    prompt_tokens: int = 0
+    cache_hit_tokens: int = 0
+    cache_miss_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        prompt = self.cache_hit_tokens + self.cache_miss_tokens
+        return self.cache_hit_tokens / prompt if prompt else 0.0
+
+
+_usage_totals = UsageTotals()
+_usage_lock = threading.Lock()
+
+
+def get_usage_totals() -> UsageTotals:
+    """
+    返回当前进程累计的 DeepSeek 用量快照
+    """
+    with _usage_lock:
+        return _usage_totals
 
 
 def create_deepseek_client() -> OpenAI:
@@ -27,12 +98,106 @@ def create_deepseek_client() -> OpenAI:
     if not api_key:
         raise ValueError("DEEPSEEK_API_KEY environment variable is not set")
     
+    # 重试由 post_with_retries_deepseek 统一处理，关闭 SDK 自带重试以免叠加
     return OpenAI(
         api_key=api_key,
-        base_url="https://api.deepseek.com"
+        base_url=DEEPSEEK_BASE_URL,
+        max_retries=0,
     )
 
 
+def get_async_deepseek_client() -> AsyncOpenAI:
+    """
+    返回进程内共享的 DeepSeek 异步客户端
+
+    连接池上限与并发上限一致，连接在文档、问题和分片之间复用。
+    客户端绑定首次使用它的事件循环，应只在 event_loop.run_sync 的共享循环中使用。
+    """
+    global _async_client
+    with _async_client_lock:
+        if _async_client is None:
+            api_key = os.environ.get('DEEPSEEK_API_KEY')
+            if not api_key:
+                raise ValueError("DEEPSEEK_API_KEY environment variable is not set")
+            connections = _rate_controller.max_limit
+            _async_client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=DEEPSEEK_BASE_URL,
+                max_retries=0,
+                http_client=openai.DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=connections,
+                        max_keepalive_connections=connections,
+                        keepalive_expiry=60,
+                    ),
+                ),
+            )
+        return _async_client
+
+
+async def close_async_deepseek_client() -> None:
+    """
+    关闭共享异步客户端及其连接池
+    """
+    global _async_client
+    with _async_client_lock:
+        client, _async_client = _async_client, None
+    if client is not None:
+        await client.close()
+
+
+def set_max_inflight_requests(limit: int) -> None:
+    """
+    设置同时进行中的 DeepSeek 请求数上限（进程内全局生效）
+    """
+    global _rate_controller
+    if limit < 1:
+        raise ValueError("limit must be at least 1")
+    with _async_client_lock:
+        # 连接池大小在创建共享客户端时按上限确定，之后不能再改
+        if _async_client is not None:
+            raise RuntimeError(
+                "set_max_inflight_requests() must be called before the shared async client "
+                "is created, or after close_async_deepseek_client()"
+            )
+        _rate_controller = RateController(limit)
+
+
+def get_rate_controller() -> RateController:
+    """
+    返回所有 DeepSeek 请求共享的限流器
+    """
+    return _rate_controller
+
+
+def set_completion_cache(cache: Optional[CompletionCache]) -> None:
+    """
+    设置（或传入 None 关闭）post_with_retries_deepseek 使用的本地补全缓存
+    """
+    global _completion_cache
+    _completion_cache = cache
+
+
+def set_usage_ledger(ledger: Optional[UsageLedger]) -> None:
+    """
+    设置（或传入 None 关闭）记录每次 DeepSeek 调用的用量账本
+    """
+    global _usage_ledger
+    _usage_ledger = ledger
+
+
+def set_hedge_policy(policy: Optional[HedgePolicy]) -> None:
+    """
+    设置（或传入 None 关闭）异步请求的对冲策略
+    """
+    global _hedge_policy
+    _hedge_policy = policy
+
+
+def get_hedge_policy() -> Optional[HedgePolicy]:
+    return _hedge_policy
+
+
 def post_with_retries_deepseek(
     client: OpenAI,
     model: str,
@@ -41,80 +206,664 @@ def post_with_retries_deepseek(
     temperature: float = 1.0,
     max_retries: int = 4,
     base_delay: int = 1,
+    on_token: Optional[Callable[[str], None]] = None,
+    response_format: Optional[Dict[str, str]] = None,
 ) -> Optional[Any]:
     """
     DeepSeek API 调用包装器，包含重试机制和错误处理
+
+    传入 `on_token` 时以流式方式请求，每个增量文本到达即回调，
+    返回值与非流式响应结构相同（choices[0].message.content 与 usage）。
+    `response_format` 原样传给 API，例如 {"type": "json_object"} 要求返回 JSON。
+    设置了本地补全缓存时，相同的 model/messages/temperature/response_format 直接从缓存返回；
+    因输出长度截断的回答不会缓存。
+    发送前本地估算 token：超出上下文窗口抛出 PromptTooLargeError，
+    超出运行或文档预算抛出 BudgetExceededError，两者都不会发出请求。
     """
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                stream=False
+    cache = _completion_cache
+    if cache is not None:
+        cached = _cached_completion(cache, model, messages, temperature, response_format)
+        if cached is not None:
+            _record_usage(UsageRecord(model=model, status=STATUS_CACHED, latency_seconds=0.0))
+            if on_token is not None:
+                on_token(cached.choices[0].message.content)
+            return cached
+
+    controller = _rate_controller
+    extra = {"response_format": response_format} if response_format else {}
+    reservation = _preflight(model, messages)
+    try:
+        for attempt in range(1, max_retries + 1):
+            started = time.monotonic()
+            try:
+                # 只在请求期间占用名额，退避等待时释放
+                with controller.slot() as started:
+                    if on_token is not None:
+                        response = _stream_completion(
+                            client, model, messages, temperature, on_token, **extra
+                        )
+                    else:
+                        response = client.chat.completions.create(
+                            model=model,
+                            messages=messages,
+                            temperature=temperature,
+                            stream=False,
+                            **extra,
+                        )
+            except _NON_RETRYABLE_ERRORS as exc:
+                # 认证错误或参数错误，重试无意义
+                logger.error("Non-retryable error: %s", exc)
+                _record_failure(model, started, exc)
+                break
+            except Exception as exc:
+                _record_failure(model, started, exc)
+                delay = _retry_delay(exc, attempt, max_retries, base_delay, controller, started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+
+            _record_completion(
+                response,
+                controller,
+                started,
+                cache,
+                model,
+                messages,
+                temperature,
+                response_format,
+                reservation,
             )
-            
-            _log_usage_deepseek(response)
             return response
-            
-        except Exception as exc:
-            logger.error(
-                "DeepSeek API exception on attempt %s/%s: %s",
-                attempt,
-                max_retries,
-                exc,
+
+        return None
+    finally:
+        # 未成功计费的请求释放预留额度
+        reservation.release()
+
+
+async def post_with_retries_deepseek_async(
+    client: AsyncOpenAI,
+    model: str,
+    messages: list[Dict[str, str]],
+    *,
+    temperature: float = 1.0,
+    max_retries: int = 4,
+    base_delay: int = 1,
+    on_token: Optional[Callable[[str], None]] = None,
+    response_format: Optional[Dict[str, str]] = None,
+) -> Optional[Any]:
+    """
+    post_with_retries_deepseek 的异步版本，使用 AsyncOpenAI 客户端
+
+    与同步版本共享限流器、补全缓存和用量统计；等待名额与退避时不阻塞事件循环，
+    补全缓存与用量账本的 SQLite 读写也在线程池中执行。
+    设置了对冲策略（set_hedge_policy）时，非流式请求超过延迟阈值会发送一份副本，
+    取先返回的结果并取消另一个。
+    """
+    cache = _completion_cache
+    if cache is not None:
+        cached = await asyncio.to_thread(
+            _cached_completion, cache, model, messages, temperature, response_format
+        )
+        if cached is not None:
+            await asyncio.to_thread(
+                _record_usage, UsageRecord(model=model, status=STATUS_CACHED, latency_seconds=0.0)
             )
-            
-            # 检查是否为可重试的错误
-            error_str = str(exc).lower()
-            if any(error in error_str for error in ['rate limit', 'timeout', 'connection', 'server']) and attempt < max_retries:
-                delay = base_delay * (2 ** (attempt - 1))
-                logger.warning("Retrying after %s seconds...", delay)
-                time.sleep(delay)
-                continue
-            
-            # 如果是认证错误或参数错误，不重试
-            if any(error in error_str for error in ['authentication', 'invalid', 'parameter']):
+            if on_token is not None:
+                on_token(cached.choices[0].message.content)
+            return cached
+
+    controller = _rate_controller
+    extra = {"response_format": response_format} if response_format else {}
+    reservation = _preflight(model, messages)
+    try:
+        for attempt in range(1, max_retries + 1):
+            started = time.monotonic()
+            try:
+                if on_token is not None:
+                    # 流式回答已逐字输出，不做对冲
+                    async with controller.async_slot() as started:
+                        response = await _stream_completion_async(
+                            client, model, messages, temperature, on_token, **extra
+                        )
+                else:
+                    response, started = await _hedged_completion_async(
+                        client,
+                        controller,
+                        _hedge_policy,
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        **extra,
+                    )
+            except _NON_RETRYABLE_ERRORS as exc:
                 logger.error("Non-retryable error: %s", exc)
+                await asyncio.to_thread(_record_failure, model, started, exc)
                 break
-                
-            if attempt < max_retries:
-                delay = base_delay * (2 ** (attempt - 1))
-                time.sleep(delay)
+            except Exception as exc:
+                await asyncio.to_thread(_record_failure, model, started, exc)
+                delay = _retry_delay(exc, attempt, max_retries, base_delay, controller, started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
                 continue
-                
-            raise
-    
-    return None
+
+            await asyncio.to_thread(
+                _record_completion,
+                response,
+                controller,
+                started,
+                cache,
+                model,
+                messages,
+                temperature,
+                response_format,
+                reservation,
+            )
+            return response
+
+        return None
+    finally:
+        # 未成功计费的请求释放预留额度
+        reservation.release()
+
+
+async def _hedged_completion_async(
+    client: AsyncOpenAI,
+    controller: RateController,
+    policy: Optional[HedgePolicy],
+    **request: Any,
+) -> tuple[Any, float]:
+    """
+    发送非流式请求，必要时对冲；返回（响应, 获胜请求的开始时间）
+
+    对冲副本在运行与文档预算中单独预留额度，预算不足时不对冲。落败的请求同样
+    写入用量账本并计入预算：已返回的按实际用量，失败的记为 error，
+    被取消的按估算输入 token 记为 cancelled。
+    """
+    if policy is None:
+        return await _timed_completion_async(client, controller, **request)
+
+    began = time.monotonic()
+    primary = asyncio.ensure_future(_timed_completion_async(client, controller, **request))
+    launched = {primary: began}
+    pending = {primary}
+    hedge_reservation: Optional[Reservation] = None
+    accounted: Optional[asyncio.Future] = None
+    try:
+        threshold = policy.threshold()
+        if threshold is not None:
+            done, _ = await asyncio.wait(pending, timeout=threshold)
+            # 并发已满时再发副本只会排队，徒增负载
+            if not done and controller.in_flight < controller.limit:
+                hedge_reservation = _reserve_hedge(request["model"], request["messages"])
+            if hedge_reservation is not None and not policy.try_hedge():
+                hedge_reservation.release()
+                hedge_reservation = None
+            if hedge_reservation is not None:
+                logger.info("DeepSeek 请求超过 %.1fs 未返回，发送对冲请求", threshold)
+                hedge = asyncio.ensure_future(_timed_completion_async(client, controller, **request))
+                launched[hedge] = time.monotonic()
+                pending.add(hedge)
+
+        failure: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    if failure is None:
+                        # 全部失败时由调用方记录这一次
+                        failure, accounted = task.exception(), task
+                    continue
+                if task is not primary:
+                    policy.record_win()
+                    logger.info("对冲请求先于原请求返回")
+                policy.record(time.monotonic() - began)
+                accounted = task
+                return task.result()
+        assert failure is not None
+        raise failure
+    finally:
+        for task in pending:
+            task.cancel()
+        # 等取消真正生效，已返回的落败请求按实际结果结算
+        await asyncio.gather(*pending, return_exceptions=True)
+        if hedge_reservation is not None:
+            for task, started in launched.items():
+                if task is accounted:
+                    continue
+                response, error = None, None
+                if not task.cancelled():
+                    error = task.exception()
+                    if error is None:
+                        response, _ = task.result()
+                # 账本写入不占用事件循环，但在返回前完成
+                await asyncio.to_thread(
+                    _account_hedge_loser,
+                    response,
+                    error,
+                    started,
+                    hedge_reservation,
+                    request["model"],
+                    request["messages"],
+                )
+
+
+def _reserve_hedge(model: str, messages: list[Dict[str, str]]) -> Optional[Reservation]:
+    try:
+        return _reserve_estimate(estimate_request_tokens(messages))
+    except BudgetExceededError as exc:
+        logger.info("预算不足，不发送对冲请求: %s", exc)
+        return None
+
+
+def _account_hedge_loser(
+    response: Optional[Any],
+    error: Optional[BaseException],
+    started: float,
+    reservation: Reservation,
+    model: str,
+    messages: list[Dict[str, str]],
+) -> None:
+    """
+    记录对冲中落败请求的用量并结算其预留额度
+
+    `response` 与 `error` 均为空表示请求已被取消。
+    """
+    latency = time.monotonic() - started
+    if error is not None:
+        reservation.release()
+        _record_failure(model, started, error)
+        return
+    if response is not None:
+        record = _log_usage_deepseek(response)
+        if record is not None:
+            reservation.settle(record.prompt_tokens + record.completion_tokens, record.cost)
+            _record_usage(replace(record, model=model, latency_seconds=latency))
+            return
+    # 已取消（或未返回用量）：服务端可能已处理输入，按估算输入 token 计费
+    prompt_tokens = estimate_request_tokens(messages)
+    cost = prompt_tokens * DEEPSEEK_PRICE_INPUT_CACHE_MISS / 1_000_000
+    reservation.settle(prompt_tokens, cost)
+    _record_usage(
+        UsageRecord(
+            model=model,
+            status=STATUS_CANCELLED,
+            latency_seconds=latency,
+            prompt_tokens=prompt_tokens,
+            cache_miss_tokens=prompt_tokens,
+            cost=cost,
+        )
+    )
+
+
+async def _timed_completion_async(
+    client: AsyncOpenAI,
+    controller: RateController,
+    **request: Any,
+) -> tuple[Any, float]:
+    async with controller.async_slot() as started:
+        response = await client.chat.completions.create(stream=False, **request)
+    return response, started
+
+
+# 认证错误或参数错误，重试无意义
+_NON_RETRYABLE_ERRORS = (
+    openai.BadRequestError,
+    openai.AuthenticationError,
+    openai.PermissionDeniedError,
+    openai.NotFoundError,
+    openai.UnprocessableEntityError,
+)
 
 
-def _log_usage_deepseek(response: Any) -> None:
+def estimate_request_tokens(messages: list[Dict[str, str]]) -> int:
     """
-    记录 DeepSeek API 用量和成本估算
+    本地估算请求的输入 token 数（不调用 API）
+    """
+    return sum(estimate_tokens(message.get("content") or "") + _MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def _preflight(model: str, messages: list[Dict[str, str]]) -> Reservation:
+    """
+    发送前检查：估算输入 token，超出上下文窗口则拒绝（PromptTooLargeError），
+    否则按估算用量在运行与文档预算中预留额度（超出则抛出 BudgetExceededError）
+    """
+    prompt_tokens = estimate_request_tokens(messages)
+    limit = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_MODEL_CONTEXT_TOKENS)
+    if prompt_tokens + OUTPUT_TOKENS_RESERVE > limit:
+        raise PromptTooLargeError(
+            f"Request of ~{prompt_tokens} tokens plus {OUTPUT_TOKENS_RESERVE} reserved for the "
+            f"answer exceeds the {limit}-token context window of {model}",
+            tokens=prompt_tokens,
+            limit=limit - OUTPUT_TOKENS_RESERVE,
+        )
+    return _reserve_estimate(prompt_tokens)
+
+
+def _reserve_estimate(prompt_tokens: int) -> Reservation:
+    # 按缓存未命中价格和满额输出估算，宁高勿低
+    cost = (
+        prompt_tokens * DEEPSEEK_PRICE_INPUT_CACHE_MISS
+        + OUTPUT_TOKENS_RESERVE * DEEPSEEK_PRICE_OUTPUT
+    ) / 1_000_000
+    return reserve_budget(prompt_tokens + OUTPUT_TOKENS_RESERVE, cost)
+
+
+def _record_failure(model: str, started: float, exc: BaseException) -> None:
+    _record_usage(
+        UsageRecord(
+            model=model,
+            status=STATUS_ERROR,
+            latency_seconds=time.monotonic() - started,
+            error=type(exc).__name__,
+        )
+    )
+
+
+def _record_usage(record: UsageRecord) -> None:
+    ledger = _usage_ledger
+    if ledger is None:
+        return
+    try:
+        ledger.record(record)
+    except Exception as exc:
+        logger.warning("写入DeepSeek用量账本失败: %s", exc)
+
+
+def _retry_delay(
+    exc: Exception,
+    attempt: int,
+    max_retries: int,
+    base_delay: int,
+    controller: RateController,
+    started: float,
+) -> Optional[float]:
+    """
+    记录失败并返回重试前的等待秒数；已无重试次数时返回 None
+    """
+    logger.error(
+        "DeepSeek API exception on attempt %s/%s: %s",
+        attempt,
+        max_retries,
+        exc,
+    )
+    retry_after = retry_after_seconds(exc)
+    if _is_throttle(exc):
+        # 限流或服务端过载：全局降低并发，并按 Retry-After 统一暂停
+        controller.record_throttle(started, retry_after)
+    if attempt >= max_retries:
+        return None
+    delay = retry_after if retry_after is not None else base_delay * (2 ** (attempt - 1))
+    logger.warning("Retrying after %s seconds...", delay)
+    return delay
+
+
+def _record_completion(
+    response: Any,
+    controller: RateController,
+    started: float,
+    cache: Optional[CompletionCache],
+    model: str,
+    messages: list[Dict[str, str]],
+    temperature: float,
+    response_format: Optional[Dict[str, str]],
+    reservation: Reservation,
+) -> None:
+    usage = getattr(response, "usage", None)
+    controller.record_success(started, getattr(usage, "completion_tokens", None))
+    record = _log_usage_deepseek(response)
+    if record is not None:
+        reservation.settle(record.prompt_tokens + record.completion_tokens, record.cost)
+    else:
+        reservation.settle()
+    _record_usage(
+        replace(record, model=model, latency_seconds=time.monotonic() - started)
+        if record is not None
+        else UsageRecord(model=model, status=STATUS_OK, latency_seconds=time.monotonic() - started)
+    )
+    if cache is not None:
+        _store_completion(cache, model, messages, temperature, response_format, response)
+
+
+def _is_throttle(exc: BaseException) -> bool:
+    """
+    限流（429）、超时与服务端过载（503/529）视为需要降低并发的信号
+    """
+    if isinstance(exc, (openai.RateLimitError, openai.APITimeoutError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code in (503, 529)
+
+
+def _stream_completion(
+    client: OpenAI,
+    model: str,
+    messages: list[Dict[str, str]],
+    temperature: float,
+    on_token: Callable[[str], None],
+    **extra: Any,
+) -> SimpleNamespace:
+    """
+    流式请求并拼装完整回答，同时记录首个 token 延迟（TTFT）
+    """
+    assembler = _StreamAssembler(model, on_token)
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True},
+        **extra,
+    )
+    for chunk in stream:
+        assembler.add(chunk)
+    return assembler.response()
+
+
+async def _stream_completion_async(
+    client: AsyncOpenAI,
+    model: str,
+    messages: list[Dict[str, str]],
+    temperature: float,
+    on_token: Callable[[str], None],
+    **extra: Any,
+) -> SimpleNamespace:
+    assembler = _StreamAssembler(model, on_token)
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        stream_options={"include_usage": True},
+        **extra,
+    )
+    async for chunk in stream:
+        assembler.add(chunk)
+    return assembler.response()
+
+
+class _StreamAssembler:
+    """
+    拼装流式增量，转发给 on_token，并在结束时记录首个 token 延迟
+    """
+
+    def __init__(self, model: str, on_token: Callable[[str], None]) -> None:
+        self.model = model
+        self.on_token = on_token
+        self.started = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.parts: list[str] = []
+        self.finish_reason: Optional[str] = None
+        self.usage: Any = None
+
+    def add(self, chunk: Any) -> None:
+        if chunk.usage:
+            self.usage = chunk.usage
+        if not chunk.choices:
+            return
+        choice = chunk.choices[0]
+        self.finish_reason = choice.finish_reason or self.finish_reason
+        text = choice.delta.content if choice.delta else None
+        if not text:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.parts.append(text)
+        self.on_token(text)
+
+    def response(self) -> SimpleNamespace:
+        elapsed = time.monotonic() - self.started
+        logger.info(
+            "DeepSeek 流式响应: 首个token延迟=%.2fs, 总耗时=%.2fs",
+            (self.first_token_at - self.started) if self.first_token_at is not None else elapsed,
+            elapsed,
+        )
+        return _completion_response(self.model, "".join(self.parts), self.finish_reason, self.usage)
+
+
+def _completion_response(
+    model: str,
+    content: str,
+    finish_reason: Optional[str],
+    usage: Any,
+) -> SimpleNamespace:
+    """
+    构造与 ChatCompletion 结构一致的响应对象
+    """
+    message = SimpleNamespace(role="assistant", content=content)
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, message=message, finish_reason=finish_reason)],
+        usage=usage,
+    )
+
+
+def _cached_completion(
+    cache: CompletionCache,
+    model: str,
+    messages: list[Dict[str, str]],
+    temperature: float,
+    response_format: Optional[Dict[str, str]],
+) -> Optional[SimpleNamespace]:
+    try:
+        cached = cache.get(model, messages, temperature, response_format=response_format)
+    except Exception as exc:
+        logger.warning("读取DeepSeek补全缓存失败: %s", exc)
+        return None
+    if cached is None:
+        return None
+    content, finish_reason = cached
+    return _completion_response(model, content, finish_reason, usage=None)
+
+
+def _store_completion(
+    cache: CompletionCache,
+    model: str,
+    messages: list[Dict[str, str]],
+    temperature: float,
+    response_format: Optional[Dict[str, str]],
+    response: Any,
+) -> None:
+    try:
+        choice = response.choices[0]
+        content = choice.message.content
+        if content:
+            cache.put(
+                model,
+                messages,
+                temperature,
+                content,
+                choice.finish_reason,
+                response_format=response_format,
+            )
+    except Exception as exc:
+        logger.warning("写入DeepSeek补全缓存失败: %s", exc)
+
+
+def _log_usage_deepseek(response: Any) -> Optional[UsageRecord]:
+    """
+    记录 DeepSeek API 用量和成本估算，返回用于写入账本的用量（延迟由调用方填入）
     """
     try:
         usage = response.usage
         if not usage:
-            return
+            return None
             
         prompt_tokens = usage.prompt_tokens or 0
         completion_tokens = usage.completion_tokens or 0
         total_tokens = usage.total_tokens or 0
-        
+
+        # DeepSeek 在 usage 中返回上下文缓存命中/未命中的 token 数
+        hit_tokens = getattr(usage, "prompt_cache_hit_tokens", None)
+        miss_tokens = getattr(usage, "prompt_cache_miss_tokens", None)
+        if hit_tokens is None and miss_tokens is None:
+            # 响应未返回缓存命中明细时，全部按缓存未命中价格计费
+            hit_tokens, miss_tokens = 0, prompt_tokens
+        hit_tokens = hit_tokens or 0
+        miss_tokens = miss_tokens if miss_tokens is not None else prompt_tokens - hit_tokens
+
         # 计算成本 (元)
-        cost = (prompt_tokens / 1000 * PRICE_INPUT_PER_1K) + (
-            completion_tokens / 1000 * PRICE_OUTPUT_PER_1K
-        )
-        
+        cost = (
+            hit_tokens * DEEPSEEK_PRICE_INPUT_CACHE_HIT
+            + miss_tokens * DEEPSEEK_PRICE_INPUT_CACHE_MISS
+            + completion_tokens * DEEPSEEK_PRICE_OUTPUT
+        ) / 1_000_000
+        hit_rate = hit_tokens / prompt_tokens if prompt_tokens else 0.0
+
+        global _usage_totals
+        with _usage_lock:
+            _usage_totals = replace(
+                _usage_totals,
+                requests=_usage_totals.requests + 1,
+                prompt_tokens=_usage_totals.prompt_tokens + prompt_tokens,
+                cache_hit_tokens=_usage_totals.cache_hit_tokens + hit_tokens,
+                cache_miss_tokens=_usage_totals.cache_miss_tokens + miss_tokens,
+                completion_tokens=_usage_totals.completion_tokens + completion_tokens,
+                cost=_usage_totals.cost + cost,
+            )
+
         logger.info(
-            "DeepSeek API用量: prompt_tokens=%s, completion_tokens=%s, total_tokens=%s, 估算价格=¥%.4f",
+            "DeepSeek API用量: prompt_tokens=%s (缓存命中=%s, 命中率=%.0f%%), completion_tokens=%s, "
+            "total_tokens=%s, 价格=¥%.4f",
             prompt_tokens,
+            hit_tokens,
+            hit_rate * 100,
             completion_tokens,
             total_tokens,
             cost,
         )
+        return UsageRecord(
+            model=getattr(response, "model", None) or "",
+            status=STATUS_OK,
+            latency_seconds=0.0,
+            prompt_tokens=prompt_tokens,
+            cache_hit_tokens=hit_tokens,
+            cache_miss_tokens=miss_tokens,
+            completion_tokens=completion_tokens,
+            cost=cost,
+        )
     except Exception as exc:
         logger.warning("无法解析DeepSeek API用量: %s", exc)
+        return None
 
 
-__all__ = ["create_deepseek_client", "post_with_retries_deepseek"]
\ No newline at end of file
+__all__ = [
+    "DEFAULT_MAX_INFLIGHT_REQUESTS",
+    "MODEL_CONTEXT_TOKENS",
+    "OUTPUT_TOKENS_RESERVE",
+    "UsageTotals",
+    "close_async_deepseek_client",
+    "create_deepseek_client",
+    "estimate_request_tokens",
+    "get_async_deepseek_client",
+    "get_hedge_policy",
+    "get_rate_controller",
+    "get_usage_totals",
+    "post_with_retries_deepseek",
+    "post_with_retries_deepseek_async",
+    "set_completion_cache",
+    "set_hedge_policy",
+    "set_usage_ledger",
+    "set_max_inflight_requests",
+]
\ No newline at end of file
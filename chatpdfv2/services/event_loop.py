@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+logger = logging.getLogger("chatpdf")
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the process-wide event loop, starting its daemon thread on first use.
+
+    Async API clients bind their connection pools to one loop, so every
+    coroutine that uses a shared client must run here.
+    """
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def _serve() -> None:
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            _thread = threading.Thread(target=_serve, name="chatpdf-event-loop", daemon=True)
+            _thread.start()
+            started.wait()
+            _loop = loop
+            logger.debug("Started background event loop")
+        return _loop
+
+
+def run_sync(coroutine: Coroutine[Any, Any, T]) -> T:
+    """
+    Run `coroutine` on the shared loop and block the calling thread for its result.
+
+    Many threads may wait at once; their coroutines interleave on the loop.
+    Interrupting the wait cancels the coroutine.
+    """
+    loop = get_event_loop()
+    if threading.current_thread() is _thread:
+        coroutine.close()
+        raise RuntimeError("run_sync() called from the event loop thread; await the coroutine instead")
+    future = asyncio.run_coroutine_threadsafe(coroutine, loop)
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def stop_event_loop() -> None:
+    """
+    Stop the shared loop and wait for its thread; a later call starts a new one.
+    """
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop = _thread = None
+    if loop is None:
+        return
+    loop.call_soon_threadsafe(loop.stop)
+    if thread is not None:
+        thread.join()
+    loop.close()
+
+
+__all__ = ["get_event_loop", "run_sync", "stop_event_loop"]
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Optional
+
+DEFAULT_HEDGE_PERCENTILE = 0.95
+DEFAULT_HEDGE_MAX_RATIO = 0.05
+
+
+class HedgePolicy:
+    """
+    When to send a duplicate of a slow request, and how often that is allowed.
+
+    The threshold is the `percentile` of the last `window` request latencies;
+    nothing is hedged until `min_samples` have been seen. At most `max_ratio`
+    of all requests may be hedged, so a slow API cannot double the bill.
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        max_ratio: float = DEFAULT_HEDGE_MAX_RATIO,
+        window: int = 200,
+        min_samples: int = 20,
+    ) -> None:
+        if not 0 < percentile < 1:
+            raise ValueError("percentile must be between 0 and 1")
+        if not 0 <= max_ratio <= 1:
+            raise ValueError("max_ratio must be between 0 and 1")
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def threshold(self) -> Optional[float]:
+        """
+        Seconds after which a request should be hedged, or None while warming up.
+        """
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self.requests += 1
+            self._latencies.append(latency)
+
+    def try_hedge(self) -> bool:
+        """
+        Claim a hedge if the budget allows one.
+        """
+        with self._lock:
+            if self.hedges + 1 > self.max_ratio * max(1, self.requests):
+                return False
+            self.hedges += 1
+            return True
+
+    def record_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+
+__all__ = ["DEFAULT_HEDGE_MAX_RATIO", "DEFAULT_HEDGE_PERCENTILE", "HedgePolicy"]
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+
+logger = logging.getLogger("chatpdf")
+
+# Item states, in the order a document moves through them.
+STATE_PENDING = "pending"
+STATE_SUBMITTED = "submitted"
+STATE_UPLOADED = "uploaded"
+STATE_DOWNLOADED = "downloaded"
+
+# Kinds of run, matching the CLI input modes.
+RUN_MODE_FILES = "files"
+RUN_MODE_URLS = "urls"
+RUN_MODE_URL = "url"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mode TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS items (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    idx INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    state TEXT NOT NULL,
+    batch_id TEXT,
+    task_id TEXT,
+    markdown_path TEXT,
+    interpreted INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (run_id, idx)
+);
+CREATE INDEX IF NOT EXISTS items_markdown ON items(run_id, markdown_path);
+"""
+
+
+@dataclass(frozen=True)
+class JournalItem:
+    """Journalled progress of one input document within a run."""
+
+    index: int
+    source: str
+    state: str
+    batch_id: Optional[str]
+    task_id: Optional[str]
+    markdown_path: Optional[str]
+    interpreted: bool
+
+
+class JobJournal:
+    """
+    Local SQLite journal of submitted MinerU work.
+
+    Every run records its inputs up front; each item then tracks the batch or
+    task it was submitted under, whether its upload finished, where its
+    markdown landed and whether it was interpreted, so an interrupted run can
+    be resumed without resubmitting or re-downloading finished work.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def start_run(self, mode: str, sources: Sequence[str], *, model_version: str) -> "JournalRun":
+        now = time.time()
+        with self._lock, self._db:
+            cursor = self._db.execute(
+                "INSERT INTO runs (mode, model_version, created_at) VALUES (?, ?, ?)",
+                (mode, model_version, now),
+            )
+            run_id = cursor.lastrowid
+            self._db.executemany(
+                "INSERT INTO items (run_id, idx, source, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, index, source, STATE_PENDING, now) for index, source in enumerate(sources)],
+            )
+        logger.info("Journal run %s started (%s, %d inputs)", run_id, mode, len(sources))
+        return JournalRun(self, run_id, mode, model_version)
+
+    def latest_unfinished_run(self) -> Optional["JournalRun"]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT run_id, mode, model_version FROM runs "
+                "WHERE finished_at IS NULL ORDER BY run_id DESC LIMIT 1"
+            ).fetchone()
+        return JournalRun(self, *row) if row else None
+
+    def _items(self, run_id: int) -> list[JournalItem]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT idx, source, state, batch_id, task_id, markdown_path, interpreted "
+                "FROM items WHERE run_id = ? ORDER BY idx",
+                (run_id,),
+            ).fetchall()
+        return [
+            JournalItem(index, source, state, batch_id, task_id, markdown_path, bool(interpreted))
+            for index, source, state, batch_id, task_id, markdown_path, interpreted in rows
+        ]
+
+    def _update(self, sql: str, rows: Iterable[tuple]) -> None:
+        with self._lock, self._db:
+            self._db.executemany(sql, rows)
+
+
+class JournalRun:
+    """
+    Handle for recording progress of one run.
+
+    `subset()` returns a view whose positions map onto a slice of the run's
+    items, so code that works on a shard of the inputs can record against
+    its own local positions.
+    """
+
+    def __init__(
+        self,
+        journal: JobJournal,
+        run_id: int,
+        mode: str,
+        model_version: str,
+        indices: Optional[Sequence[int]] = None,
+    ) -> None:
+        self.journal = journal
+        self.run_id = run_id
+        self.mode = mode
+        self.model_version = model_version
+        self._indices = list(indices) if indices is not None else None
+
+    def subset(self, positions: Iterable[int]) -> "JournalRun":
+        return JournalRun(
+            self.journal,
+            self.run_id,
+            self.mode,
+            self.model_version,
+            [self._resolve(position) for position in positions],
+        )
+
+    def items(self) -> list[JournalItem]:
+        items = self.journal._items(self.run_id)
+        if self._indices is None:
+            return items
+        by_index = {item.index: item for item in items}
+        return [by_index[index] for index in self._indices]
+
+    def record(
+        self,
+        state: str,
+        positions: Iterable[int],
+        *,
+        batch_id: Optional[str] = None,
+        task_id: Optional[str] = None,
+    ) -> None:
+        now = time.time()
+        self.journal._update(
+            "UPDATE items SET state = ?, batch_id = COALESCE(?, batch_id), "
+            "task_id = COALESCE(?, task_id), updated_at = ? WHERE run_id = ? AND idx = ?",
+            [
+                (state, batch_id, task_id, now, self.run_id, self._resolve(position))
+                for position in positions
+            ],
+        )
+
+    def downloaded(self, position: int, markdown_path: Path) -> None:
+        self.journal._update(
+            "UPDATE items SET state = ?, markdown_path = ?, updated_at = ? "
+            "WHERE run_id = ? AND idx = ?",
+            [(STATE_DOWNLOADED, str(markdown_path), time.time(), self.run_id, self._resolve(position))],
+        )
+
+    def interpreted(self, markdown_path: Path) -> None:
+        self.journal._update(
+            "UPDATE items SET interpreted = 1, updated_at = ? WHERE run_id = ? AND markdown_path = ?",
+            [(time.time(), self.run_id, str(markdown_path))],
+        )
+
+    def finish(self) -> None:
+        self.journal._update(
+            "UPDATE runs SET finished_at = ? WHERE run_id = ?",
+            [(time.time(), self.run_id)],
+        )
+        logger.info("Journal run %s finished", self.run_id)
+
+    def finish_if_complete(self) -> bool:
+        """
+        Finish the run only if every item was downloaded and interpreted;
+        otherwise leave it open for `--resume` and return False.
+        """
+        items = self.items()
+        remaining = [item for item in items if item.state != STATE_DOWNLOADED or not item.interpreted]
+        if remaining:
+            logger.warning(
+                "Journal run %s left open: %d of %d inputs not yet downloaded and interpreted "
+                "(continue with --resume)",
+                self.run_id,
+                len(remaining),
+                len(items),
+            )
+            return False
+        self.finish()
+        return True
+
+    def _resolve(self, position: int) -> int:
+        return position if self._indices is None else self._indices[position]
+
+
+__all__ = [
+    "JobJournal",
+    "JournalItem",
+    "JournalRun",
+    "RUN_MODE_FILES",
+    "RUN_MODE_URL",
+    "RUN_MODE_URLS",
+    "STATE_DOWNLOADED",
+    "STATE_PENDING",
+    "STATE_SUBMITTED",
+    "STATE_UPLOADED",
+]
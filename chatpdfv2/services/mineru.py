@@ -1,42 +1,469 @@
 from __future__ import annotations
 
+import base64
+import contextvars
+import hashlib
 import logging
+import queue
 import re
 import shutil
+import tempfile
+import threading
 import time
-import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from tempfile import TemporaryDirectory
-from typing import Dict
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence, TypeVar
 from urllib.parse import unquote, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from ..utils import sha256_file
+from .conversion_cache import CacheEntry, ConversionCache, url_digest
+from .journal import (
+    RUN_MODE_FILES,
+    RUN_MODE_URL,
+    RUN_MODE_URLS,
+    STATE_DOWNLOADED,
+    STATE_SUBMITTED,
+    STATE_UPLOADED,
+    JournalItem,
+    JournalRun,
+)
+from .mineru_poller import MinerUPoller
+from .result_package import extract_result_package
 
 logger = logging.getLogger("chatpdf")
 
 BASE_URL = "https://mineru.net/api/v4"
 
+T = TypeVar("T")
+
+_MB = 1024 * 1024
+
+# MinerU accepts at most this many files per batch request.
+MINERU_BATCH_LIMIT = 200
+
+# Cache variant for single-URL tasks, which do not pin a model version.
+SINGLE_TASK_VARIANT = "default"
+
+DEFAULT_DOWNLOAD_CHUNK_SIZE = _MB
+
+# How often waits inside a background result stream check whether its
+# consumer has stopped reading.
+_STOP_CHECK_SECONDS = 0.5
+
+# Set by _iterate_in_background for the threads driving one result stream.
+_stream_stop: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    "chatpdf_mineru_stream_stop", default=None
+)
+
+
+class MinerUClient:
+    """
+    Own the pooled, keep-alive HTTP sessions used for all MinerU traffic.
+
+    API calls go through an authenticated session, while presigned uploads and
+    result/PDF downloads use a separate session so the bearer token is never
+    sent to the storage CDN. Both sessions reuse TCP/TLS connections across
+    polls, uploads and downloads.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        *,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        request_timeout: int = 30,
+        transfer_timeout: int = 120,
+        max_retries: int = 3,
+        base_delay: int = 2,
+        poll_min_interval: float = 1.0,
+        poll_max_interval: float = 20.0,
+        download_chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE,
+    ) -> None:
+        self.poll_min_interval = poll_min_interval
+        self.download_chunk_size = download_chunk_size
+        self.poll_max_interval = poll_max_interval
+        self.request_timeout = request_timeout
+        self.transfer_timeout = transfer_timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+        self.api_session = _build_session(pool_connections, pool_maxsize)
+        self.api_session.headers.update(_mineru_headers(api_key))
+        self.transfer_session = _build_session(pool_connections, pool_maxsize)
+        self._poller: Optional[MinerUPoller] = None
+        self._poller_lock = threading.Lock()
+
+    def __enter__(self) -> "MinerUClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def poller(self) -> MinerUPoller:
+        """
+        Shared status poller; started lazily on first use.
+        """
+        with self._poller_lock:
+            if self._poller is None:
+                self._poller = MinerUPoller(
+                    self,
+                    min_interval=self.poll_min_interval,
+                    max_interval=self.poll_max_interval,
+                )
+            return self._poller
+
+    def close(self) -> None:
+        if self._poller is not None:
+            self._poller.close()
+        self.api_session.close()
+        self.transfer_session.close()
+
+    def task_status(self, task_id: str) -> dict:
+        task_data = self.request("GET", f"{BASE_URL}/extract/task/{task_id}").json()
+        if task_data.get("code") != 0:
+            raise RuntimeError(f"MinerU task query failed: {task_data}")
+        return task_data["data"]
+
+    def batch_status(self, batch_id: str) -> dict:
+        logger.debug("Getting batch results for batch_id: %s", batch_id)
+        response = self.request(
+            "GET",
+            f"{BASE_URL}/extract-results/batch/{batch_id}",
+        ).json()
+        if response.get("code") != 0:
+            raise RuntimeError(f"MinerU batch results query failed: {response}")
+        return response["data"]
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Call the MinerU API, retrying on transport errors and non-200 responses.
+        """
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = self.api_session.request(
+                    method, url, timeout=self.request_timeout, **kwargs
+                )
+                if response.status_code == 200:
+                    return response
+                logger.warning(
+                    "MinerU API %s %s returned status %s (attempt %s/%s)",
+                    method,
+                    url,
+                    response.status_code,
+                    attempt,
+                    self.max_retries,
+                )
+            except requests.RequestException as exc:
+                logger.warning(
+                    "MinerU API %s %s request error on attempt %s/%s: %s",
+                    method,
+                    url,
+                    attempt,
+                    self.max_retries,
+                    exc,
+                )
+            if attempt < self.max_retries:
+                time.sleep(self.base_delay * (2 ** (attempt - 1)))
+        raise RuntimeError(
+            f"MinerU API request failed after {self.max_retries} attempts: {url}"
+        )
+
+    def download(
+        self,
+        url: str,
+        destination: Path,
+        *,
+        sha256: Optional[str] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """
+        Stream `url` into `destination`, resuming with Range requests after
+        dropped connections instead of starting over.
+
+        Data lands in a `.part` file that is only renamed into place once its
+        size matches what the server announced and its checksum (Content-MD5
+        when the server sends one, plus `sha256` when given) verifies. Setting
+        `stop` abandons the transfer at the next buffer with DownloadCancelled.
+        """
+        logger.info("Downloading file from %s to %s", url, destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        partial = destination.with_name(destination.name + ".part")
+        partial.unlink(missing_ok=True)
+        state = _DownloadState()
+        try:
+            for attempt in range(1, self.max_retries + 1):
+                try:
+                    self._download_range(url, partial, state, stop)
+                    _verify_download(partial, state, sha256)
+                    partial.replace(destination)
+                    return
+                except (requests.RequestException, OSError, _IncompleteDownload) as exc:
+                    if isinstance(exc, _ChecksumMismatch):
+                        partial.unlink(missing_ok=True)
+                        state.reset()
+                    logger.warning(
+                        "Download of %s stopped at %.1f MB (attempt %s/%s): %s",
+                        url,
+                        _size_of(partial) / _MB,
+                        attempt,
+                        self.max_retries,
+                        exc,
+                    )
+                    if attempt == self.max_retries:
+                        raise RuntimeError(
+                            f"Failed to download {url} after {self.max_retries} attempts: {exc}"
+                        ) from exc
+                    time.sleep(self.base_delay * (2 ** (attempt - 1)))
+        finally:
+            partial.unlink(missing_ok=True)
+
+    def _download_range(
+        self,
+        url: str,
+        partial: Path,
+        state: "_DownloadState",
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        offset = _size_of(partial)
+        headers = {}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            if state.validator:
+                headers["If-Range"] = state.validator
+        with self.transfer_session.get(
+            url, headers=headers, stream=True, timeout=self.transfer_timeout
+        ) as resp:
+            if resp.status_code == 416:
+                total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit() and int(total) == offset:
+                    return
+                partial.unlink(missing_ok=True)
+                raise _IncompleteDownload(f"server rejected resume at byte {offset}")
+            resp.raise_for_status()
+            if resp.status_code == 206:
+                total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+                state.total = int(total) if total.isdigit() else state.total
+                logger.info("Resuming download of %s at %.1f MB", url, offset / _MB)
+            else:
+                # Full body: either a fresh start or the server ignored the Range.
+                offset = 0
+                length = resp.headers.get("Content-Length", "")
+                state.total = int(length) if length.isdigit() else None
+                state.content_md5 = resp.headers.get("Content-MD5")
+                state.validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+            with partial.open("r+b" if offset else "wb") as fh:
+                fh.seek(offset)
+                fh.truncate()
+                for chunk in resp.iter_content(chunk_size=self.download_chunk_size):
+                    if stop is not None and stop.is_set():
+                        raise DownloadCancelled(f"Download of {url} cancelled")
+                    if chunk:
+                        fh.write(chunk)
+        received = _size_of(partial)
+        if state.total is not None and received != state.total:
+            raise _IncompleteDownload(f"received {received} of {state.total} bytes")
+
+    def upload(self, url: str, file_path: Path) -> requests.Response:
+        # Presigned upload URLs must not carry a Content-Type header.
+        with open(file_path, "rb") as fh:
+            return self.transfer_session.put(url, data=fh, timeout=self.transfer_timeout)
+
+
+@dataclass
+class _DownloadState:
+    """What the server told us about a file across resumed download attempts."""
+
+    total: Optional[int] = None
+    content_md5: Optional[str] = None
+    validator: Optional[str] = None
+
+    def reset(self) -> None:
+        self.total = self.content_md5 = self.validator = None
+
+
+class DownloadCancelled(Exception):
+    """A download was abandoned because its `stop` event was set."""
+
+
+class _IncompleteDownload(Exception):
+    pass
+
+
+class _ChecksumMismatch(_IncompleteDownload):
+    pass
+
+
+def _size_of(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _verify_download(path: Path, state: _DownloadState, sha256: Optional[str]) -> None:
+    if not state.content_md5 and not sha256:
+        return
+    md5_digest = hashlib.md5(usedforsecurity=False)
+    sha256_digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(_MB), b""):
+            md5_digest.update(block)
+            sha256_digest.update(block)
+    if state.content_md5 and base64.b64encode(md5_digest.digest()).decode() != state.content_md5:
+        raise _ChecksumMismatch("Content-MD5 mismatch")
+    if sha256 and sha256_digest.hexdigest() != sha256.lower():
+        raise _ChecksumMismatch("SHA-256 mismatch")
+
+
+def _build_session(pool_connections: int, pool_maxsize: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class _OriginalFetcher:
+    """
+    Download source PDFs into a staging directory while MinerU is still
+    converting them, so copying the original into the task directory at the
+    end is a local move rather than another network round trip.
+    """
+
+    def __init__(self, client: MinerUClient, output_root: Path, *, max_workers: int) -> None:
+        output_root.mkdir(parents=True, exist_ok=True)
+        self._client = client
+        self._staging = Path(tempfile.mkdtemp(prefix=".originals-", dir=output_root))
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="mineru-original",
+        )
+        self._fetches: dict[str, Future] = {}
+        self._stop = threading.Event()
+
+    def __enter__(self) -> "_OriginalFetcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # Copies nobody placed are no longer wanted; running downloads stop at
+        # their next buffer. On an error or abort, don't even wait for that.
+        self._stop.set()
+        self._pool.shutdown(wait=exc_info[0] is None, cancel_futures=True)
+        shutil.rmtree(self._staging, ignore_errors=True)
+
+    def start(self, urls: Iterable[str]) -> None:
+        for url in urls:
+            if url not in self._fetches:
+                staged = self._staging / f"{len(self._fetches)}.pdf"
+                self._fetches[url] = self._pool.submit(self._fetch, url, staged)
+
+    def place(self, url: str, destination: Path) -> None:
+        """
+        Move the prefetched copy of `url` to `destination`, fetching it now
+        if it was never started; failures are logged, not raised.
+        """
+        self.start([url])
+        try:
+            shutil.move(self._fetches[url].result(), destination)
+        except Exception as exc:
+            logger.warning("Failed to download original PDF %s: %s", url, exc)
+
+    def _fetch(self, url: str, staged: Path) -> Path:
+        self._client.download(url, staged, stop=self._stop)
+        return staged
+
+
+@contextmanager
+def _fetching_originals(
+    client: MinerUClient,
+    urls: Iterable[str],
+    output_root: Path,
+    *,
+    enabled: bool,
+    max_workers: int,
+) -> Iterator[Optional[_OriginalFetcher]]:
+    """
+    Start background downloads of `urls` unless original copies are disabled.
+    """
+    if not enabled:
+        yield None
+        return
+    with _OriginalFetcher(client, output_root, max_workers=max_workers) as originals:
+        originals.start(urls)
+        yield originals
+
+
+@contextmanager
+def _client_scope(client: Optional[MinerUClient], api_key: str) -> Iterator[MinerUClient]:
+    """
+    Yield the caller's client, or a temporary one that is closed afterwards.
+    """
+    if client is not None:
+        yield client
+        return
+    with MinerUClient(api_key) as owned:
+        yield owned
+
 
 def process_pdf_via_mineru(
     pdf_url: str,
     *,
     output_root: Path,
     api_key: str,
-    poll_interval: int = 5,
+    poll_interval: Optional[float] = None,
     timeout_seconds: int = 600,
+    client: Optional[MinerUClient] = None,
+    cache: Optional[ConversionCache] = None,
+    journal: Optional[JournalRun] = None,
+    fetch_original: bool = True,
 ) -> Path:
     """
     Submit a PDF to MinerU, poll until complete, and return the resulting markdown path.
+
+    Polling is adaptive and shared across calls using the same client;
+    `poll_interval`, if given, caps the interval between status checks.
+    Unless `fetch_original` is False, a copy of the source PDF is downloaded
+    next to the markdown while MinerU works on it.
     """
-    headers = _mineru_headers(api_key)
-    parsed_url = urlparse(pdf_url)
-    original_name = Path(unquote(parsed_url.path)).name or "document.pdf"
-    stem = _sanitize_basename(Path(original_name).stem)
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    task_label = f"{stem}_{timestamp}"
-    target_dir = output_root / task_label
-    target_dir.mkdir(parents=True, exist_ok=True)
+    with _client_scope(client, api_key) as mineru:
+        return _process_pdf(
+            mineru,
+            pdf_url,
+            output_root=output_root,
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+            cache=cache,
+            journal=journal,
+            fetch_original=fetch_original,
+        )
+
+
+def _process_pdf(
+    client: MinerUClient,
+    pdf_url: str,
+    *,
+    output_root: Path,
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+    cache: Optional[ConversionCache],
+    journal: Optional[JournalRun] = None,
+    fetch_original: bool = True,
+) -> Path:
+    entry = cache.get_url(pdf_url, SINGLE_TASK_VARIANT) if cache else None
+    if entry is not None:
+        markdown_path = _restore_cached(cache, entry, output_root, _url_stem(pdf_url))[1]
+        if journal is not None:
+            journal.downloaded(0, markdown_path)
+        return markdown_path
 
     payload = {
         "url": pdf_url,
@@ -46,58 +473,73 @@ def process_pdf_via_mineru(
     }
     logger.info("Submitting MinerU extraction task for %s", pdf_url)
 
-    submission = _request_with_retries(
+    submission = client.request(
         "POST",
         f"{BASE_URL}/extract/task",
         json=payload,
-        headers=headers,
     ).json()
     if submission.get("code") != 0:
         raise RuntimeError(f"MinerU task submission failed: {submission}")
 
     task_id = submission["data"]["task_id"]
     logger.info("MinerU task created: %s", task_id)
+    if journal is not None:
+        journal.record(STATE_SUBMITTED, [0], task_id=task_id)
 
-    deadline = time.time() + timeout_seconds
-    task_info: Dict[str, str] | None = None
-    while time.time() < deadline:
-        task_data = _request_with_retries(
-            "GET",
-            f"{BASE_URL}/extract/task/{task_id}",
-            headers=headers,
-        ).json()
-        if task_data.get("code") != 0:
-            raise RuntimeError(f"MinerU task query failed: {task_data}")
+    return _finish_pdf_task(
+        client,
+        pdf_url,
+        task_id,
+        output_root=output_root,
+        poll_interval=poll_interval,
+        timeout_seconds=timeout_seconds,
+        cache=cache,
+        journal=journal,
+        fetch_original=fetch_original,
+    )
 
-        task_info = task_data["data"]
-        state = task_info.get("state")
-        logger.info("MinerU task %s state: %s", task_id, state)
 
-        if state == "done":
-            break
-        if state == "failed":
-            raise RuntimeError(
-                f"MinerU task {task_id} failed: {task_info.get('err_msg', 'unknown reason')}"
-            )
-        time.sleep(poll_interval)
-    else:
-        raise TimeoutError(f"Timed out waiting for MinerU task {task_id} to finish")
+def _finish_pdf_task(
+    client: MinerUClient,
+    pdf_url: str,
+    task_id: str,
+    *,
+    output_root: Path,
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+    cache: Optional[ConversionCache],
+    journal: Optional[JournalRun],
+    fetch_original: bool = True,
+) -> Path:
+    """
+    Wait for a submitted single-URL task and unpack its result.
+    """
+    with _fetching_originals(
+        client, [pdf_url], output_root, enabled=fetch_original, max_workers=1
+    ) as originals:
+        task_info = _wait_for_task(
+            client,
+            task_id,
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+        )
 
-    zip_url = task_info.get("full_zip_url") if task_info else None
-    if not zip_url:
-        raise RuntimeError("MinerU task completed but no result package URL provided")
+        zip_url = task_info.get("full_zip_url")
+        if not zip_url:
+            raise RuntimeError("MinerU task completed but no result package URL provided")
 
-    with TemporaryDirectory() as tmpdir:
-        zip_path = Path(tmpdir) / "result.zip"
-        _download_file(zip_url, zip_path)
-        markdown_path = _extract_markdown_from_zip(zip_path, target_dir)
+        task_label, target_dir = _create_task_dir(output_root, _url_stem(pdf_url))
+        markdown_path = extract_result_package(client, zip_url, target_dir)
 
-    pdf_destination = target_dir / f"{task_label}.pdf"
-    try:
-        _download_file(pdf_url, pdf_destination)
-    except Exception as exc:
-        logger.warning("Failed to download original PDF %s: %s", pdf_url, exc)
+        pdf_destination = target_dir / f"{task_label}.pdf"
+        if originals is not None:
+            originals.place(pdf_url, pdf_destination)
 
+    _cache_url_result(
+        cache, pdf_url, SINGLE_TASK_VARIANT, target_dir, markdown_path, pdf_destination
+    )
+    if journal is not None:
+        journal.downloaded(0, markdown_path)
     logger.info(
         "MinerU processing complete. Markdown: %s, PDF: %s",
         markdown_path,
@@ -106,6 +548,68 @@ def process_pdf_via_mineru(
     return markdown_path
 
 
+def _wait_for_task(
+    client: MinerUClient,
+    task_id: str,
+    *,
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+) -> dict:
+    """
+    Block until the shared poller reports the task as done; raise on failure or timeout.
+    """
+    deadline = time.time() + timeout_seconds
+    updates: "queue.Queue[tuple[str, object]]" = queue.Queue()
+    client.poller.watch_task(task_id, updates, max_interval=poll_interval)
+    try:
+        while True:
+            try:
+                kind, value = _next_event(updates, deadline - time.time())
+            except queue.Empty:
+                raise TimeoutError(f"Timed out waiting for MinerU task {task_id} to finish")
+            if kind == "error":
+                raise value  # type: ignore[misc]
+            task_info: dict = value  # type: ignore[assignment]
+            state = task_info.get("state")
+            if state == "done":
+                return task_info
+            if state == "failed":
+                raise RuntimeError(
+                    f"MinerU task {task_id} failed: {task_info.get('err_msg', 'unknown reason')}"
+                )
+    finally:
+        client.poller.unwatch("task", task_id)
+
+
+def _restore_cached(
+    cache: ConversionCache,
+    entry: CacheEntry,
+    output_root: Path,
+    stem: str,
+) -> tuple[Path, Path]:
+    task_label, target_dir = _create_task_dir(output_root, stem)
+    markdown_path = cache.restore(entry, target_dir, source_name=f"{task_label}.pdf")
+    logger.info("Reused cached MinerU result for %s: %s", stem, markdown_path)
+    return target_dir, markdown_path
+
+
+def _cache_url_result(
+    cache: Optional[ConversionCache],
+    url: str,
+    variant: str,
+    target_dir: Path,
+    markdown_path: Path,
+    pdf_path: Path,
+) -> None:
+    if cache is None:
+        return
+    try:
+        digest = sha256_file(pdf_path) if pdf_path.exists() else url_digest(url)
+        cache.put(digest, variant, target_dir, markdown_path, source_pdf=pdf_path, url=url)
+    except Exception as exc:
+        logger.warning("Failed to cache MinerU result for %s: %s", url, exc)
+
+
 def _mineru_headers(api_key: str) -> Dict[str, str]:
     return {
         "Authorization": f"Bearer {api_key}",
@@ -114,67 +618,14 @@ def _mineru_headers(api_key: str) -> Dict[str, str]:
     }
 
 
-def _request_with_retries(
-    method: str,
-    url: str,
-    *,
-    max_retries: int = 3,
-    base_delay: int = 2,
-    **kwargs,
-) -> requests.Response:
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = requests.request(method, url, timeout=30, **kwargs)
-            if response.status_code == 200:
-                return response
-            logger.warning(
-                "MinerU API %s %s returned status %s (attempt %s/%s)",
-                method,
-                url,
-                response.status_code,
-                attempt,
-                max_retries,
-            )
-        except requests.RequestException as exc:
-            logger.warning(
-                "MinerU API %s %s request error on attempt %s/%s: %s",
-                method,
-                url,
-                attempt,
-                max_retries,
-                exc,
-            )
-        if attempt < max_retries:
-            time.sleep(base_delay * (2 ** (attempt - 1)))
-    raise RuntimeError(f"MinerU API request failed after {max_retries} attempts: {url}")
-
-
 def _sanitize_basename(name: str) -> str:
     stem = re.sub(r"[^\w.\-]+", "_", name).strip("._")
     return stem or "document"
 
 
-def _download_file(url: str, destination: Path) -> None:
-    logger.info("Downloading file from %s to %s", url, destination)
-    with requests.get(url, stream=True, timeout=120) as resp:
-        resp.raise_for_status()
-        destination.parent.mkdir(parents=True, exist_ok=True)
-        with destination.open("wb") as fh:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    fh.write(chunk)
-
-
-def _extract_markdown_from_zip(zip_path: Path, target_dir: Path) -> Path:
-    with zipfile.ZipFile(zip_path) as zf:
-        zf.extractall(target_dir)
-    markdown_files = sorted(target_dir.rglob("*.md"))
-    if not markdown_files:
-        raise FileNotFoundError("No markdown file found in MinerU result package")
-    markdown_files.sort(key=lambda item: item.stat().st_size, reverse=True)
-    selected = markdown_files[0]
-    logger.info("Selected markdown file %s from MinerU results", selected)
-    return selected
+def _url_stem(url: str) -> str:
+    filename = Path(unquote(urlparse(url).path)).name or "document.pdf"
+    return _sanitize_basename(Path(filename).stem)
 
 
 def process_local_files_via_mineru(
@@ -182,20 +633,158 @@ def process_local_files_via_mineru(
     *,
     output_root: Path,
     api_key: str,
-    poll_interval: int = 5,
+    poll_interval: Optional[float] = None,
     timeout_seconds: int = 600,
     model_version: str = "vlm",
+    download_workers: int = 4,
+    upload_workers: int = 4,
+    batch_size: int = MINERU_BATCH_LIMIT,
+    max_in_flight_batches: int = 2,
+    client: Optional[MinerUClient] = None,
+    cache: Optional[ConversionCache] = None,
+    journal: Optional[JournalRun] = None,
 ) -> list[Path]:
     """
     Submit local files to MinerU for batch processing, poll until complete, and return the resulting markdown paths.
     """
-    headers = _mineru_headers(api_key)
-    
-    # Prepare file data for batch upload URL request
-    files_data = []
+    with _client_scope(client, api_key) as mineru:
+        results = sorted(
+            _iter_local_files(
+                mineru,
+                file_paths,
+                output_root=output_root,
+                poll_interval=poll_interval,
+                timeout_seconds=timeout_seconds,
+                model_version=model_version,
+                download_workers=download_workers,
+                upload_workers=upload_workers,
+                batch_size=batch_size,
+                max_in_flight_batches=max_in_flight_batches,
+                cache=cache,
+                journal=journal,
+            )
+        )
+    return [markdown_path for _, markdown_path in results]
+
+
+def iter_local_files_via_mineru(
+    file_paths: list[Path],
+    *,
+    output_root: Path,
+    api_key: str,
+    poll_interval: Optional[float] = None,
+    timeout_seconds: int = 600,
+    model_version: str = "vlm",
+    download_workers: int = 4,
+    upload_workers: int = 4,
+    batch_size: int = MINERU_BATCH_LIMIT,
+    max_in_flight_batches: int = 2,
+    client: Optional[MinerUClient] = None,
+    cache: Optional[ConversionCache] = None,
+    journal: Optional[JournalRun] = None,
+) -> Iterator[Path]:
+    """
+    Like `process_local_files_via_mineru`, but yield each markdown path as soon as
+    its task has been downloaded, in completion order.
+    """
+    with _client_scope(client, api_key) as mineru:
+        results = _iter_local_files(
+            mineru,
+            file_paths,
+            output_root=output_root,
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+            model_version=model_version,
+            download_workers=download_workers,
+            upload_workers=upload_workers,
+            batch_size=batch_size,
+            max_in_flight_batches=max_in_flight_batches,
+            cache=cache,
+            journal=journal,
+        )
+        with closing(_iterate_in_background(results)) as stream:
+            for _, markdown_path in stream:
+                yield markdown_path
+
+
+def _iter_local_files(
+    client: MinerUClient,
+    file_paths: list[Path],
+    *,
+    output_root: Path,
+    model_version: str,
+    batch_size: int,
+    max_in_flight_batches: int,
+    cache: Optional[ConversionCache],
+    journal: Optional[JournalRun] = None,
+    **batch_options,
+) -> Iterator[tuple[int, Path]]:
     for file_path in file_paths:
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
+
+    digests: dict[Path, str] = {}
+    pending: list[int] = []
+    for index, file_path in enumerate(file_paths):
+        if cache is None:
+            pending.append(index)
+            continue
+        digests[file_path] = sha256_file(file_path)
+        entry = cache.get(digests[file_path], model_version)
+        if entry is None:
+            pending.append(index)
+            continue
+        target_dir, markdown_path = _restore_cached(
+            cache, entry, output_root, _sanitize_basename(file_path.stem)
+        )
+        _copy_original(file_path, target_dir)
+        if journal is not None:
+            journal.downloaded(index, markdown_path)
+        yield index, markdown_path
+    if cache is not None:
+        logger.info(
+            "Conversion cache: %d/%d files already converted",
+            len(file_paths) - len(pending),
+            len(file_paths),
+        )
+    if not pending:
+        return
+
+    for position, markdown_path in _run_sharded(
+        [file_paths[index] for index in pending],
+        partial(
+            _iter_local_batch,
+            client,
+            output_root=output_root,
+            model_version=model_version,
+            cache=cache,
+            digests=digests,
+            **batch_options,
+        ),
+        batch_size=batch_size,
+        max_in_flight=max_in_flight_batches,
+        journal=journal.subset(pending) if journal is not None else None,
+    ):
+        yield pending[position], markdown_path
+
+
+def _iter_local_batch(
+    client: MinerUClient,
+    file_paths: list[Path],
+    *,
+    output_root: Path,
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+    model_version: str,
+    download_workers: int,
+    upload_workers: int,
+    cache: Optional[ConversionCache],
+    digests: dict[Path, str],
+    journal: Optional[JournalRun] = None,
+) -> Iterator[tuple[int, Path]]:
+    # Prepare file data for batch upload URL request
+    files_data = []
+    for file_path in file_paths:
         files_data.append({
             "name": file_path.name,
             "data_id": file_path.stem
@@ -209,11 +798,10 @@ def process_local_files_via_mineru(
     
     logger.info("Requesting batch upload URLs for %d files", len(file_paths))
     
-    response = _request_with_retries(
+    response = client.request(
         "POST",
         f"{BASE_URL}/file-urls/batch",
         json=payload,
-        headers=headers,
     ).json()
     
     if response.get("code") != 0:
@@ -223,29 +811,76 @@ def process_local_files_via_mineru(
     file_urls = response["data"]["file_urls"]
     
     logger.info("Batch ID: %s, received %d upload URLs", batch_id, len(file_urls))
+    if journal is not None:
+        journal.record(STATE_SUBMITTED, range(len(file_paths)), batch_id=batch_id)
     
-    # Upload files to the provided URLs
-    for i, (file_path, upload_url) in enumerate(zip(file_paths, file_urls)):
-        logger.info("Uploading file %d/%d: %s", i + 1, len(file_paths), file_path)
-        try:
-            with open(file_path, 'rb') as f:
-                upload_response = requests.put(upload_url, data=f, timeout=120)
-                if upload_response.status_code != 200:
-                    logger.error("File upload failed for %s: %s", file_path, upload_response.status_code)
-                    raise RuntimeError(f"Failed to upload file {file_path}: {upload_response.status_code}")
-                logger.info("Successfully uploaded %s", file_path)
-        except Exception as e:
-            logger.error("Error uploading file %s: %s", file_path, e)
-            raise RuntimeError(f"Error uploading file {file_path}: {e}")
+    # Upload files to the provided URLs in parallel
+    report = _upload_files(
+        client,
+        list(zip(file_paths, file_urls)),
+        max_workers=upload_workers,
+    )
+    if not report.uploaded:
+        raise RuntimeError(f"All {len(file_paths)} uploads failed for batch {batch_id}")
+    if journal is not None:
+        journal.record(
+            STATE_UPLOADED,
+            [position for position, path in enumerate(file_paths) if path not in report.failed],
+        )
     
-    # Wait for processing to complete and get results
-    return _wait_for_batch_completion(
-        batch_id=batch_id,
-        file_paths=file_paths,
+    # Harvest each task as soon as MinerU finishes it
+    yield from _harvest_local_batch(
+        client,
+        batch_id,
+        file_paths,
+        skip_sources={file_paths.index(path) for path in report.failed},
         output_root=output_root,
-        api_key=api_key,
         poll_interval=poll_interval,
         timeout_seconds=timeout_seconds,
+        model_version=model_version,
+        download_workers=download_workers,
+        cache=cache,
+        digests=digests,
+        journal=journal,
+    )
+
+
+def _harvest_local_batch(
+    client: MinerUClient,
+    batch_id: str,
+    file_paths: list[Path],
+    *,
+    skip_sources: Iterable[int],
+    output_root: Path,
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+    model_version: str,
+    download_workers: int,
+    cache: Optional[ConversionCache],
+    digests: dict[Path, str],
+    journal: Optional[JournalRun],
+) -> Iterator[tuple[int, Path]]:
+    yield from _harvest_batch(
+        client,
+        batch_id,
+        file_paths,
+        skip_sources=skip_sources,
+        journal=journal,
+        matches=_file_name_matches,
+        process_task=partial(
+            _process_single_task_result,
+            client,
+            output_root=output_root,
+            cache=cache,
+            variant=model_version,
+            digests=digests,
+        ),
+        process_completed=partial(
+            _process_completed_batch, client, file_paths=file_paths, output_root=output_root
+        ),
+        poll_interval=poll_interval,
+        timeout_seconds=timeout_seconds,
+        download_workers=download_workers,
     )
 
 
@@ -253,94 +888,442 @@ def get_batch_results(
     batch_id: str,
     *,
     api_key: str,
+    client: Optional[MinerUClient] = None,
 ) -> dict:
     """
     Get batch processing results by batch_id.
     """
-    headers = _mineru_headers(api_key)
-    
-    logger.info("Getting batch results for batch_id: %s", batch_id)
-    
-    response = _request_with_retries(
-        "GET",
-        f"{BASE_URL}/extract-results/batch/{batch_id}",
-        headers=headers,
-    ).json()
-    
-    if response.get("code") != 0:
-        raise RuntimeError(f"MinerU batch results query failed: {response}")
-    
-    return response["data"]
+    with _client_scope(client, api_key) as mineru:
+        return mineru.batch_status(batch_id)
 
 
-def _wait_for_batch_completion(
+def _harvest_batch(
+    client: MinerUClient,
     batch_id: str,
-    file_paths: list[Path],
-    output_root: Path,
-    api_key: str,
-    poll_interval: int,
+    sources: Sequence[T],
+    *,
+    skip_sources: Iterable[int] = (),
+    journal: Optional[JournalRun] = None,
+    matches: Callable[[dict, T], bool],
+    process_task: Callable[[dict, T], Path],
+    process_completed: Callable[[dict], list[tuple[int, Path]]],
+    poll_interval: Optional[float],
     timeout_seconds: int,
-) -> list[Path]:
+    download_workers: int,
+) -> Iterator[tuple[int, Path]]:
     """
-    Wait for batch processing to complete and download results.
+    Watch a batch and download each task's result package as soon as that task is done.
+
+    Status updates come from the client's shared poller and downloads run on a
+    bounded thread pool; both report back through one event queue. Finished
+    results are yielded as `(source_index, markdown_path)` in completion order.
+    Tasks belonging to `skip_sources` (failed uploads, or results already
+    downloaded before a resume) are neither waited for nor downloaded.
     """
+    results = _harvest_events(
+        client,
+        batch_id,
+        sources,
+        skip_sources=skip_sources,
+        matches=matches,
+        process_task=process_task,
+        process_completed=process_completed,
+        poll_interval=poll_interval,
+        timeout_seconds=timeout_seconds,
+        download_workers=download_workers,
+    )
+    for source_index, markdown_path in results:
+        if journal is not None:
+            journal.downloaded(source_index, markdown_path)
+        yield source_index, markdown_path
+
+
+def _harvest_events(
+    client: MinerUClient,
+    batch_id: str,
+    sources: Sequence[T],
+    *,
+    skip_sources: Iterable[int],
+    matches: Callable[[dict, T], bool],
+    process_task: Callable[[dict, T], Path],
+    process_completed: Callable[[dict], list[tuple[int, Path]]],
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+    download_workers: int,
+) -> Iterator[tuple[int, Path]]:
     deadline = time.time() + timeout_seconds
-    markdown_paths = []
-    
-    while time.time() < deadline:
-        batch_data = get_batch_results(batch_id, api_key=api_key)
-        
-        logger.info("Batch %s status: %s", batch_id, batch_data.get("status"))
-        logger.debug("Batch data: %s", batch_data)
-        
-        # Check if all tasks are done - API uses "extract_result" instead of "tasks"
-        tasks = batch_data.get("extract_result", [])
-        if not tasks:
-            logger.warning("No tasks found in batch response, checking for direct status")
-            # Check if batch is directly completed
-            status = batch_data.get("status")
-            if status == "completed":
-                # Try to process based on available data
-                markdown_paths = _process_completed_batch(batch_data, file_paths, output_root, api_key)
-                if markdown_paths:
-                    return markdown_paths
-            logger.warning("No tasks found in batch response")
-            time.sleep(poll_interval)
+    claimed: set[int] = set(skip_sources)
+    skipped = [sources[index] for index in claimed]
+    settled: set[int] = set()
+    pending: dict[Future, int] = {}
+    finished = False
+    events: "queue.Queue[tuple[str, object]]" = queue.Queue()
+
+    client.poller.watch_batch(batch_id, events, max_interval=poll_interval)
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max(1, download_workers),
+            thread_name_prefix="mineru-harvest",
+        ) as pool:
+            while not finished or pending:
+                timeout = None if finished else deadline - time.time()
+                try:
+                    kind, value = _next_event(events, timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"Timed out waiting for batch {batch_id} to finish")
+                except _StreamStopped:
+                    # Downloads not started yet are no longer wanted.
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+
+                if kind == "error":
+                    raise value  # type: ignore[misc]
+                if kind == "harvested":
+                    yield from _collect_harvested(value, pending)  # type: ignore[arg-type]
+                    continue
+                if finished:
+                    continue
+
+                batch_data: dict = value  # type: ignore[assignment]
+                # API uses "extract_result" instead of "tasks"
+                tasks = batch_data.get("extract_result", [])
+                if not tasks:
+                    # Check if batch is directly completed
+                    if batch_data.get("status") == "completed":
+                        logger.warning("No tasks found in completed batch %s, using result URLs", batch_id)
+                        results = process_completed(batch_data)
+                        if results:
+                            yield from (result for result in results if result[0] not in claimed)
+                            return
+                    continue
+
+                for position, task in enumerate(tasks):
+                    if position in settled:
+                        continue
+                    state = task.get("state")
+                    if any(matches(task, source) for source in skipped):
+                        settled.add(position)
+                    elif state == "failed":
+                        settled.add(position)
+                        logger.warning(
+                            "MinerU task for %s failed: %s",
+                            task.get("file_name"),
+                            task.get("err_msg", "unknown reason"),
+                        )
+                    elif state == "done":
+                        settled.add(position)
+                        source_index = _claim_source(task, sources, matches, claimed)
+                        if source_index is None or not task.get("full_zip_url"):
+                            logger.warning(
+                                "Skipping finished task %s: no matching input or result package",
+                                task.get("file_name"),
+                            )
+                            continue
+                        future = pool.submit(process_task, task, sources[source_index])
+                        pending[future] = source_index
+                        future.add_done_callback(lambda done: events.put(("harvested", done)))
+
+                if len(settled) == len(tasks):
+                    finished = True
+                    client.poller.unwatch("batch", batch_id)
+    finally:
+        client.poller.unwatch("batch", batch_id)
+
+
+def _run_sharded(
+    items: Sequence[T],
+    run_batch: Callable[..., Iterator[tuple[int, Path]]],
+    *,
+    batch_size: int,
+    max_in_flight: int,
+    journal: Optional[JournalRun] = None,
+) -> Iterator[tuple[int, Path]]:
+    """
+    Split `items` into MinerU-sized batches and keep up to `max_in_flight` of
+    them submitted at once, so the next batch is uploaded while earlier ones
+    are still processing. Yields `(item_index, markdown_path)` as results land.
+    """
+    if not 0 < batch_size <= MINERU_BATCH_LIMIT:
+        raise ValueError(f"batch_size must be between 1 and {MINERU_BATCH_LIMIT}")
+    shards = [
+        (offset, list(items[offset : offset + batch_size]))
+        for offset in range(0, len(items), batch_size)
+    ]
+    if len(shards) <= 1:
+        yield from run_batch(list(items), journal=journal)
+        return
+
+    logger.info(
+        "Splitting %d inputs into %d MinerU batches of up to %d (%d in flight)",
+        len(items),
+        len(shards),
+        batch_size,
+        max_in_flight,
+    )
+    results: "queue.Queue[tuple[int, Path]]" = queue.Queue()
+
+    def _drain(offset: int, shard: list[T]) -> None:
+        if _stream_stopped():
+            return
+        shard_journal = None
+        if journal is not None:
+            shard_journal = journal.subset(range(offset, offset + len(shard)))
+        for index, markdown_path in run_batch(shard, journal=shard_journal):
+            results.put((offset + index, markdown_path))
+
+    failures = 0
+    with ThreadPoolExecutor(
+        max_workers=max(1, max_in_flight),
+        thread_name_prefix="mineru-batch",
+    ) as pool:
+        running = {
+            pool.submit(contextvars.copy_context().run, _drain, offset, shard): offset
+            for offset, shard in shards
+        }
+        while running or not results.empty():
+            if _stream_stopped():
+                raise _StreamStopped
+            try:
+                yield results.get(timeout=_STOP_CHECK_SECONDS)
+            except queue.Empty:
+                pass
+            for future in [future for future in running if future.done()]:
+                offset = running.pop(future)
+                exc = future.exception()
+                if exc is not None:
+                    failures += 1
+                    logger.error(
+                        "MinerU batch for inputs #%d-#%d failed: %s",
+                        offset + 1,
+                        min(offset + batch_size, len(items)),
+                        exc,
+                    )
+    if failures == len(shards):
+        raise RuntimeError(f"All {len(shards)} MinerU batches failed")
+
+
+def _claim_source(
+    task: dict,
+    sources: Sequence[T],
+    matches: Callable[[dict, T], bool],
+    claimed: set[int],
+) -> Optional[int]:
+    for index, source in enumerate(sources):
+        if index not in claimed and matches(task, source):
+            claimed.add(index)
+            return index
+    return None
+
+
+def _collect_harvested(future: Future, pending: dict[Future, int]) -> Iterator[tuple[int, Path]]:
+    source_index = pending.pop(future)
+    try:
+        yield source_index, future.result()
+    except Exception as exc:
+        logger.error("Failed to process MinerU result for input #%d: %s", source_index + 1, exc)
+
+
+class _StreamStopped(Exception):
+    """The consumer of a background result stream stopped reading it."""
+
+
+def _stream_stopped() -> bool:
+    stop = _stream_stop.get()
+    return stop is not None and stop.is_set()
+
+
+def _next_event(events: "queue.Queue[T]", timeout: Optional[float]) -> T:
+    """
+    `events.get(timeout=timeout)` that raises _StreamStopped instead of
+    waiting on once the stream's consumer has gone.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        if _stream_stopped():
+            raise _StreamStopped
+        wait = _STOP_CHECK_SECONDS
+        if deadline is not None:
+            wait = min(wait, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty
+        try:
+            return events.get(timeout=wait)
+        except queue.Empty:
             continue
-        
-        all_done = True
-        for task in tasks:
-            state = task.get("state")
-            if state not in ["done", "failed"]:
-                all_done = False
+
+
+def _iterate_in_background(items: Iterable[T]) -> Iterator[T]:
+    """
+    Drive `items` on a worker thread so polling keeps going while the caller
+    is busy with earlier results. Exceptions are re-raised in the caller.
+
+    Closing the returned iterator early stops the worker: waits inside the
+    stream give up, `items` is closed, and the thread is joined before this
+    returns, so nothing touches the client or journal afterwards.
+    """
+    buffer: "queue.Queue[tuple[str, object]]" = queue.Queue()
+    stop = threading.Event()
+
+    def _produce() -> None:
+        _stream_stop.set(stop)
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                buffer.put(("item", item))
+        except _StreamStopped:
+            pass
+        except BaseException as exc:  # propagate to the consumer
+            buffer.put(("error", exc))
+        else:
+            buffer.put(("end", None))
+        finally:
+            close = getattr(items, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except _StreamStopped:
+                    pass
+
+    worker = threading.Thread(target=_produce, name="mineru-stream", daemon=True)
+    worker.start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind == "item":
+                yield value  # type: ignore[misc]
+            elif kind == "error":
+                raise value  # type: ignore[misc]
+            else:
                 break
-        
-        if all_done:
-            # Process completed tasks
-            for task in tasks:
-                if task.get("state") == "done":
-                    file_name = task.get("file_name")
-                    original_file = next((fp for fp in file_paths if fp.name == file_name), None)
-                    if original_file and task.get("full_zip_url"):
-                        markdown_path = _process_single_task_result(
-                            task, original_file, output_root, api_key
-                        )
-                        markdown_paths.append(markdown_path)
-            break
-        
-        time.sleep(poll_interval)
-    else:
-        raise TimeoutError(f"Timed out waiting for batch {batch_id} to finish")
-    
-    return markdown_paths
+    finally:
+        stop.set()
+        worker.join()
+
+
+@dataclass
+class UploadReport:
+    """Outcome of uploading a set of local files to presigned URLs."""
+
+    uploaded: list[Path] = field(default_factory=list)
+    failed: dict[Path, str] = field(default_factory=dict)
+    total_bytes: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def throughput_mb_s(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.total_bytes / _MB / self.elapsed_seconds
+
+
+def _upload_files(
+    client: MinerUClient,
+    uploads: list[tuple[Path, str]],
+    *,
+    max_workers: int,
+) -> UploadReport:
+    """
+    Upload files concurrently, retrying each one independently.
+
+    A failed file is recorded in the report instead of aborting the batch.
+    """
+    report = UploadReport()
+    started = time.monotonic()
+    with ThreadPoolExecutor(
+        max_workers=max(1, max_workers),
+        thread_name_prefix="mineru-upload",
+    ) as pool:
+        futures = {
+            pool.submit(_upload_with_retries, client, upload_url, file_path): file_path
+            for file_path, upload_url in uploads
+        }
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                report.total_bytes += future.result()
+                report.uploaded.append(file_path)
+            except Exception as exc:
+                report.failed[file_path] = str(exc)
+    report.elapsed_seconds = time.monotonic() - started
+
+    logger.info(
+        "Uploaded %d/%d files (%.1f MB) in %.1fs, %.2f MB/s",
+        len(report.uploaded),
+        len(uploads),
+        report.total_bytes / _MB,
+        report.elapsed_seconds,
+        report.throughput_mb_s,
+    )
+    for file_path, reason in report.failed.items():
+        logger.error("Upload failed for %s: %s", file_path, reason)
+    return report
+
+
+def _upload_with_retries(client: MinerUClient, upload_url: str, file_path: Path) -> int:
+    size = file_path.stat().st_size
+    for attempt in range(1, client.max_retries + 1):
+        started = time.monotonic()
+        try:
+            response = client.upload(upload_url, file_path)
+            if response.status_code == 200:
+                elapsed = max(time.monotonic() - started, 1e-6)
+                logger.info(
+                    "Uploaded %s (%.1f MB, %.2f MB/s)",
+                    file_path.name,
+                    size / _MB,
+                    size / _MB / elapsed,
+                )
+                return size
+            error = f"status {response.status_code}"
+        except requests.RequestException as exc:
+            error = str(exc)
+        logger.warning(
+            "Upload of %s failed on attempt %s/%s: %s",
+            file_path,
+            attempt,
+            client.max_retries,
+            error,
+        )
+        if attempt < client.max_retries:
+            time.sleep(client.base_delay * (2 ** (attempt - 1)))
+    raise RuntimeError(f"Failed to upload file {file_path}: {error}")
+
+
+def _file_name_matches(task: dict, file_path: Path) -> bool:
+    return task.get("file_name") == file_path.name
+
+
+def _url_matches(task: dict, url: str) -> bool:
+    file_name = task.get("file_name")
+    return bool(file_name) and file_name in url
+
+
+def _create_task_dir(output_root: Path, stem: str) -> tuple[str, Path]:
+    """
+    Create a fresh `<stem>_<timestamp>` directory, never reusing an existing one
+    (results finishing within the same second would otherwise collide).
+    """
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    task_label = f"{stem}_{timestamp}"
+    suffix = 1
+    while True:
+        target_dir = output_root / task_label
+        try:
+            target_dir.mkdir(parents=True, exist_ok=False)
+            return task_label, target_dir
+        except FileExistsError:
+            suffix += 1
+            task_label = f"{stem}_{timestamp}_{suffix}"
 
 
 def _process_completed_batch(
+    client: MinerUClient,
     batch_data: dict,
+    *,
     file_paths: list[Path],
     output_root: Path,
-    api_key: str,
-) -> list[Path]:
+) -> list[tuple[int, Path]]:
     """
     Process a completed batch when no task information is available.
     """
@@ -357,15 +1340,9 @@ def _process_completed_batch(
             result_url = result_urls[i]
             try:
                 stem = _sanitize_basename(file_path.stem)
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                task_label = f"{stem}_{timestamp}"
-                target_dir = output_root / task_label
-                target_dir.mkdir(parents=True, exist_ok=True)
+                task_label, target_dir = _create_task_dir(output_root, stem)
                 
-                with TemporaryDirectory() as tmpdir:
-                    zip_path = Path(tmpdir) / "result.zip"
-                    _download_file(result_url, zip_path)
-                    markdown_path = _extract_markdown_from_zip(zip_path, target_dir)
+                markdown_path = extract_result_package(client, result_url, target_dir)
                 
                 # Copy original file to output directory
                 original_destination = target_dir / f"{task_label}{file_path.suffix}"
@@ -379,7 +1356,7 @@ def _process_completed_batch(
                     file_path.name,
                     markdown_path,
                 )
-                markdown_paths.append(markdown_path)
+                markdown_paths.append((i, markdown_path))
                 
             except Exception as e:
                 logger.error("Failed to process result for %s: %s", file_path.name, e)
@@ -388,36 +1365,35 @@ def _process_completed_batch(
 
 
 def _process_single_task_result(
+    client: MinerUClient,
     task: dict,
     original_file: Path,
+    *,
     output_root: Path,
-    api_key: str,
+    cache: Optional[ConversionCache] = None,
+    variant: str = "",
+    digests: Optional[dict[Path, str]] = None,
 ) -> Path:
     """
     Process a single completed task result.
     """
     stem = _sanitize_basename(original_file.stem)
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    task_label = f"{stem}_{timestamp}"
-    target_dir = output_root / task_label
-    target_dir.mkdir(parents=True, exist_ok=True)
     
     zip_url = task.get("full_zip_url")
     if not zip_url:
         raise RuntimeError(f"No result package URL for task {task.get('task_id')}")
     
-    with TemporaryDirectory() as tmpdir:
-        zip_path = Path(tmpdir) / "result.zip"
-        _download_file(zip_url, zip_path)
-        markdown_path = _extract_markdown_from_zip(zip_path, target_dir)
+    task_label, target_dir = _create_task_dir(output_root, stem)
+    markdown_path = extract_result_package(client, zip_url, target_dir)
     
-    # Copy original file to output directory
-    original_destination = target_dir / f"{task_label}{original_file.suffix}"
-    try:
-        shutil.copy2(original_file, original_destination)
-    except Exception as exc:
-        logger.warning("Failed to copy original file %s: %s", original_file, exc)
+    if cache is not None:
+        try:
+            digest = (digests or {}).get(original_file) or sha256_file(original_file)
+            cache.put(digest, variant, target_dir, markdown_path)
+        except Exception as exc:
+            logger.warning("Failed to cache MinerU result for %s: %s", original_file, exc)
     
+    _copy_original(original_file, target_dir)
     logger.info(
         "Batch processing complete for %s. Markdown: %s",
         original_file.name,
@@ -426,20 +1402,157 @@ def _process_single_task_result(
     return markdown_path
 
 
+def _copy_original(original_file: Path, target_dir: Path) -> None:
+    """
+    Copy a local input into its task directory as `<task_label><suffix>`.
+    """
+    original_destination = target_dir / f"{target_dir.name}{original_file.suffix}"
+    try:
+        shutil.copy2(original_file, original_destination)
+    except Exception as exc:
+        logger.warning("Failed to copy original file %s: %s", original_file, exc)
+
+
 def process_urls_via_mineru(
     urls: list[str],
     *,
     output_root: Path,
     api_key: str,
-    poll_interval: int = 5,
+    poll_interval: Optional[float] = None,
     timeout_seconds: int = 600,
     model_version: str = "vlm",
+    download_workers: int = 4,
+    batch_size: int = MINERU_BATCH_LIMIT,
+    max_in_flight_batches: int = 2,
+    client: Optional[MinerUClient] = None,
+    cache: Optional[ConversionCache] = None,
+    journal: Optional[JournalRun] = None,
+    fetch_original: bool = True,
 ) -> list[Path]:
     """
     Submit URLs to MinerU for batch processing, poll until complete, and return the resulting markdown paths.
     """
-    headers = _mineru_headers(api_key)
-    
+    with _client_scope(client, api_key) as mineru:
+        results = sorted(
+            _iter_urls(
+                mineru,
+                urls,
+                output_root=output_root,
+                poll_interval=poll_interval,
+                timeout_seconds=timeout_seconds,
+                model_version=model_version,
+                download_workers=download_workers,
+                batch_size=batch_size,
+                max_in_flight_batches=max_in_flight_batches,
+                cache=cache,
+                journal=journal,
+                fetch_original=fetch_original,
+            )
+        )
+    return [markdown_path for _, markdown_path in results]
+
+
+def iter_urls_via_mineru(
+    urls: list[str],
+    *,
+    output_root: Path,
+    api_key: str,
+    poll_interval: Optional[float] = None,
+    timeout_seconds: int = 600,
+    model_version: str = "vlm",
+    download_workers: int = 4,
+    batch_size: int = MINERU_BATCH_LIMIT,
+    max_in_flight_batches: int = 2,
+    client: Optional[MinerUClient] = None,
+    cache: Optional[ConversionCache] = None,
+    journal: Optional[JournalRun] = None,
+    fetch_original: bool = True,
+) -> Iterator[Path]:
+    """
+    Like `process_urls_via_mineru`, but yield each markdown path as soon as its
+    task has been downloaded, in completion order.
+    """
+    with _client_scope(client, api_key) as mineru:
+        results = _iter_urls(
+            mineru,
+            urls,
+            output_root=output_root,
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+            model_version=model_version,
+            download_workers=download_workers,
+            batch_size=batch_size,
+            max_in_flight_batches=max_in_flight_batches,
+            cache=cache,
+            journal=journal,
+            fetch_original=fetch_original,
+        )
+        with closing(_iterate_in_background(results)) as stream:
+            for _, markdown_path in stream:
+                yield markdown_path
+
+
+def _iter_urls(
+    client: MinerUClient,
+    urls: list[str],
+    *,
+    batch_size: int,
+    max_in_flight_batches: int,
+    output_root: Path,
+    model_version: str,
+    cache: Optional[ConversionCache],
+    journal: Optional[JournalRun] = None,
+    **batch_options,
+) -> Iterator[tuple[int, Path]]:
+    pending: list[int] = []
+    for index, url in enumerate(urls):
+        entry = cache.get_url(url, model_version) if cache else None
+        if entry is None:
+            pending.append(index)
+            continue
+        _, markdown_path = _restore_cached(cache, entry, output_root, _url_stem(url))
+        if journal is not None:
+            journal.downloaded(index, markdown_path)
+        yield index, markdown_path
+    if cache is not None:
+        logger.info(
+            "Conversion cache: %d/%d URLs already converted",
+            len(urls) - len(pending),
+            len(urls),
+        )
+    if not pending:
+        return
+
+    for position, markdown_path in _run_sharded(
+        [urls[index] for index in pending],
+        partial(
+            _iter_url_batch,
+            client,
+            output_root=output_root,
+            model_version=model_version,
+            cache=cache,
+            **batch_options,
+        ),
+        batch_size=batch_size,
+        max_in_flight=max_in_flight_batches,
+        journal=journal.subset(pending) if journal is not None else None,
+    ):
+        yield pending[position], markdown_path
+
+
+def _iter_url_batch(
+    client: MinerUClient,
+    urls: list[str],
+    *,
+    output_root: Path,
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+    model_version: str,
+    download_workers: int,
+    cache: Optional[ConversionCache],
+    journal: Optional[JournalRun] = None,
+    fetch_original: bool = True,
+) -> Iterator[tuple[int, Path]]:
     # Prepare URL data for batch task submission
     files_data = []
     for url in urls:
@@ -460,11 +1573,10 @@ def process_urls_via_mineru(
     
     logger.info("Submitting batch URL processing for %d URLs", len(urls))
     
-    response = _request_with_retries(
+    response = client.request(
         "POST",
         f"{BASE_URL}/extract/task/batch",
         json=payload,
-        headers=headers,
     ).json()
     
     if response.get("code") != 0:
@@ -472,86 +1584,367 @@ def process_urls_via_mineru(
     
     batch_id = response["data"]["batch_id"]
     logger.info("Batch ID: %s", batch_id)
+    if journal is not None:
+        journal.record(STATE_SUBMITTED, range(len(urls)), batch_id=batch_id)
     
-    # Wait for processing to complete and get results
-    return _wait_for_url_batch_completion(
-        batch_id=batch_id,
-        urls=urls,
+    # Harvest each task as soon as MinerU finishes it
+    yield from _harvest_url_batch(
+        client,
+        batch_id,
+        urls,
+        skip_sources=(),
         output_root=output_root,
-        api_key=api_key,
         poll_interval=poll_interval,
         timeout_seconds=timeout_seconds,
+        model_version=model_version,
+        download_workers=download_workers,
+        cache=cache,
+        journal=journal,
+        fetch_original=fetch_original,
     )
 
 
-def _wait_for_url_batch_completion(
+def _harvest_url_batch(
+    client: MinerUClient,
     batch_id: str,
     urls: list[str],
+    *,
+    skip_sources: Iterable[int],
     output_root: Path,
-    api_key: str,
-    poll_interval: int,
+    poll_interval: Optional[float],
     timeout_seconds: int,
-) -> list[Path]:
+    model_version: str,
+    download_workers: int,
+    cache: Optional[ConversionCache],
+    journal: Optional[JournalRun],
+    fetch_original: bool = True,
+) -> Iterator[tuple[int, Path]]:
+    skip_sources = set(skip_sources)
+    wanted = [url for position, url in enumerate(urls) if position not in skip_sources]
+    with _fetching_originals(
+        client, wanted, output_root, enabled=fetch_original, max_workers=download_workers
+    ) as originals:
+        yield from _harvest_batch(
+            client,
+            batch_id,
+            urls,
+            skip_sources=skip_sources,
+            journal=journal,
+            matches=_url_matches,
+            process_task=partial(
+                _process_single_url_task_result,
+                client,
+                output_root=output_root,
+                cache=cache,
+                variant=model_version,
+                originals=originals,
+            ),
+            process_completed=partial(
+                _process_completed_url_batch,
+                client,
+                urls=urls,
+                output_root=output_root,
+                originals=originals,
+            ),
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+            download_workers=download_workers,
+        )
+
+
+def iter_resumed_run(
+    run: JournalRun,
+    *,
+    output_root: Path,
+    api_key: str,
+    poll_interval: Optional[float] = None,
+    timeout_seconds: int = 600,
+    download_workers: int = 4,
+    upload_workers: int = 4,
+    batch_size: int = MINERU_BATCH_LIMIT,
+    max_in_flight_batches: int = 2,
+    client: Optional[MinerUClient] = None,
+    cache: Optional[ConversionCache] = None,
+    fetch_original: bool = True,
+) -> Iterator[Path]:
     """
-    Wait for URL batch processing to complete and download results.
+    Continue an interrupted run recorded in the job journal.
+
+    Markdown that was downloaded but never interpreted is yielded again,
+    batches and tasks MinerU already accepted are harvested instead of
+    resubmitted, and only inputs that never reached MinerU go through the
+    normal submission pipeline. Paths are yielded in completion order.
     """
-    deadline = time.time() + timeout_seconds
-    markdown_paths = []
-    
-    while time.time() < deadline:
-        batch_data = get_batch_results(batch_id, api_key=api_key)
-        
-        logger.info("Batch %s status: %s", batch_id, batch_data.get("status"))
-        logger.debug("Batch data: %s", batch_data)
-        
-        # Check if all tasks are done - API uses "extract_result" instead of "tasks"
-        tasks = batch_data.get("extract_result", [])
-        if not tasks:
-            logger.warning("No tasks found in batch response, checking for direct status")
-            # Check if batch is directly completed
-            status = batch_data.get("status")
-            if status == "completed":
-                # Try to process based on available data
-                markdown_paths = _process_completed_url_batch(batch_data, urls, output_root, api_key)
-                if markdown_paths:
-                    return markdown_paths
-            logger.warning("No tasks found in batch response")
-            time.sleep(poll_interval)
+    if run.mode not in (RUN_MODE_FILES, RUN_MODE_URLS, RUN_MODE_URL):
+        raise ValueError(f"Unknown journal run mode: {run.mode}")
+    with _client_scope(client, api_key) as mineru:
+        results = _iter_resumed(
+            mineru,
+            run,
+            output_root=output_root,
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+            download_workers=download_workers,
+            upload_workers=upload_workers,
+            batch_size=batch_size,
+            max_in_flight_batches=max_in_flight_batches,
+            cache=cache,
+            fetch_original=fetch_original,
+        )
+        with closing(_iterate_in_background(results)) as stream:
+            for _, markdown_path in stream:
+                yield markdown_path
+
+
+def _iter_resumed(client: MinerUClient, run: JournalRun, **options) -> Iterator[tuple[int, Path]]:
+    items = run.items()
+    pending: list[int] = []
+    batches: dict[str, set[int]] = {}
+    streams: list[Iterator[tuple[int, Path]]] = []
+    for item in items:
+        if item.state == STATE_DOWNLOADED and item.markdown_path and Path(item.markdown_path).exists():
+            if not item.interpreted:
+                yield item.index, Path(item.markdown_path)
             continue
-        
-        all_done = True
-        for task in tasks:
-            state = task.get("state")
-            if state not in ["done", "failed"]:
-                all_done = False
-                break
-        
-        if all_done:
-            # Process completed tasks
-            for task in tasks:
-                if task.get("state") == "done":
-                    file_name = task.get("file_name")
-                    original_url = next((url for url in urls if file_name in url), None)
-                    if original_url and task.get("full_zip_url"):
-                        markdown_path = _process_single_url_task_result(
-                            task, original_url, output_root, api_key
-                        )
-                        markdown_paths.append(markdown_path)
-            break
-        
-        time.sleep(poll_interval)
+        # A files batch only holds the inputs whose upload completed.
+        uploaded = run.mode != RUN_MODE_FILES or item.state != STATE_SUBMITTED
+        if item.batch_id and uploaded:
+            batches.setdefault(item.batch_id, set()).add(item.index)
+        elif item.task_id:
+            streams.append(_resume_task(client, run, item, **options))
+        else:
+            pending.append(item.index)
+
+    for batch_id, wanted in batches.items():
+        members = [item for item in items if item.batch_id == batch_id]
+        streams.append(_resume_batch(client, run, batch_id, members, wanted, **options))
+    if pending:
+        streams.append(_resubmit(client, run, pending, **options))
+
+    logger.info(
+        "Resuming journal run %s: %d batches to harvest, %d inputs to submit",
+        run.run_id,
+        len(batches),
+        len(pending),
+    )
+    yield from _merge_streams(streams, max_workers=options["max_in_flight_batches"])
+
+
+def _resume_batch(
+    client: MinerUClient,
+    run: JournalRun,
+    batch_id: str,
+    members: list[JournalItem],
+    wanted: set[int],
+    *,
+    output_root: Path,
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+    download_workers: int,
+    cache: Optional[ConversionCache],
+    fetch_original: bool,
+    **options,
+) -> Iterator[tuple[int, Path]]:
+    """
+    Harvest the unfinished inputs of an already submitted batch, falling back
+    to resubmission if MinerU no longer knows the batch.
+    """
+    harvest_options = dict(
+        skip_sources=[position for position, item in enumerate(members) if item.index not in wanted],
+        output_root=output_root,
+        poll_interval=poll_interval,
+        timeout_seconds=timeout_seconds,
+        model_version=run.model_version,
+        download_workers=download_workers,
+        cache=cache,
+        journal=run.subset(item.index for item in members),
+    )
+    if run.mode == RUN_MODE_FILES:
+        sources = [Path(item.source) for item in members]
+        results = _harvest_local_batch(client, batch_id, sources, digests={}, **harvest_options)
     else:
-        raise TimeoutError(f"Timed out waiting for batch {batch_id} to finish")
-    
-    return markdown_paths
+        results = _harvest_url_batch(
+            client,
+            batch_id,
+            [item.source for item in members],
+            fetch_original=fetch_original,
+            **harvest_options,
+        )
+
+    logger.info("Re-harvesting MinerU batch %s (%d inputs)", batch_id, len(wanted))
+    try:
+        for position, markdown_path in results:
+            yield members[position].index, markdown_path
+    except Exception as exc:
+        remaining = [
+            item.index
+            for item in run.items()
+            if item.index in wanted and item.state != STATE_DOWNLOADED
+        ]
+        if not remaining:
+            raise
+        logger.warning("Could not resume MinerU batch %s (%s); resubmitting %d inputs", batch_id, exc, len(remaining))
+        yield from _resubmit(
+            client,
+            run,
+            remaining,
+            output_root=output_root,
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+            download_workers=download_workers,
+            cache=cache,
+            fetch_original=fetch_original,
+            **options,
+        )
+
+
+def _resume_task(
+    client: MinerUClient,
+    run: JournalRun,
+    item: JournalItem,
+    *,
+    output_root: Path,
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+    cache: Optional[ConversionCache],
+    fetch_original: bool,
+    **_,
+) -> Iterator[tuple[int, Path]]:
+    try:
+        markdown_path = _finish_pdf_task(
+            client,
+            item.source,
+            item.task_id,
+            output_root=output_root,
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+            cache=cache,
+            journal=run,
+            fetch_original=fetch_original,
+        )
+    except Exception as exc:
+        logger.warning("Could not resume MinerU task %s (%s); resubmitting", item.task_id, exc)
+        markdown_path = _process_pdf(
+            client,
+            item.source,
+            output_root=output_root,
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+            cache=cache,
+            journal=run,
+            fetch_original=fetch_original,
+        )
+    yield item.index, markdown_path
+
+
+def _resubmit(
+    client: MinerUClient,
+    run: JournalRun,
+    indices: list[int],
+    *,
+    output_root: Path,
+    poll_interval: Optional[float],
+    timeout_seconds: int,
+    download_workers: int,
+    upload_workers: int,
+    batch_size: int,
+    max_in_flight_batches: int,
+    cache: Optional[ConversionCache],
+    fetch_original: bool,
+) -> Iterator[tuple[int, Path]]:
+    """
+    Send inputs that never reached MinerU through the normal pipeline.
+    """
+    sources = {item.index: item.source for item in run.items()}
+    journal = run.subset(indices)
+    if run.mode == RUN_MODE_URL:
+        markdown_path = _process_pdf(
+            client,
+            sources[indices[0]],
+            output_root=output_root,
+            poll_interval=poll_interval,
+            timeout_seconds=timeout_seconds,
+            cache=cache,
+            journal=journal,
+            fetch_original=fetch_original,
+        )
+        yield indices[0], markdown_path
+        return
+
+    batch_options = dict(
+        output_root=output_root,
+        poll_interval=poll_interval,
+        timeout_seconds=timeout_seconds,
+        model_version=run.model_version,
+        download_workers=download_workers,
+        batch_size=batch_size,
+        max_in_flight_batches=max_in_flight_batches,
+        cache=cache,
+        journal=journal,
+    )
+    if run.mode == RUN_MODE_FILES:
+        results = _iter_local_files(
+            client,
+            [Path(sources[index]) for index in indices],
+            upload_workers=upload_workers,
+            **batch_options,
+        )
+    else:
+        results = _iter_urls(
+            client,
+            [sources[index] for index in indices],
+            fetch_original=fetch_original,
+            **batch_options,
+        )
+    for position, markdown_path in results:
+        yield indices[position], markdown_path
+
+
+def _merge_streams(streams: list[Iterator[T]], *, max_workers: int) -> Iterator[T]:
+    """
+    Drain several result streams concurrently and yield items as they arrive.
+    A failing stream is logged and does not stop the others.
+    """
+    if len(streams) <= 1:
+        for stream in streams:
+            yield from stream
+        return
+
+    results: "queue.Queue[T]" = queue.Queue()
+
+    def _drain(stream: Iterator[T]) -> None:
+        if _stream_stopped():
+            return
+        for item in stream:
+            results.put(item)
+
+    with ThreadPoolExecutor(
+        max_workers=max(1, max_workers),
+        thread_name_prefix="mineru-resume",
+    ) as pool:
+        running = [pool.submit(contextvars.copy_context().run, _drain, stream) for stream in streams]
+        while running or not results.empty():
+            if _stream_stopped():
+                raise _StreamStopped
+            try:
+                yield results.get(timeout=_STOP_CHECK_SECONDS)
+            except queue.Empty:
+                pass
+            for future in [future for future in running if future.done()]:
+                running.remove(future)
+                exc = future.exception()
+                if exc is not None:
+                    logger.error("Resumed MinerU work failed: %s", exc)
 
 
 def _process_completed_url_batch(
+    client: MinerUClient,
     batch_data: dict,
+    *,
     urls: list[str],
     output_root: Path,
-    api_key: str,
-) -> list[Path]:
+    originals: Optional[_OriginalFetcher] = None,
+) -> list[tuple[int, Path]]:
     """
     Process a completed URL batch when no task information is available.
     """
@@ -570,29 +1963,20 @@ def _process_completed_url_batch(
                 parsed_url = urlparse(url)
                 filename = Path(unquote(parsed_url.path)).name or "document.pdf"
                 stem = _sanitize_basename(Path(filename).stem)
-                timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-                task_label = f"{stem}_{timestamp}"
-                target_dir = output_root / task_label
-                target_dir.mkdir(parents=True, exist_ok=True)
+                task_label, target_dir = _create_task_dir(output_root, stem)
                 
-                with TemporaryDirectory() as tmpdir:
-                    zip_path = Path(tmpdir) / "result.zip"
-                    _download_file(result_url, zip_path)
-                    markdown_path = _extract_markdown_from_zip(zip_path, target_dir)
+                markdown_path = extract_result_package(client, result_url, target_dir)
                 
-                # Download original file to output directory
-                original_destination = target_dir / f"{task_label}.pdf"
-                try:
-                    _download_file(url, original_destination)
-                except Exception as exc:
-                    logger.warning("Failed to download original file from %s: %s", url, exc)
+                # Move the prefetched original file to output directory
+                if originals is not None:
+                    originals.place(url, target_dir / f"{task_label}.pdf")
                 
                 logger.info(
                     "URL batch processing complete for %s. Markdown: %s",
                     filename,
                     markdown_path,
                 )
-                markdown_paths.append(markdown_path)
+                markdown_paths.append((i, markdown_path))
                 
             except Exception as e:
                 logger.error("Failed to process result for %s: %s", url, e)
@@ -601,38 +1985,37 @@ def _process_completed_url_batch(
 
 
 def _process_single_url_task_result(
+    client: MinerUClient,
     task: dict,
     original_url: str,
+    *,
     output_root: Path,
-    api_key: str,
+    cache: Optional[ConversionCache] = None,
+    variant: str = "",
+    originals: Optional[_OriginalFetcher] = None,
 ) -> Path:
     """
     Process a single completed URL task result.
     """
     parsed_url = urlparse(original_url)
     filename = Path(unquote(parsed_url.path)).name or "document.pdf"
-    stem = _sanitize_basename(Path(filename).stem)
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    task_label = f"{stem}_{timestamp}"
-    target_dir = output_root / task_label
-    target_dir.mkdir(parents=True, exist_ok=True)
+    stem = _url_stem(original_url)
     
     zip_url = task.get("full_zip_url")
     if not zip_url:
         raise RuntimeError(f"No result package URL for task {task.get('task_id')}")
     
-    with TemporaryDirectory() as tmpdir:
-        zip_path = Path(tmpdir) / "result.zip"
-        _download_file(zip_url, zip_path)
-        markdown_path = _extract_markdown_from_zip(zip_path, target_dir)
+    task_label, target_dir = _create_task_dir(output_root, stem)
+    markdown_path = extract_result_package(client, zip_url, target_dir)
     
-    # Download original file to output directory
+    # Move the prefetched original file to output directory
     original_destination = target_dir / f"{task_label}.pdf"
-    try:
-        _download_file(original_url, original_destination)
-    except Exception as exc:
-        logger.warning("Failed to download original file from %s: %s", original_url, exc)
+    if originals is not None:
+        originals.place(original_url, original_destination)
     
+    _cache_url_result(
+        cache, original_url, variant, target_dir, markdown_path, original_destination
+    )
     logger.info(
         "URL batch processing complete for %s. Markdown: %s",
         filename,
@@ -642,8 +2025,14 @@ def _process_single_url_task_result(
 
 
 __all__ = [
+    "DownloadCancelled",
+    "MINERU_BATCH_LIMIT",
+    "MinerUClient",
     "process_pdf_via_mineru",
     "process_local_files_via_mineru",
     "process_urls_via_mineru",
+    "iter_local_files_via_mineru",
+    "iter_urls_via_mineru",
+    "iter_resumed_run",
     "get_batch_results"
 ]
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import logging
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .mineru import MinerUClient
+
+logger = logging.getLogger("chatpdf")
+
+TERMINAL_STATES = ("done", "failed")
+
+
+@dataclass
+class _Watch:
+    kind: str
+    key: str
+    sink: "queue.Queue[tuple[str, object]]"
+    max_interval: float
+    interval: float
+    next_due: float
+    progress: float = 0.0
+    progress_at: float = field(default_factory=time.monotonic)
+    summary: str = ""
+
+
+class MinerUPoller:
+    """
+    Poll many MinerU task and batch ids from a single background thread.
+
+    Each watched id gets its own schedule: polls start at `min_interval`, back
+    off geometrically (with jitter) while nothing changes, and tighten again
+    when progress is reported, aiming to check back around the time the task
+    is expected to finish. Status payloads are delivered to the caller's queue
+    as `("status", data)`; polling failures arrive as `("error", exc)`.
+    """
+
+    def __init__(
+        self,
+        client: "MinerUClient",
+        *,
+        min_interval: float = 1.0,
+        max_interval: float = 20.0,
+        backoff: float = 1.6,
+        jitter: float = 0.2,
+    ) -> None:
+        self._client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.jitter = jitter
+        self._watches: dict[tuple[str, str], _Watch] = {}
+        self._wakeup = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def watch_task(
+        self,
+        task_id: str,
+        sink: "queue.Queue[tuple[str, object]]",
+        *,
+        max_interval: Optional[float] = None,
+    ) -> None:
+        self._watch("task", task_id, sink, max_interval)
+
+    def watch_batch(
+        self,
+        batch_id: str,
+        sink: "queue.Queue[tuple[str, object]]",
+        *,
+        max_interval: Optional[float] = None,
+    ) -> None:
+        self._watch("batch", batch_id, sink, max_interval)
+
+    def unwatch(self, kind: str, key: str) -> None:
+        with self._wakeup:
+            self._watches.pop((kind, key), None)
+
+    def close(self) -> None:
+        with self._wakeup:
+            self._closed = True
+            self._watches.clear()
+            self._wakeup.notify_all()
+
+    def _watch(
+        self,
+        kind: str,
+        key: str,
+        sink: "queue.Queue[tuple[str, object]]",
+        max_interval: Optional[float],
+    ) -> None:
+        ceiling = max(self.min_interval, max_interval or self.max_interval)
+        with self._wakeup:
+            if self._closed:
+                raise RuntimeError("MinerU poller is closed")
+            self._watches[(kind, key)] = _Watch(
+                kind=kind,
+                key=key,
+                sink=sink,
+                max_interval=ceiling,
+                interval=self.min_interval,
+                next_due=time.monotonic(),
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="mineru-poller", daemon=True
+                )
+                self._thread.start()
+            self._wakeup.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._wakeup:
+                while not self._closed:
+                    now = time.monotonic()
+                    due = [watch for watch in self._watches.values() if watch.next_due <= now]
+                    if due:
+                        break
+                    next_due = min((watch.next_due for watch in self._watches.values()), default=None)
+                    self._wakeup.wait(None if next_due is None else next_due - now)
+                if self._closed:
+                    return
+
+            for watch in sorted(due, key=lambda item: item.next_due):
+                self._poll(watch)
+
+    def _poll(self, watch: _Watch) -> None:
+        try:
+            if watch.kind == "task":
+                data = self._client.task_status(watch.key)
+            else:
+                data = self._client.batch_status(watch.key)
+        except Exception as exc:
+            self.unwatch(watch.kind, watch.key)
+            watch.sink.put(("error", exc))
+            return
+
+        progress, summary = _measure(watch.kind, data)
+        if summary != watch.summary:
+            logger.info("MinerU %s %s: %s", watch.kind, watch.key, summary)
+            watch.summary = summary
+        self._reschedule(watch, progress)
+
+        if watch.kind == "task" and data.get("state") in TERMINAL_STATES:
+            self.unwatch(watch.kind, watch.key)
+        watch.sink.put(("status", data))
+
+    def _reschedule(self, watch: _Watch, progress: float) -> None:
+        now = time.monotonic()
+        if progress > watch.progress:
+            rate = (progress - watch.progress) / max(now - watch.progress_at, 1e-3)
+            eta = (1.0 - progress) / rate
+            watch.interval = min(max(eta / 2, self.min_interval), watch.max_interval)
+            watch.progress = progress
+            watch.progress_at = now
+        else:
+            watch.interval = min(watch.interval * self.backoff, watch.max_interval)
+        spread = 1.0 + random.uniform(-self.jitter, self.jitter)
+        watch.next_due = now + watch.interval * spread
+
+
+def _measure(kind: str, data: dict) -> tuple[float, str]:
+    """
+    Reduce a status payload to a 0..1 progress figure and a log summary.
+    """
+    if kind == "task":
+        state = data.get("state") or "unknown"
+        fraction = _page_fraction(data)
+        if state in TERMINAL_STATES:
+            return 1.0, state
+        if fraction is None:
+            return 0.0, state
+        return fraction, f"{state} ({fraction:.0%})"
+
+    tasks = data.get("extract_result") or []
+    if not tasks:
+        return 0.0, f"status {data.get('status')}"
+    counts: dict[str, int] = {}
+    progress = 0.0
+    for task in tasks:
+        state = task.get("state") or "unknown"
+        counts[state] = counts.get(state, 0) + 1
+        if state in TERMINAL_STATES:
+            progress += 1.0
+        else:
+            progress += _page_fraction(task) or 0.0
+    summary = ", ".join(f"{count} {state}" for state, count in sorted(counts.items()))
+    return progress / len(tasks), summary
+
+
+def _page_fraction(task: dict) -> Optional[float]:
+    extract_progress = task.get("extract_progress") or {}
+    total = extract_progress.get("total_pages") or 0
+    if not total:
+        return None
+    return min(1.0, (extract_progress.get("extracted_pages") or 0) / total)
+
+
+__all__ = ["MinerUPoller"]
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Iterator, Optional
+
+logger = logging.getLogger("chatpdf")
+
+# Latency above this multiple of the best smoothed latency seen counts as
+# congestion: the limit stops growing and starts shrinking gently.
+LATENCY_TOLERANCE = 2.0
+_LATENCY_SMOOTHING = 0.2
+# The best latency drifts up by this fraction per sample, so a lasting
+# slowdown eventually becomes the new normal instead of pinning the limit.
+_BEST_LATENCY_DRIFT = 0.01
+
+
+class RateController:
+    """
+    Process-wide AIMD limiter for concurrent API requests.
+
+    Callers hold a slot for the duration of each request. The number of slots
+    grows by one after a full window of successful, uncongested requests, is
+    halved on a throttle (429 or overload) and shrinks by 10% while latency
+    stays well above its best level. Latency is taken per completion token
+    when the caller knows the count, since answer length dominates it.
+
+    A throttle carrying `Retry-After` also pauses every caller until that
+    time, so parallel workers back off together instead of retrying into the
+    same limit. Threads take slots with `slot()` and coroutines with
+    `async_slot()`; both draw from the same limit.
+    """
+
+    def __init__(
+        self,
+        max_limit: int,
+        *,
+        min_limit: int = 1,
+        initial_limit: Optional[int] = None,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        if max_limit < 1:
+            raise ValueError("max_limit must be at least 1")
+        self.max_limit = max_limit
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self.decrease_factor = decrease_factor
+        self._limit = float(min(max_limit, initial_limit or max_limit))
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._latency: Optional[float] = None
+        self._best_latency: Optional[float] = None
+        self._condition = threading.Condition()
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        """
+        Wait for a free slot and any pause to pass; yield the start time.
+        """
+        with self._condition:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                elif self._in_flight >= self.limit:
+                    self._condition.wait()
+                else:
+                    break
+            self._in_flight += 1
+        started = time.monotonic()
+        try:
+            yield started
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[float]:
+        """
+        Like `slot()`, but waits without blocking the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self._in_flight < self.limit:
+                    self._in_flight += 1
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await asyncio.wait({waiter}, timeout=wait if wait > 0 else None)
+            finally:
+                with self._condition:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+        started = time.monotonic()
+        try:
+            yield started
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            self._wake()
+
+    def _wake(self) -> None:
+        # Callers hold self._condition.
+        self._condition.notify_all()
+        for loop, waiter in self._async_waiters:
+            loop.call_soon_threadsafe(_resolve, waiter)
+        self._async_waiters.clear()
+
+    def record_success(self, started: float, tokens: Optional[int] = None) -> None:
+        latency = (time.monotonic() - started) / max(1, tokens or 1)
+        with self._condition:
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += _LATENCY_SMOOTHING * (latency - self._latency)
+            if self._best_latency is None:
+                self._best_latency = self._latency
+            else:
+                self._best_latency = min(self._latency, self._best_latency * (1 + _BEST_LATENCY_DRIFT))
+            if self._latency > LATENCY_TOLERANCE * self._best_latency:
+                self._decrease(started, 0.9, "latency up %.1fx" % (self._latency / self._best_latency))
+            elif self._limit < self.max_limit:
+                self._limit = min(self.max_limit, self._limit + 1 / self.limit)
+                self._wake()
+
+    def record_throttle(self, started: float, retry_after: Optional[float] = None) -> None:
+        """
+        Register a throttled request and pause everyone for `retry_after` seconds.
+        """
+        with self._condition:
+            if retry_after:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                logger.warning("Rate limited: pausing requests for %.1fs", retry_after)
+            self._decrease(started, self.decrease_factor, "throttled")
+
+    def _decrease(self, started: float, factor: float, reason: str) -> None:
+        # Requests sent before the last decrease saw the old limit; letting each
+        # of them cut again would collapse the limit on a single burst.
+        if started < self._last_decrease:
+            return
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * factor)
+        self._last_decrease = time.monotonic()
+        if self.limit != previous:
+            logger.info("Concurrency limit %d -> %d (%s)", previous, self.limit, reason)
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """
+    Read `retry-after-ms` / `Retry-After` (seconds or HTTP date) off an API error.
+    """
+    response: Any = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+__all__ = ["LATENCY_TOLERANCE", "RateController", "retry_after_seconds"]
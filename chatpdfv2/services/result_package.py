@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import io
+import logging
+import posixpath
+import re
+import time
+import zipfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
+from urllib.parse import unquote, urlparse
+
+import requests
+
+if TYPE_CHECKING:
+    from .mineru import MinerUClient
+
+logger = logging.getLogger("chatpdf")
+
+# Read-ahead used when pulling zip metadata over HTTP Range requests.
+RANGE_BUFFER_SIZE = 256 * 1024
+# Room for a member's local header fields beyond what the central directory
+# tells us, so one request usually covers the whole member.
+_LOCAL_HEADER_SLACK = 1024
+
+_MARKDOWN_IMAGE = re.compile(r"!\[[^\]]*\]\(\s*<?([^)\s>]+)")
+_HTML_IMAGE = re.compile(r"<img\b[^>]*?\bsrc\s*=\s*[\"']([^\"']+)[\"']", re.IGNORECASE)
+
+
+def extract_result_package(client: "MinerUClient", zip_url: str, target_dir: Path) -> Path:
+    """
+    Unpack the markdown file of a MinerU result package, plus the assets it
+    references, into `target_dir` and return the markdown path.
+
+    When the storage host honours Range requests the zip is never downloaded
+    as a whole: the central directory is read remotely and each selected
+    member is fetched with one retried Range request, pinned to the same
+    object by its ETag; zipfile checks each member's CRC. Otherwise, or if
+    remote reading fails, the package is downloaded with
+    `MinerUClient.download` (resumable and verified) into `target_dir`,
+    unpacked selectively and removed.
+    """
+    probe = _probe_range_support(client.transfer_session, zip_url, client.transfer_timeout)
+    if probe is not None:
+        size, etag = probe
+        raw = _HTTPRangeReader(
+            client.transfer_session,
+            zip_url,
+            size,
+            client.transfer_timeout,
+            etag=etag,
+            max_retries=client.max_retries,
+            base_delay=client.base_delay,
+        )
+        try:
+            with zipfile.ZipFile(io.BufferedReader(raw, buffer_size=RANGE_BUFFER_SIZE)) as zf:
+                markdown_path = _extract_markdown_members(zf, target_dir, prefetch=raw.prefetch)
+        except (OSError, RuntimeError, zipfile.BadZipFile) as exc:
+            logger.warning(
+                "Reading MinerU result package remotely failed after %d range requests, "
+                "downloading it instead: %s",
+                raw.requests,
+                exc,
+            )
+        else:
+            logger.info(
+                "Fetched %s from MinerU result package with %d range requests",
+                markdown_path.name,
+                raw.requests,
+            )
+            return markdown_path
+
+    zip_path = target_dir / ".result.zip"
+    try:
+        client.download(zip_url, zip_path)
+        with zipfile.ZipFile(zip_path) as zf:
+            return _extract_markdown_members(zf, target_dir)
+    finally:
+        zip_path.unlink(missing_ok=True)
+
+
+def _extract_markdown_members(
+    zf: zipfile.ZipFile,
+    target_dir: Path,
+    *,
+    prefetch: Optional[Callable[[zipfile.ZipInfo], None]] = None,
+) -> Path:
+    """
+    Pick the largest markdown member from the central directory and extract
+    it together with the images it links to. `prefetch` is called with each
+    member before it is extracted.
+    """
+    members = {info.filename: info for info in zf.infolist() if not info.is_dir()}
+    markdown_members = [info for name, info in members.items() if name.lower().endswith(".md")]
+    if not markdown_members:
+        raise FileNotFoundError("No markdown file found in MinerU result package")
+    selected = max(markdown_members, key=lambda info: info.file_size)
+
+    if prefetch is not None:
+        prefetch(selected)
+    markdown_path = Path(zf.extract(selected, target_dir))
+    text = markdown_path.read_text(encoding="utf-8", errors="replace")
+    base = posixpath.dirname(selected.filename)
+    assets = 0
+    for reference in _referenced_assets(text):
+        name = posixpath.normpath(posixpath.join(base, reference))
+        info = members.get(name)
+        if info is None:
+            continue
+        if prefetch is not None:
+            prefetch(info)
+        zf.extract(info, target_dir)
+        assets += 1
+
+    logger.info(
+        "Selected markdown file %s from MinerU results (%d of %d members extracted)",
+        markdown_path,
+        assets + 1,
+        len(members),
+    )
+    return markdown_path
+
+
+def _referenced_assets(markdown: str) -> set[str]:
+    references: set[str] = set()
+    for pattern in (_MARKDOWN_IMAGE, _HTML_IMAGE):
+        for match in pattern.finditer(markdown):
+            reference = unquote(match.group(1).strip())
+            if not reference or urlparse(reference).scheme or reference.startswith("/"):
+                continue
+            references.add(reference)
+    return references
+
+
+def _probe_range_support(
+    session: requests.Session, url: str, timeout: int
+) -> Optional[tuple[int, Optional[str]]]:
+    """
+    Return the total size and ETag if the server answers Range requests, else None.
+    """
+    try:
+        with session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=timeout) as resp:
+            if resp.status_code != 206:
+                return None
+            total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+            if not total.isdigit():
+                return None
+            return int(total), resp.headers.get("ETag")
+    except requests.RequestException as exc:
+        logger.debug("Range probe failed for %s: %s", url, exc)
+        return None
+
+
+class _HTTPRangeReader(io.RawIOBase):
+    """
+    Seekable, read-only view of a remote file backed by HTTP Range requests.
+
+    Every request is retried with exponential backoff and, when the server
+    sent an ETag, sent with `If-Match` so a replaced object fails loudly
+    instead of mixing bytes of two files. `prefetch()` pulls a whole zip
+    member in one request; reads inside it are then served from memory.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        url: str,
+        size: int,
+        timeout: int,
+        *,
+        etag: Optional[str] = None,
+        max_retries: int = 3,
+        base_delay: float = 2,
+    ) -> None:
+        super().__init__()
+        self._session = session
+        self._url = url
+        self._size = size
+        self._timeout = timeout
+        self._etag = etag
+        self._max_retries = max(1, max_retries)
+        self._base_delay = base_delay
+        self._position = 0
+        self._block_start = 0
+        self._block = b""
+        self.requests = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise OSError("Negative seek position")
+        self._position = position
+        return position
+
+    def prefetch(self, info: zipfile.ZipInfo) -> None:
+        """
+        Fetch a member's local header and compressed data in one request.
+        """
+        start = info.header_offset
+        end = min(
+            self._size,
+            start
+            + 30  # fixed part of the local file header
+            + len(info.orig_filename.encode("utf-8"))
+            + len(info.extra)
+            + info.compress_size
+            + _LOCAL_HEADER_SLACK,
+        )
+        if self._block_start <= start and end <= self._block_start + len(self._block):
+            return
+        self._block = self._get_range(start, end - 1)
+        self._block_start = start
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self._size or len(buffer) == 0:
+            return 0
+        offset = self._position - self._block_start
+        if 0 <= offset < len(self._block):
+            data = self._block[offset : offset + len(buffer)]
+        else:
+            end = min(self._position + len(buffer), self._size) - 1
+            data = self._get_range(self._position, end)
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def _get_range(self, start: int, end: int) -> bytes:
+        headers = {"Range": f"bytes={start}-{end}"}
+        if self._etag:
+            headers["If-Match"] = self._etag
+        expected = end - start + 1
+        for attempt in range(1, self._max_retries + 1):
+            self.requests += 1
+            try:
+                response = self._session.get(self._url, headers=headers, timeout=self._timeout)
+                if response.status_code == 412:
+                    raise OSError(f"Result package changed while reading {self._url}")
+                if response.status_code == 206 and len(response.content) == expected:
+                    return response.content
+                logger.warning(
+                    "Range request for bytes %d-%d of %s returned status %s with %d bytes "
+                    "(attempt %s/%s)",
+                    start,
+                    end,
+                    self._url,
+                    response.status_code,
+                    len(response.content),
+                    attempt,
+                    self._max_retries,
+                )
+            except requests.RequestException as exc:
+                logger.warning(
+                    "Range request for bytes %d-%d of %s failed on attempt %s/%s: %s",
+                    start,
+                    end,
+                    self._url,
+                    attempt,
+                    self._max_retries,
+                    exc,
+                )
+            if attempt < self._max_retries:
+                time.sleep(self._base_delay * (2 ** (attempt - 1)))
+        raise OSError(f"Range request for {self._url} failed after {self._max_retries} attempts")
+
+
+__all__ = ["extract_result_package"]
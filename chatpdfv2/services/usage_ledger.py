@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+logger = logging.getLogger("chatpdf")
+
+STATUS_OK = "ok"
+STATUS_CACHED = "cached"
+STATUS_ERROR = "error"
+# A hedged duplicate that lost and was cancelled; its tokens are estimated.
+STATUS_CANCELLED = "cancelled"
+
+# Days of per-day series in the Prometheus export; older days drop out.
+PROMETHEUS_DAYS = 7
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    document TEXT,
+    question TEXT,
+    stage TEXT,
+    chunk INTEGER,
+    model TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    latency_seconds REAL NOT NULL,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_hit_tokens INTEGER NOT NULL DEFAULT 0,
+    cache_miss_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS calls_document ON calls(document);
+CREATE INDEX IF NOT EXISTS calls_created_at ON calls(created_at);
+"""
+
+# Where the current call comes from; set by the interpreter with usage_scope().
+_scope: ContextVar[Dict[str, Any]] = ContextVar("chatpdf_usage_scope", default={})
+
+
+@contextmanager
+def usage_scope(**fields: Any) -> Iterator[None]:
+    """
+    Tag API calls made inside the block with `document`, `question`, `stage`
+    or `chunk`. Scopes nest, and asyncio tasks inherit the scope they were
+    created in.
+    """
+    token = _scope.set({**_scope.get(), **fields})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+@dataclass(frozen=True)
+class UsageRecord:
+    """One DeepSeek API call (or local cache hit) as stored in the ledger."""
+
+    model: str
+    status: str
+    latency_seconds: float
+    prompt_tokens: int = 0
+    cache_hit_tokens: int = 0
+    cache_miss_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class UsageSummary:
+    """Aggregated ledger rows for one group (all calls, a document, a day...)."""
+
+    key: str
+    calls: int
+    errors: int
+    cached: int
+    prompt_tokens: int
+    cache_hit_tokens: int
+    completion_tokens: int
+    cost: float
+    latency_p50: float
+    latency_p95: float
+    first_at: float
+    last_at: float
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cache_hit_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+class UsageLedger:
+    """
+    SQLite ledger with one row per DeepSeek call: where it came from
+    (document, question, stage, chunk), how long it took, its token counts and
+    its cost. `summary()` and `export_prometheus()` report from it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def record(self, record: UsageRecord) -> None:
+        scope = _scope.get()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO calls (created_at, document, question, stage, chunk, model, status,"
+                " error, latency_seconds, prompt_tokens, cache_hit_tokens, cache_miss_tokens,"
+                " completion_tokens, cost) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    time.time(),
+                    scope.get("document"),
+                    scope.get("question"),
+                    scope.get("stage"),
+                    scope.get("chunk"),
+                    record.model,
+                    record.status,
+                    record.error,
+                    record.latency_seconds,
+                    record.prompt_tokens,
+                    record.cache_hit_tokens,
+                    record.cache_miss_tokens,
+                    record.completion_tokens,
+                    record.cost,
+                ),
+            )
+
+    def summary(self, group_by: Optional[str] = None, *, since: Optional[float] = None) -> list[UsageSummary]:
+        """
+        Aggregate calls overall, or per `document`, `model`, `stage` or `day`.
+        """
+        columns = {
+            None: "'all'",
+            "document": "COALESCE(document, '-')",
+            "model": "model",
+            "stage": "COALESCE(stage, '-')",
+            "day": "date(created_at, 'unixepoch', 'localtime')",
+        }
+        if group_by not in columns:
+            raise ValueError(f"Cannot group usage by {group_by!r}")
+        key = columns[group_by]
+        where, params = ("WHERE created_at >= ?", (since,)) if since is not None else ("", ())
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {key}, COUNT(*), SUM(status = ?), SUM(status = ?), SUM(prompt_tokens),"
+                f" SUM(cache_hit_tokens), SUM(completion_tokens), SUM(cost), MIN(created_at),"
+                f" MAX(created_at) FROM calls {where} GROUP BY 1 ORDER BY MIN(created_at)",
+                (STATUS_ERROR, STATUS_CACHED, *params),
+            ).fetchall()
+            latencies: Dict[str, list[float]] = {}
+            for group, latency in self._db.execute(
+                f"SELECT {key}, latency_seconds FROM calls {where}"
+                f"{' AND' if where else ' WHERE'} status = ? ORDER BY 2",
+                (*params, STATUS_OK),
+            ):
+                latencies.setdefault(group, []).append(latency)
+        return [
+            UsageSummary(
+                key=group,
+                calls=calls,
+                errors=errors or 0,
+                cached=cached or 0,
+                prompt_tokens=prompt or 0,
+                cache_hit_tokens=hit or 0,
+                completion_tokens=completion or 0,
+                cost=cost or 0.0,
+                latency_p50=_quantile(latencies.get(group, []), 0.5),
+                latency_p95=_quantile(latencies.get(group, []), 0.95),
+                first_at=first_at,
+                last_at=last_at,
+            )
+            for group, calls, errors, cached, prompt, hit, completion, cost, first_at, last_at in rows
+        ]
+
+    def export_prometheus(self, path: Path, *, per_document: bool = False) -> None:
+        """
+        Write ledger totals in the Prometheus text format, for node_exporter's
+        textfile collector. The file is replaced atomically.
+
+        Besides totals, tokens and cost are broken down per day for the last
+        `PROMETHEUS_DAYS` days. Per-document series add one label value per
+        document ever processed, so they are only written with `per_document`,
+        labelled by a short stable id rather than the document's path.
+        """
+        with self._lock:
+            by_model = self._db.execute(
+                "SELECT model, status, COUNT(*), SUM(prompt_tokens), SUM(cache_hit_tokens),"
+                " SUM(completion_tokens), SUM(cost)"
+                " FROM calls GROUP BY model, status ORDER BY model, status"
+            ).fetchall()
+            latencies = [
+                row[0]
+                for row in self._db.execute(
+                    "SELECT latency_seconds FROM calls WHERE status = ? ORDER BY 1", (STATUS_OK,)
+                )
+            ]
+            by_day = self._db.execute(
+                "SELECT date(created_at, 'unixepoch', 'localtime') AS day,"
+                " SUM(prompt_tokens) + SUM(completion_tokens), SUM(cost) FROM calls"
+                " WHERE created_at >= ? GROUP BY day ORDER BY day",
+                (time.time() - PROMETHEUS_DAYS * 86_400,),
+            ).fetchall()
+            by_document = (
+                self._db.execute(
+                    "SELECT document, COUNT(*), SUM(prompt_tokens) + SUM(completion_tokens), SUM(cost)"
+                    " FROM calls WHERE document IS NOT NULL GROUP BY document ORDER BY document"
+                ).fetchall()
+                if per_document
+                else []
+            )
+
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: Sequence[tuple[str, float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {value:g}" for labels, value in samples)
+
+        metric(
+            "chatpdf_deepseek_requests_total",
+            "counter",
+            "DeepSeek calls recorded in the usage ledger.",
+            [(_labels(model=model, status=status), calls) for model, status, calls, *_ in by_model],
+        )
+        tokens: list[tuple[str, float]] = []
+        for model, status, _, prompt, hit, completion, _ in by_model:
+            tokens.append((_labels(model=model, status=status, kind="prompt_cache_hit"), hit or 0))
+            tokens.append((_labels(model=model, status=status, kind="prompt_cache_miss"), (prompt or 0) - (hit or 0)))
+            tokens.append((_labels(model=model, status=status, kind="completion"), completion or 0))
+        metric("chatpdf_deepseek_tokens_total", "counter", "DeepSeek tokens by kind.", tokens)
+        metric(
+            "chatpdf_deepseek_cost_yuan_total",
+            "counter",
+            "Estimated DeepSeek cost in yuan.",
+            [(_labels(model=model, status=status), cost or 0) for model, status, _, _, _, _, cost in by_model],
+        )
+        metric(
+            "chatpdf_deepseek_request_latency_seconds",
+            "summary",
+            "Latency of successful DeepSeek calls.",
+            [(_labels(quantile=str(q)), _quantile(latencies, q)) for q in (0.5, 0.9, 0.95, 0.99)],
+        )
+        lines.append(f"chatpdf_deepseek_request_latency_seconds_sum {sum(latencies):g}")
+        lines.append(f"chatpdf_deepseek_request_latency_seconds_count {len(latencies)}")
+        metric(
+            "chatpdf_day_tokens",
+            "gauge",
+            f"DeepSeek tokens spent per local day, last {PROMETHEUS_DAYS} days.",
+            [(_labels(day=day), used or 0) for day, used, _ in by_day],
+        )
+        metric(
+            "chatpdf_day_cost_yuan",
+            "gauge",
+            f"Estimated DeepSeek cost per local day in yuan, last {PROMETHEUS_DAYS} days.",
+            [(_labels(day=day), cost or 0) for day, _, cost in by_day],
+        )
+        if per_document:
+            metric(
+                "chatpdf_document_tokens_total",
+                "counter",
+                "DeepSeek tokens spent per document.",
+                [(_labels(document=_document_id(document)), used or 0) for document, _, used, _ in by_document],
+            )
+            metric(
+                "chatpdf_document_cost_yuan_total",
+                "counter",
+                "Estimated DeepSeek cost per document in yuan.",
+                [(_labels(document=_document_id(document)), cost or 0) for document, _, _, cost in by_document],
+            )
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        partial.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        os.replace(partial, path)
+        logger.info("Wrote Prometheus usage metrics to %s", path)
+
+
+def _document_id(document: str) -> str:
+    """
+    Short stable label for a document: its directory name, cut to 32
+    characters, and a digest of the full path to keep it unique.
+    """
+    digest = hashlib.sha256(document.encode("utf-8")).hexdigest()[:8]
+    return f"{Path(document).name[:32]}-{digest}"
+
+
+def _labels(**labels: Any) -> str:
+    def escape(value: Any) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _quantile(ordered: Sequence[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+__all__ = [
+    "PROMETHEUS_DAYS",
+    "STATUS_CACHED",
+    "STATUS_CANCELLED",
+    "STATUS_ERROR",
+    "STATUS_OK",
+    "UsageLedger",
+    "UsageRecord",
+    "UsageSummary",
+    "usage_scope",
+]
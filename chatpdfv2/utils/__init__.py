@@ -2,7 +2,24 @@
 Utility helpers kept intentionally small and stateless.
 """
 
-from .files import load_existing_answers, read_md_content  # noqa: F401
-from .text import split_into_chunks  # noqa: F401
+from .files import load_existing_answers, read_md_content, sha256_file  # noqa: F401
+from .text import (  # noqa: F401
+    DEFAULT_CHUNK_TOKENS,
+    Chunk,
+    chunk_markdown,
+    estimate_tokens,
+    split_into_chunks,
+    truncate_to_tokens,
+)
 
-__all__ = ["load_existing_answers", "read_md_content", "split_into_chunks"]
+__all__ = [
+    "Chunk",
+    "DEFAULT_CHUNK_TOKENS",
+    "chunk_markdown",
+    "estimate_tokens",
+    "load_existing_answers",
+    "read_md_content",
+    "sha256_file",
+    "split_into_chunks",
+    "truncate_to_tokens",
+]
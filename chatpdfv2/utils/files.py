@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import logging
 from pathlib import Path
 from typing import Dict, Optional
@@ -65,4 +66,15 @@ def _join_answer(lines: list[str]) -> str:
     return "\n".join(lines).strip()
 
 
-__all__ = ["load_existing_answers", "read_md_content"]
+def sha256_file(path: Path, *, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Hash a file's bytes without loading it into memory at once.
+    """
+    digest = hashlib.sha256()
+    with Path(path).open("rb") as handle:
+        for block in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+__all__ = ["load_existing_answers", "read_md_content", "sha256_file"]
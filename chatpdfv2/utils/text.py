@@ -1,5 +1,84 @@
 from __future__ import annotations
 
+import math
+import re
+from dataclasses import dataclass, replace
+from typing import Iterator
+
+# Default token budget per chunk; leaves room for context, question and answer
+# inside DeepSeek's 64K window.
+DEFAULT_CHUNK_TOKENS = 32_000
+
+# Rough DeepSeek tokenizer ratios: one CJK character is about 0.6 tokens,
+# one Latin character about 0.3.
+_CJK_TOKENS_PER_CHAR = 0.6
+_OTHER_TOKENS_PER_CHAR = 0.3
+
+_CJK = re.compile(
+    r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]"
+)
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_SENTENCE_END = re.compile(r"(?<=[。！？；.!?;])\s*")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A slice of a markdown document, `text == content[start:end]`."""
+
+    text: str
+    start: int
+    end: int
+    section_path: tuple[str, ...]
+    tokens: int
+
+    @property
+    def section(self) -> str:
+        return " > ".join(self.section_path)
+
+
+@dataclass(frozen=True)
+class _Piece:
+    start: int
+    end: int
+    section_path: tuple[str, ...]
+    tokens: int
+    gap: int = 0  # tokens of the blank lines before it, counted unless it opens a chunk
+    heading: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the DeepSeek token count of `text` without a tokenizer.
+    """
+    cjk = len(_CJK.findall(text))
+    return math.ceil(cjk * _CJK_TOKENS_PER_CHAR + (len(text) - cjk) * _OTHER_TOKENS_PER_CHAR)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, *, marker: str = "……") -> str:
+    """
+    Cut `text` to about `max_tokens` estimated tokens, ending `marker`.
+
+    The cut prefers the last sentence or line end that fits.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max_tokens - estimate_tokens(marker)
+    if budget <= 0:
+        return ""
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    head = text[:low]
+    ends = [match.end() for match in _SENTENCE_END.finditer(head) if match.end() < len(head)]
+    cut = max([head.rfind("\n") + 1, *ends])
+    if cut > len(head) // 2:
+        head = head[:cut]
+    return head.rstrip() + marker
+
 
 def split_into_chunks(content: str, *, chunk_size: int = 100_000) -> list[str]:
     """
@@ -10,4 +89,247 @@ def split_into_chunks(content: str, *, chunk_size: int = 100_000) -> list[str]:
     return [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)]
 
 
-__all__ = ["split_into_chunks"]
+def chunk_markdown(
+    content: str,
+    *,
+    max_tokens: int = DEFAULT_CHUNK_TOKENS,
+    overlap_tokens: int = 0,
+) -> list[Chunk]:
+    """
+    Pack markdown into chunks of at most `max_tokens` estimated tokens.
+
+    Cuts fall between blocks: headings, paragraphs, tables (pipe or HTML),
+    fenced code and `$$` formula blocks are kept whole, and a heading always
+    travels with the content after it. Only a block that alone exceeds the
+    budget is split, by sentence or line first. With `overlap_tokens`, each
+    chunk repeats the trailing blocks of the previous one up to that budget,
+    or the trailing sentences of its last block when that block is larger.
+    """
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    if not 0 <= overlap_tokens < max_tokens:
+        raise ValueError("overlap_tokens must be between 0 and max_tokens")
+
+    pieces: list[_Piece] = []
+    headings = 0  # tokens of the headings right before the next block
+    for start, end, kind, section_path in _iter_blocks(content):
+        gap = estimate_tokens(content[pieces[-1].end : start]) if pieces else 0
+        tokens = estimate_tokens(content[start:end])
+        if kind == "heading":
+            pieces.append(_Piece(start, end, section_path, tokens, gap, heading=True))
+            headings += gap + tokens
+            continue
+        # Leave room for the headings that travel with this block, unless
+        # they take most of the budget themselves.
+        budget = max_tokens - headings - gap if headings + gap <= max_tokens // 2 else max_tokens
+        headings = 0
+        if tokens <= budget:
+            pieces.append(_Piece(start, end, section_path, tokens, gap))
+            continue
+        # Split pieces leave room for the overlap repeated in front of them.
+        budget = max(budget - overlap_tokens, budget // 2)
+        split = list(_split_block(content, start, end, kind, section_path, budget))
+        split[0] = replace(split[0], gap=gap)
+        pieces.extend(split)
+
+    chunks: list[Chunk] = []
+    current: list[_Piece] = []
+    carried = 0  # leading pieces repeated from the previous chunk
+    size = 0  # _span_tokens(current), kept up to date
+    for piece in pieces:
+        if len(current) > carried and size + piece.gap + piece.tokens > max_tokens:
+            # Headings travel with the content after them, never end a chunk.
+            body = len(current)
+            while body > carried and current[body - 1].heading:
+                body -= 1
+            pending = current[body:]
+            if body > carried:
+                chunks.append(_make_chunk(content, current[:body], carried))
+                # The overlap takes what room the pending headings and piece leave.
+                joint = (pending[0] if pending else piece).gap
+                room = min(overlap_tokens, max_tokens - _span_tokens(pending + [piece]) - joint)
+                tail = _overlap_tail(content, current[:body], room) if room > 0 else []
+                current = tail + pending
+                carried = len(current) - len(pending)
+                size = _span_tokens(current)
+            while carried and size + piece.gap + piece.tokens > max_tokens:
+                size -= current[0].tokens + (current[1].gap if len(current) > 1 else 0)
+                current.pop(0)
+                carried -= 1
+            if current and size + piece.gap + piece.tokens > max_tokens:
+                # Headings too long to share a chunk with anything.
+                chunks.append(_make_chunk(content, current, 0))
+                current, size = [], 0
+        size += piece.tokens + (piece.gap if current else 0)
+        current.append(piece)
+    if len(current) > carried:
+        last = _make_chunk(content, current, carried)
+        if chunks and all(item.heading for item in current[carried:]):
+            # Trailing headings with nothing after them join the last chunk.
+            text = content[chunks[-1].start : last.end]
+            tokens = estimate_tokens(text)
+            if tokens <= max_tokens:
+                last = Chunk(text, chunks[-1].start, last.end, chunks[-1].section_path, tokens)
+                chunks.pop()
+        chunks.append(last)
+    return chunks
+
+
+def _make_chunk(content: str, pieces: list[_Piece], carried: int) -> Chunk:
+    start, end = pieces[0].start, pieces[-1].end
+    text = content[start:end]
+    return Chunk(text, start, end, pieces[carried].section_path, estimate_tokens(text))
+
+
+def _span_tokens(pieces: list[_Piece]) -> int:
+    """
+    Upper bound on the estimated tokens of the text spanned by `pieces`.
+    """
+    return sum(piece.tokens for piece in pieces) + sum(piece.gap for piece in pieces[1:])
+
+
+def _overlap_tail(content: str, pieces: list[_Piece], overlap_tokens: int) -> list[_Piece]:
+    tail: list[_Piece] = []
+    budget = overlap_tokens
+    for piece in reversed(pieces):
+        joint = tail[0].gap if tail else 0
+        if piece.tokens + joint <= budget:
+            tail.insert(0, piece)
+            budget -= piece.tokens + joint
+            continue
+        # A block larger than the rest of the budget lends its last sentences.
+        partial = None if piece.heading else _trailing_sentences(content, piece, budget - joint)
+        if partial:
+            tail.insert(0, partial)
+        break
+    return tail
+
+
+def _trailing_sentences(content: str, piece: _Piece, budget: int) -> _Piece | None:
+    """
+    The longest run of whole sentences or lines ending `piece` that fits
+    `budget`, found walking back one sentence at a time.
+    """
+    text = content[piece.start : piece.end]
+    cuts = {match.end() for match in _SENTENCE_END.finditer(text)}
+    cuts.update(match.end() for match in re.finditer(r"\n", text))
+    last = len(text.rstrip())  # a cut must leave more than whitespace
+    best: _Piece | None = None
+    cjk = 0
+    for cut in sorted((cut for cut in cuts if 0 < cut < last), reverse=True):
+        # Count characters as the suffix grows, as estimate_tokens(text[cut:]) would.
+        cjk += len(_CJK.findall(text, cut, best.start - piece.start if best else len(text)))
+        tokens = math.ceil(cjk * _CJK_TOKENS_PER_CHAR + (len(text) - cut - cjk) * _OTHER_TOKENS_PER_CHAR)
+        if tokens > budget:
+            break
+        best = _Piece(piece.start + cut, piece.end, piece.section_path, tokens)
+    return best
+
+
+def _iter_blocks(content: str) -> Iterator[tuple[int, int, str, tuple[str, ...]]]:
+    """
+    Yield `(start, end, kind, section_path)` for each markdown block.
+    """
+    lines = content.splitlines(keepends=True)
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line))
+
+    path: list[tuple[int, str]] = []
+    i = 0
+    while i < len(lines):
+        stripped = lines[i].strip()
+        if not stripped:
+            i += 1
+            continue
+
+        heading = _HEADING.match(stripped)
+        if heading:
+            level = len(heading.group(1))
+            path = [entry for entry in path if entry[0] < level] + [(level, heading.group(2))]
+            kind, j = "heading", i + 1
+        elif stripped.startswith(("```", "~~~")):
+            fence = stripped[:3]
+            j = i + 1
+            while j < len(lines) and not lines[j].strip().startswith(fence):
+                j += 1
+            kind, j = "code", min(j + 1, len(lines))
+        elif stripped.startswith("$$") and not (len(stripped) > 2 and stripped.endswith("$$")):
+            j = i + 1
+            while j < len(lines) and "$$" not in lines[j]:
+                j += 1
+            kind, j = "formula", min(j + 1, len(lines))
+        elif stripped.lower().startswith("<table"):
+            j = i
+            while j < len(lines) and "</table>" not in lines[j].lower():
+                j += 1
+            kind, j = "table", min(j + 1, len(lines))
+        elif stripped.startswith("|"):
+            j = i + 1
+            while j < len(lines) and lines[j].strip().startswith("|"):
+                j += 1
+            kind = "table"
+        else:
+            j = i + 1
+            while j < len(lines) and lines[j].strip() and not _starts_block(lines[j].strip()):
+                j += 1
+            kind = "paragraph"
+
+        yield offsets[i], offsets[j], kind, tuple(title for _, title in path)
+        i = j
+
+
+def _starts_block(stripped: str) -> bool:
+    return bool(
+        _HEADING.match(stripped)
+        or stripped.startswith(("```", "~~~", "$$", "|"))
+        or stripped.lower().startswith("<table")
+    )
+
+
+def _split_block(
+    content: str,
+    start: int,
+    end: int,
+    kind: str,
+    section_path: tuple[str, ...],
+    max_tokens: int,
+) -> Iterator[_Piece]:
+    """
+    Break an oversized block into budget-sized pieces: by sentence for prose,
+    by line for tables, code and formulas, and by characters as a last resort.
+    """
+    text = content[start:end]
+    if kind == "paragraph":
+        cuts = [match.end() for match in _SENTENCE_END.finditer(text)]
+    else:
+        cuts = [match.end() for match in re.finditer(r"\n", text)]
+    bounds = sorted({0, len(text), *cuts})
+
+    piece_start = 0
+    piece_tokens = 0
+    for unit_start, unit_end in zip(bounds, bounds[1:]):
+        unit_tokens = estimate_tokens(text[unit_start:unit_end])
+        if piece_tokens and piece_tokens + unit_tokens > max_tokens:
+            yield _Piece(start + piece_start, start + unit_start, section_path, piece_tokens)
+            piece_start, piece_tokens = unit_start, 0
+        if unit_tokens > max_tokens:
+            step = max(1, len(text[unit_start:unit_end]) * max_tokens // unit_tokens)
+            for offset in range(unit_start, unit_end, step):
+                stop = min(offset + step, unit_end)
+                yield _Piece(start + offset, start + stop, section_path, estimate_tokens(text[offset:stop]))
+            piece_start, piece_tokens = unit_end, 0
+            continue
+        piece_tokens += unit_tokens
+    if piece_start < len(text):
+        yield _Piece(start + piece_start, end, section_path, piece_tokens)
+
+
+__all__ = [
+    "Chunk",
+    "DEFAULT_CHUNK_TOKENS",
+    "chunk_markdown",
+    "estimate_tokens",
+    "split_into_chunks",
+    "truncate_to_tokens",
+]
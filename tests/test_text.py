@@ -0,0 +1,35 @@
+import time
+
+from chatpdfv2.utils.text import chunk_markdown, estimate_tokens
+
+
+def _large_block(lines: int = 50_000) -> str:
+    # One pipe table with no blank lines: a single block far over budget.
+    return "".join(f"| row {i} | value {i} |\n" for i in range(lines))
+
+
+def test_large_single_block_is_chunked_in_linear_time() -> None:
+    content = _large_block()
+    for overlap_tokens in (0, 2_000):
+        started = time.perf_counter()
+        chunks = chunk_markdown(content, max_tokens=4_000, overlap_tokens=overlap_tokens)
+        assert time.perf_counter() - started < 5
+
+        assert chunks[0].start == 0 and chunks[-1].end == len(content)
+        for chunk in chunks:
+            assert chunk.text == content[chunk.start : chunk.end]
+            assert chunk.tokens == estimate_tokens(chunk.text) <= 4_000
+        for previous, chunk in zip(chunks, chunks[1:]):
+            if overlap_tokens:
+                assert chunk.start < previous.end
+            else:
+                assert chunk.start >= previous.end
+
+
+def test_overlap_falls_back_to_trailing_sentences() -> None:
+    content = "First sentence here. " * 30 + "\n\n" + "Second paragraph words. " * 30 + "\n"
+    first, second = chunk_markdown(content, max_tokens=250, overlap_tokens=40)
+
+    assert first.end <= content.index("Second")
+    assert second.start < content.index("Second")
+    assert content[second.start : content.index("Second")].startswith("First sentence here.")